@@ -0,0 +1,124 @@
+from datetime import timezone as dt_timezone
+from django.db import connection, transaction
+from django.utils import timezone
+from . import rollups
+from .models import Asset, AssetLatestPrice, AssetPriceLog
+
+
+ASSET_FIELDS = ('name_fa', 'name_en', 'category')
+LOG_FIELDS = ('price', 'high', 'low', 'change_amount', 'change_percent')
+
+
+def update_latest_prices(logs):
+    """
+    Moves the latest-price snapshot of each asset in `logs` (dicts with 'symbol',
+    'timestamp' and the log fields) forward to its newest log. Snapshots that
+    are already newer, e.g. while an old archive is replayed, are left alone.
+
+    The caller must hold rollups.lock_assets() of the assets in its transaction;
+    otherwise a concurrent writer could read the same old timestamp and an older
+    log could commit last.
+    """
+    newest = {}
+    for log in logs:
+        if log['symbol'] not in newest or log['timestamp'] > newest[log['symbol']]['timestamp']:
+            newest[log['symbol']] = log
+    if not newest:
+        return
+    stored = dict(AssetLatestPrice.objects.filter(asset_id__in=newest).values_list('asset_id', 'timestamp'))
+    fresh = [
+        AssetLatestPrice(asset_id=symbol, timestamp=log['timestamp'], **{field: log[field] for field in LOG_FIELDS})
+        for symbol, log in newest.items() if symbol not in stored or log['timestamp'] > stored[symbol]
+    ]
+    if fresh:
+        AssetLatestPrice.objects.bulk_create(
+            fresh,
+            update_conflicts=True,
+            unique_fields=['asset'],
+            update_fields=[*LOG_FIELDS, 'timestamp'],
+        )
+
+
+def insert_new_logs(quotes):
+    """
+    Inserts the price logs of `quotes` with ON CONFLICT DO NOTHING and returns
+    the quotes whose logs were actually inserted, read back with RETURNING. A
+    log that another worker stored first is not returned, so every log is
+    counted, snapshotted and rolled up by exactly one transaction.
+    """
+    fields = [AssetPriceLog._meta.get_field(name) for name in ('asset', 'timestamp', *LOG_FIELDS)]
+    quote = connection.ops.quote_name
+    batch_size = max(connection.ops.bulk_batch_size(fields, quotes), 1)
+    by_key, inserted = {}, []
+    for start in range(0, len(quotes), batch_size):
+        rows = []
+        for data in quotes[start:start + batch_size]:
+            values = [data['symbol'], data['timestamp'], *(data[name] for name in LOG_FIELDS)]
+            row = [field.get_db_prep_save(value, connection) for field, value in zip(fields, values)]
+            by_key[(data['symbol'], data['timestamp'])] = data
+            rows.append(row)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"INSERT INTO {quote(AssetPriceLog._meta.db_table)} "
+                f"({', '.join(quote(field.column) for field in fields)}) "
+                f"VALUES {', '.join(['(' + ', '.join(['%s'] * len(fields)) + ')'] * len(rows))} "
+                f"ON CONFLICT DO NOTHING RETURNING {quote(fields[0].column)}, {quote(fields[1].column)}",
+                [value for row in rows for value in row],
+            )
+            # SQLite returns timestamps as naive UTC.
+            inserted += [
+                by_key[(symbol, timestamp if timezone.is_aware(timestamp) else timestamp.replace(tzinfo=dt_timezone.utc))]
+                for symbol, timestamp in cursor.fetchall()
+            ]
+    return inserted
+
+
+def save_quotes(quotes):
+    """
+    Writes a tick of parsed quotes in a single transaction with a fixed number of
+    queries, however many symbols the feed has.
+
+    Assets whose names or category differ from the stored row (or that are new)
+    are upserted in one statement. Price logs are inserted in one statement with
+    ON CONFLICT DO NOTHING, so a tick processed twice, or by two workers at once,
+    never raises IntegrityError. The latest-price snapshots and the OHLC candles
+    are updated in the same transaction from the logs this call inserted.
+
+    Returns:
+        A (stats, inserted quotes) tuple: a dict with 'inserted' and 'duplicate'
+        price log counts and the number of 'assets_upserted', and the quotes whose
+        logs this call inserted.
+    """
+    # The last quote wins if a symbol appears twice with the same timestamp.
+    quotes = list({(quote['symbol'], quote['timestamp']): quote for quote in quotes}.values())
+    stats = {'inserted': 0, 'duplicate': 0, 'assets_upserted': 0}
+    if not quotes:
+        return stats, []
+
+    assets = {quote['symbol']: {field: quote[field] for field in ASSET_FIELDS} for quote in quotes}
+    with transaction.atomic():
+        stored = {
+            symbol: dict(zip(ASSET_FIELDS, values))
+            for symbol, *values in Asset.objects.filter(symbol__in=assets).values_list('symbol', *ASSET_FIELDS)
+        }
+        changed = [symbol for symbol, fields in assets.items() if stored.get(symbol) != fields]
+        if changed:
+            Asset.objects.bulk_create(
+                [Asset(symbol=symbol, **assets[symbol]) for symbol in changed],
+                update_conflicts=True,
+                unique_fields=['symbol'],
+                update_fields=list(ASSET_FIELDS),
+            )
+        stats['assets_upserted'] = len(changed)
+
+        # Writers of an asset's logs, snapshot and candles (live ticks, archive replays,
+        # candle rebuilds) take turns, so the snapshot never moves backwards.
+        rollups.lock_assets(assets)
+        new_quotes = insert_new_logs(quotes)
+        if new_quotes:
+            update_latest_prices(new_quotes)
+            rollups.roll_up(new_quotes)
+
+    stats['inserted'] = len(new_quotes)
+    stats['duplicate'] = len(quotes) - len(new_quotes)
+    return stats, new_quotes
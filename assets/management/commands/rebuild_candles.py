@@ -0,0 +1,73 @@
+from datetime import datetime
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Min
+from assets import rollups
+from assets.models import AssetCandle, AssetPriceLog
+
+
+class Command(BaseCommand):
+    help = (
+        "Rebuilds the 5-minute, hourly and daily OHLC candles of assets from their raw price logs. "
+        "Candles older than the oldest retained log of an asset are kept, since their logs are gone."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('symbols', nargs='*', help="Assets to rebuild (default: all).")
+        parser.add_argument(
+            '--since', type=lambda value: datetime.strptime(value, '%Y-%m-%d').date(),
+            help="First Tehran day (YYYY-MM-DD) to rebuild (default: the day of the oldest retained log).")
+        parser.add_argument('--batch-size', type=int, default=5000, help="Logs rolled up per query.")
+
+    def handle(self, *args, symbols, since, batch_size, **options):
+        logs = AssetPriceLog.objects.all()
+        if symbols:
+            logs = logs.filter(asset_id__in=symbols)
+        oldest = dict(logs.values('asset_id').annotate(oldest=Min('timestamp')).values_list('asset_id', 'oldest'))
+        if not oldest:
+            raise CommandError("No raw price logs to rebuild candles from.")
+
+        # Raw logs expire a whole Tehran month at a time, so the day of an asset's oldest
+        # log holds all of that day's ticks and candles from that day on can be rebuilt.
+        starts = {symbol: rollups.bucket_start(timestamp, '1d') for symbol, timestamp in oldest.items()}
+        if since is not None:
+            since = rollups.TEHRAN_TZ.localize(datetime(since.year, since.month, since.day))
+            if since < min(starts.values()):
+                raise CommandError(
+                    f"Raw logs only go back to {min(starts.values()):%Y-%m-%d}; "
+                    f"candles before that can't be rebuilt.")
+            starts = {symbol: max(start, since) for symbol, start in starts.items()}
+
+        total_deleted = total_logs = total_candles = 0
+        for symbol, start in sorted(starts.items()):
+            deleted, logs, candles = self._rebuild(symbol, start, batch_size)
+            self.stdout.write(f"{symbol}: replaced {deleted} candles from {start:%Y-%m-%d} with {candles} from {logs} logs.")
+            total_deleted += deleted
+            total_logs += logs
+            total_candles += candles
+        self.stdout.write(self.style.SUCCESS(
+            f"Rolled up {total_logs} logs into {total_candles} candle writes, replacing {total_deleted} candles."))
+
+    @staticmethod
+    def _rebuild(symbol, start, batch_size):
+        """
+        Replaces the candles of `symbol` from `start` on with ones rolled up from
+        its raw logs, in one transaction. The asset stays locked meanwhile, so
+        ticks ingested during the rebuild are rolled up exactly once.
+        """
+        with transaction.atomic():
+            rollups.lock_assets([symbol])
+            deleted, _ = AssetCandle.objects.filter(asset_id=symbol, bucket__gte=start).delete()
+            rows = AssetPriceLog.objects.filter(asset_id=symbol, timestamp__gte=start).order_by('timestamp').values(
+                'timestamp', 'price').iterator(chunk_size=batch_size)
+            batch, logs, candles = [], 0, 0
+            for row in rows:
+                batch.append({'symbol': symbol, 'timestamp': row['timestamp'], 'price': row['price']})
+                if len(batch) == batch_size:
+                    candles += rollups.roll_up(batch)
+                    logs += len(batch)
+                    batch = []
+            if batch:
+                candles += rollups.roll_up(batch)
+                logs += len(batch)
+        return deleted, logs, candles
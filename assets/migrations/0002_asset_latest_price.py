@@ -0,0 +1,41 @@
+# Generated by Django 5.2 on 2026-10-17 13:11
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def backfill_latest_prices(apps, schema_editor):
+    AssetPriceLog = apps.get_model('assets', 'AssetPriceLog')
+    AssetLatestPrice = apps.get_model('assets', 'AssetLatestPrice')
+    latest = AssetPriceLog.objects.filter(asset=OuterRef('asset')).order_by('-timestamp').values('pk')[:1]
+    AssetLatestPrice.objects.bulk_create(
+        AssetLatestPrice(
+            asset_id=log.asset_id, price=log.price, high=log.high, low=log.low,
+            change_amount=log.change_amount, change_percent=log.change_percent, timestamp=log.timestamp,
+        )
+        for log in AssetPriceLog.objects.filter(pk=Subquery(latest)).iterator()
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('assets', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AssetLatestPrice',
+            fields=[
+                ('asset', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='latest_quote', serialize=False, to='assets.asset')),
+                ('price', models.DecimalField(decimal_places=4, max_digits=20)),
+                ('high', models.DecimalField(decimal_places=4, max_digits=20)),
+                ('low', models.DecimalField(decimal_places=4, max_digits=20)),
+                ('change_amount', models.DecimalField(decimal_places=4, max_digits=20)),
+                ('change_percent', models.FloatField()),
+                ('timestamp', models.DateTimeField()),
+            ],
+        ),
+        migrations.RunPython(backfill_latest_prices, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.2 on 2026-10-17 13:13
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('assets', '0002_asset_latest_price'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AssetCandle',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('interval', models.CharField(choices=[('5m', '5 minutes'), ('1h', '1 hour'), ('1d', '1 day')], max_length=2)),
+                ('bucket', models.DateTimeField(help_text="Start of the candle's time bucket")),
+                ('open', models.DecimalField(decimal_places=4, max_digits=20)),
+                ('high', models.DecimalField(decimal_places=4, max_digits=20)),
+                ('low', models.DecimalField(decimal_places=4, max_digits=20)),
+                ('close', models.DecimalField(decimal_places=4, max_digits=20)),
+                ('opened_at', models.DateTimeField()),
+                ('closed_at', models.DateTimeField()),
+                ('ticks', models.PositiveIntegerField(default=0)),
+                ('asset', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='candles', to='assets.asset')),
+            ],
+            options={
+                'ordering': ['-bucket'],
+                'constraints': [models.UniqueConstraint(fields=('asset', 'interval', 'bucket'), name='asset_candle_per_bucket')],
+            },
+        ),
+    ]
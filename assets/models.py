@@ -51,3 +51,53 @@ class AssetPriceLog(models.Model):
 
     def __str__(self):
         return f"{self.asset} - {self.price} @ {self.timestamp}"
+
+
+class AssetLatestPrice(models.Model):
+    """
+    The newest price log of each asset, kept up to date when prices are written,
+    so asset lists read one row per asset instead of the whole price history.
+    """
+    asset = models.OneToOneField(Asset, on_delete=models.CASCADE, primary_key=True, related_name="latest_quote")
+    price = models.DecimalField(max_digits=20, decimal_places=4)
+    high = models.DecimalField(max_digits=20, decimal_places=4)
+    low = models.DecimalField(max_digits=20, decimal_places=4)
+    change_amount = models.DecimalField(max_digits=20, decimal_places=4)
+    change_percent = models.FloatField()
+    timestamp = models.DateTimeField()
+
+    def __str__(self):
+        return f"{self.asset_id} - {self.price} @ {self.timestamp}"
+
+
+class AssetCandle(models.Model):
+    """
+    An OHLC candle of an asset's ticks over one 5-minute, hourly or daily bucket,
+    rolled up as ticks are ingested so long-range charts don't read raw logs.
+    Buckets start on Tehran wall-clock boundaries.
+    """
+    INTERVAL_CHOICES = [
+        ('5m', '5 minutes'),
+        ('1h', '1 hour'),
+        ('1d', '1 day'),
+    ]
+    asset = models.ForeignKey(Asset, on_delete=models.CASCADE, related_name="candles")
+    interval = models.CharField(max_length=2, choices=INTERVAL_CHOICES)
+    bucket = models.DateTimeField(help_text="Start of the candle's time bucket")
+    open = models.DecimalField(max_digits=20, decimal_places=4)
+    high = models.DecimalField(max_digits=20, decimal_places=4)
+    low = models.DecimalField(max_digits=20, decimal_places=4)
+    close = models.DecimalField(max_digits=20, decimal_places=4)
+    # Timestamps of the first and last tick, so late or replayed ticks merge in the right order.
+    opened_at = models.DateTimeField()
+    closed_at = models.DateTimeField()
+    ticks = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        ordering = ['-bucket']
+        constraints = [
+            models.UniqueConstraint(fields=['asset', 'interval', 'bucket'], name='asset_candle_per_bucket')
+        ]
+
+    def __str__(self):
+        return f"{self.asset_id} {self.interval} @ {self.bucket}: {self.open}/{self.high}/{self.low}/{self.close}"
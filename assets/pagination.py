@@ -0,0 +1,24 @@
+from decouple import config
+from rest_framework.pagination import CursorPagination
+
+
+# Points per history page, and the most a client may ask for with ?page_size=.
+ASSET_HISTORY_PAGE_SIZE = config('ASSET_HISTORY_PAGE_SIZE', default=500, cast=int)
+ASSET_HISTORY_MAX_PAGE_SIZE = config('ASSET_HISTORY_MAX_PAGE_SIZE', default=2000, cast=int)
+
+
+class HistoryCursorPagination(CursorPagination):
+    """
+    Keyset pagination of price history, newest first.
+
+    The cursor holds the timestamp of the last point served and the next page is
+    read with `timestamp < cursor`, straight off the (asset, timestamp) index, so
+    a deep page costs as much as the first one. Timestamps are unique per asset
+    (and buckets per asset and interval), so no page repeats or skips a point.
+    """
+    page_size = ASSET_HISTORY_PAGE_SIZE
+    page_size_query_param = 'page_size'
+    max_page_size = ASSET_HISTORY_MAX_PAGE_SIZE
+
+    def __init__(self, field='timestamp'):
+        self.ordering = f'-{field}'
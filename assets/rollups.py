@@ -0,0 +1,123 @@
+from datetime import timedelta
+import pytz
+from django.db.models import Sum
+from django.utils import timezone
+from .models import Asset, AssetCandle, AssetPriceLog
+
+
+TEHRAN_TZ = pytz.timezone('Asia/Tehran')
+# Candle resolutions, finest first.
+INTERVALS = {
+    '5m': timedelta(minutes=5),
+    '1h': timedelta(hours=1),
+    '1d': timedelta(days=1),
+}
+# Spacing of raw ticks: the asset feed is polled every two minutes.
+TICK_INTERVAL = timedelta(minutes=2)
+# interval=auto picks the finest resolution that returns at most this many points for the range.
+HISTORY_MAX_POINTS = 500
+
+CANDLE_FIELDS = ['open', 'high', 'low', 'close', 'opened_at', 'closed_at', 'ticks']
+
+
+def bucket_start(timestamp, interval):
+    """ Returns the start of the `interval` bucket holding `timestamp`, on Tehran wall-clock boundaries. """
+    local = timestamp.astimezone(TEHRAN_TZ).replace(second=0, microsecond=0, tzinfo=None)
+    if interval == '1d':
+        local = local.replace(hour=0, minute=0)
+    elif interval == '1h':
+        local = local.replace(minute=0)
+    else:
+        local = local.replace(minute=local.minute - local.minute % 5)
+    return TEHRAN_TZ.localize(local)
+
+
+def _merge(candle, other):
+    """ Folds candle dict `other` into `candle`, whichever order their ticks arrived in. """
+    if other['opened_at'] < candle['opened_at']:
+        candle['open'], candle['opened_at'] = other['open'], other['opened_at']
+    if other['closed_at'] > candle['closed_at']:
+        candle['close'], candle['closed_at'] = other['close'], other['closed_at']
+    candle['high'] = max(candle['high'], other['high'])
+    candle['low'] = min(candle['low'], other['low'])
+    candle['ticks'] += other['ticks']
+
+
+def lock_assets(symbols):
+    """ Locks the rows of the assets `symbols` until the end of the transaction, in a fixed order. """
+    list(Asset.objects.select_for_update().filter(symbol__in=symbols).order_by('symbol').values_list('pk'))
+
+
+def roll_up(logs):
+    """
+    Folds newly stored price logs (dicts with 'symbol', 'timestamp' and 'price')
+    into the 5-minute, hourly and daily candles of their assets.
+
+    The candles of all resolutions touched by the batch are read in one query,
+    merged in memory and written back in one upsert, so a tick costs two queries
+    however many symbols changed. Each log must be rolled up exactly once.
+
+    The caller must hold lock_assets() of the logs' assets in its transaction, so
+    a candle rebuild (see rebuild_candles) and incoming ticks of an asset take turns.
+    """
+    candles = {}
+    for log in logs:
+        for interval in INTERVALS:
+            key = (log['symbol'], interval, bucket_start(log['timestamp'], interval))
+            tick = {
+                'open': log['price'], 'high': log['price'], 'low': log['price'], 'close': log['price'],
+                'opened_at': log['timestamp'], 'closed_at': log['timestamp'], 'ticks': 1,
+            }
+            if key in candles:
+                _merge(candles[key], tick)
+            else:
+                candles[key] = tick
+    if not candles:
+        return 0
+
+    stored = AssetCandle.objects.filter(
+        asset_id__in={symbol for symbol, _, _ in candles},
+        interval__in=INTERVALS,
+        bucket__in={bucket for _, _, bucket in candles},
+    ).values_list('asset_id', 'interval', 'bucket', *CANDLE_FIELDS)
+    for symbol, interval, bucket, *values in stored:
+        if (key := (symbol, interval, bucket)) in candles:
+            _merge(candles[key], dict(zip(CANDLE_FIELDS, values)))
+
+    AssetCandle.objects.bulk_create(
+        [
+            AssetCandle(asset_id=symbol, interval=interval, bucket=bucket, **candle)
+            for (symbol, interval, bucket), candle in candles.items()
+        ],
+        update_conflicts=True,
+        unique_fields=['asset', 'interval', 'bucket'],
+        update_fields=CANDLE_FIELDS,
+    )
+    return len(candles)
+
+
+def pick_interval(start, end):
+    """
+    Returns the finest resolution ('raw' or a candle interval) that covers the
+    range from `start` to `end` (aware datetimes) in at most HISTORY_MAX_POINTS
+    points, or '1d' for ranges too long for that.
+    """
+    span = (end or timezone.now()) - start
+    for interval, step in [('raw', TICK_INTERVAL), *INTERVALS.items()]:
+        if span / step <= HISTORY_MAX_POINTS:
+            return interval
+    return '1d'
+
+
+def covers(start, end):
+    """
+    Returns whether the 5-minute candles hold every price log from `start` (None
+    for the beginning) up to `end`, both on Tehran day boundaries. Raw logs of
+    such a range may be discarded without losing their candles.
+    """
+    logs = AssetPriceLog.objects.filter(timestamp__lt=end)
+    candles = AssetCandle.objects.filter(interval='5m', bucket__lt=end)
+    if start is not None:
+        logs = logs.filter(timestamp__gte=start)
+        candles = candles.filter(bucket__gte=start)
+    return (candles.aggregate(ticks=Sum('ticks'))['ticks'] or 0) >= logs.count()
@@ -1,5 +1,6 @@
 from rest_framework import serializers
-from .models import Asset, AssetPriceLog
+from django.core.exceptions import ObjectDoesNotExist
+from .models import Asset, AssetCandle, AssetLatestPrice, AssetPriceLog
 
 
 
@@ -28,13 +29,13 @@ class AssetSerializer(serializers.ModelSerializer):
 
     def get_latest_price(self, obj):
         """
-        Retrieves the most recent price log for the asset.
+        Reads the asset's latest-price snapshot, never its price history.
+        Querysets should select_related('latest_quote').
         """
-        latest_log = obj.price_logs.first()
-        if latest_log:
-            # Reuse the PriceLog serializer to format the data
-            return AssetPriceLogSerializer(latest_log).data
-        return None
+        try:
+            return LatestPriceSerializer(obj.latest_quote).data
+        except ObjectDoesNotExist:
+            return None
 
 
 class AssetWriteSerializer(serializers.ModelSerializer):
@@ -53,3 +54,25 @@ class AssetPriceLogSerializer(serializers.ModelSerializer):
         # These fields are perfect for a chart
         fields = ['price', 'high', 'low', 'timestamp']
         read_only_fields = fields
+
+
+class LatestPriceSerializer(serializers.ModelSerializer):
+    """
+    Serializer for an asset's latest-price snapshot, shaped like a price log.
+    """
+    class Meta:
+        model = AssetLatestPrice
+        fields = ['price', 'high', 'low', 'timestamp']
+        read_only_fields = fields
+
+
+class AssetCandleSerializer(serializers.ModelSerializer):
+    """
+    Serializer for an OHLC candle; `timestamp` is the start of its bucket.
+    """
+    timestamp = serializers.DateTimeField(source='bucket')
+
+    class Meta:
+        model = AssetCandle
+        fields = ['open', 'high', 'low', 'close', 'timestamp']
+        read_only_fields = fields
@@ -0,0 +1,45 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from . import rollups
+from .ingest import LOG_FIELDS, update_latest_prices
+from .models import AssetLatestPrice, AssetPriceLog
+
+
+def apply_saved_log(sender, instance, created, **kwargs):
+    """
+    Keeps the latest-price snapshot and the candles current when a log is saved
+    outside the scraper, e.g. in the admin. Edited logs are not rolled up again.
+    """
+    log = {
+        'symbol': instance.asset_id, 'timestamp': instance.timestamp,
+        **{field: getattr(instance, field) for field in LOG_FIELDS},
+    }
+    with transaction.atomic():
+        rollups.lock_assets([instance.asset_id])
+        update_latest_prices([log])
+        if created:
+            rollups.roll_up([log])
+
+
+def apply_deleted_log(sender, instance, **kwargs):
+    """
+    Moves the latest-price snapshot back to the newest remaining log when the log
+    it shows is deleted, e.g. in the admin, and drops it if none is left. Candles
+    keep the deleted log. Expired partitions are detached without signals, but
+    they only hold logs older than the snapshot of an asset that is still scraped.
+    """
+    with transaction.atomic():
+        rollups.lock_assets([instance.asset_id])
+        snapshot = AssetLatestPrice.objects.filter(asset_id=instance.asset_id, timestamp=instance.timestamp)
+        if not snapshot.exists():
+            return
+        newest = AssetPriceLog.objects.filter(asset_id=instance.asset_id).order_by('-timestamp').values(
+            'timestamp', *LOG_FIELDS).first()
+        if newest is None:
+            snapshot.delete()
+        else:
+            snapshot.update(**newest)
+
+
+post_save.connect(apply_saved_log, sender=AssetPriceLog)
+post_delete.connect(apply_deleted_log, sender=AssetPriceLog)
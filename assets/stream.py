@@ -0,0 +1,181 @@
+import asyncio
+import json
+import logging
+import weakref
+from collections import defaultdict
+import redis
+import redis.asyncio as aioredis
+from decouple import config
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.redis import RedisCache
+from django.core.serializers.json import DjangoJSONEncoder
+
+
+logger = logging.getLogger(__name__)
+
+STREAM_CHANNEL = 'assets:ticks'
+# Idle streams get a comment this often (seconds), so proxies and browsers keep them open.
+ASSET_STREAM_HEARTBEAT = config('ASSET_STREAM_HEARTBEAT', default=15, cast=int)
+# Events buffered per client; a client that falls this far behind is disconnected and reconnects.
+ASSET_STREAM_BUFFER = config('ASSET_STREAM_BUFFER', default=100, cast=int)
+QUOTE_FIELDS = ('symbol', 'category', 'price', 'high', 'low', 'change_amount', 'change_percent', 'timestamp')
+
+# One hub per event loop, i.e. per ASGI worker process.
+_hubs = weakref.WeakKeyDictionary()
+# Client publishing from the workers, created on first use.
+_publisher = None
+
+
+def encode(quotes):
+    """ The published message: the quotes as a JSON list, in the representation of the REST API. """
+    return json.dumps([{field: quote[field] for field in QUOTE_FIELDS} for quote in quotes], cls=DjangoJSONEncoder)
+
+
+def _uses_redis():
+    return isinstance(caches['default'], RedisCache)
+
+
+def _publisher_client():
+    global _publisher
+    if _publisher is None:
+        _publisher = redis.Redis.from_url(settings.CACHES['default']['LOCATION'])
+    return _publisher
+
+
+def publish(quotes):
+    """
+    Announces freshly written quotes to every stream subscriber with a single
+    Redis PUBLISH. Without a Redis cache (local development, tests) the quotes
+    go straight to the hubs of this process.
+    """
+    if not quotes:
+        return
+    message = encode(quotes)
+    if _uses_redis():
+        try:
+            _publisher_client().publish(STREAM_CHANNEL, message)
+        except redis.RedisError as e:
+            logger.warning(f"Could not publish {len(quotes)} asset quotes: {e}")
+        return
+    for hub in list(_hubs.values()):
+        if not hub.loop.is_closed():
+            hub.loop.call_soon_threadsafe(hub.dispatch, message)
+
+
+class Subscriber:
+    """ One connected client: the symbols and categories it follows and its queue of pending events. """
+
+    def __init__(self, symbols, categories, buffer=ASSET_STREAM_BUFFER):
+        self.symbols = frozenset(symbols)
+        self.categories = frozenset(categories)
+        self.queue = asyncio.Queue(maxsize=buffer)
+        self.overflowed = False
+
+    def put(self, data):
+        try:
+            self.queue.put_nowait(data)
+        except asyncio.QueueFull:
+            self.overflowed = True
+
+
+class Hub:
+    """
+    Fans published quotes out to the stream subscribers of one process.
+
+    The process holds one Redis subscription however many clients are connected.
+    Each message is decoded once and routed through symbol and category indexes,
+    so its cost grows with the number of matching subscribers, and clients that
+    follow everything share the published payload as is. Nothing here reads the
+    database.
+    """
+
+    def __init__(self, loop):
+        self.loop = loop
+        self.everyone = set()
+        self.by_symbol = defaultdict(set)
+        self.by_category = defaultdict(set)
+        self._listener = None
+
+    def subscribe(self, symbols=(), categories=()):
+        subscriber = Subscriber(symbols, categories)
+        if not subscriber.symbols and not subscriber.categories:
+            self.everyone.add(subscriber)
+        for symbol in subscriber.symbols:
+            self.by_symbol[symbol].add(subscriber)
+        for category in subscriber.categories:
+            self.by_category[category].add(subscriber)
+        # A listener that ended (e.g. on an unexpected error) is replaced, or nobody would get quotes again.
+        if (self._listener is None or self._listener.done()) and _uses_redis():
+            self._listener = self.loop.create_task(self._listen())
+        return subscriber
+
+    def unsubscribe(self, subscriber):
+        self.everyone.discard(subscriber)
+        for index, keys in ((self.by_symbol, subscriber.symbols), (self.by_category, subscriber.categories)):
+            for key in keys:
+                index[key].discard(subscriber)
+                if not index[key]:
+                    del index[key]
+
+    def dispatch(self, message):
+        """
+        Queues the quotes of a published `message` for the subscribers that follow them.
+
+        Raises:
+            ValueError, KeyError or TypeError: If `message` is not a JSON list of
+                quotes; it then reaches no subscriber.
+        """
+        if isinstance(message, bytes):
+            message = message.decode()
+        matched = defaultdict(list)
+        for quote in json.loads(message):
+            for subscriber in self.by_symbol.get(quote['symbol'], set()) | self.by_category.get(quote['category'], set()):
+                matched[subscriber].append(quote)
+        for subscriber in self.everyone:
+            subscriber.put(message)
+        for subscriber, quotes in matched.items():
+            subscriber.put(json.dumps(quotes))
+
+    async def _listen(self):
+        while True:
+            try:
+                async with aioredis.from_url(settings.CACHES['default']['LOCATION']) as client:
+                    async with client.pubsub() as pubsub:
+                        await pubsub.subscribe(STREAM_CHANNEL)
+                        async for message in pubsub.listen():
+                            if message['type'] != 'message':
+                                continue
+                            try:
+                                self.dispatch(message['data'])
+                            except (ValueError, KeyError, TypeError) as e:
+                                logger.warning(f"Dropping malformed asset stream message: {e!r}")
+            except (redis.RedisError, OSError) as e:
+                logger.warning(f"Asset stream subscription lost: {e}. Reconnecting.")
+                await asyncio.sleep(1)
+
+    async def events(self, subscriber, heartbeat=ASSET_STREAM_HEARTBEAT):
+        """
+        Yields the server-sent events of `subscriber`: a `quotes` event with a JSON
+        list per published tick it follows, and a comment after `heartbeat` idle
+        seconds. Ends when the client falls behind; browsers then reconnect.
+        """
+        try:
+            yield 'retry: 5000\n\n'
+            while not subscriber.overflowed:
+                try:
+                    data = await asyncio.wait_for(subscriber.queue.get(), heartbeat)
+                except asyncio.TimeoutError:
+                    yield ': keep-alive\n\n'
+                    continue
+                yield f'event: quotes\ndata: {data}\n\n'
+        finally:
+            self.unsubscribe(subscriber)
+
+
+def hub():
+    """ Returns the hub of the running event loop. """
+    loop = asyncio.get_running_loop()
+    if loop not in _hubs:
+        _hubs[loop] = Hub(loop)
+    return _hubs[loop]
@@ -1,8 +1,17 @@
+import json
+import logging
 import requests
+from collections import defaultdict
 from celery import shared_task
 from fake_useragent import UserAgent
+from scraping.extract import Extractor, Field
+from scraping.http import HttpClient
+from scraping import metrics
+from scraping.instrumentation import count_items, count_rows
+from scraping.ratelimit import limited_session
 from decouple import config
-from .models import Asset, AssetPriceLog
+from . import stream, ticks
+from .ingest import save_quotes
 from decimal import Decimal, InvalidOperation
 import pytz 
 from datetime import datetime 
@@ -275,8 +284,12 @@ STATIC_NAME_MAP = {
 }
 
 BASE_API_ASSETS = config('BASE_API_ASSETS')
+# Re-parsed archive quotes are written this many at a time.
+ARCHIVE_WRITE_BATCH_SIZE = 2000
 
+logger = logging.getLogger(__name__)
 ua = UserAgent()
+client = HttpClient(limited_session(), archive_source='assets')
 
 
 def clean_price(price_str):
@@ -289,6 +302,17 @@ def clean_price(price_str):
         return None
 
 
+# One tgju quote: p = price, h/l = high/low, d/dp = change amount/percent, ts = Tehran time.
+QUOTE_FIELDS = Extractor({
+    'price': Field('p', default=None, convert=clean_price),
+    'timestamp': 'ts',
+    'high': Field('h', default=0, convert=clean_price),
+    'low': Field('l', default=0, convert=clean_price),
+    'change_amount': Field('d', default=0, convert=clean_price),
+    'change_percent': Field('dp', default=0),
+})
+
+
 def determine_category(symbol: str, name_en: str) -> str:
     """
     Analyzes both the asset symbol and its English name to determine the
@@ -334,65 +358,97 @@ def determine_category(symbol: str, name_en: str) -> str:
 
 
 
-@shared_task
-def scrape_assets_prices():
+def parse_quotes(data):
     """
-    Scrapes price data using the static name map for higher quality data.
+    Normalizes the quotes of a tgju feed response. Quotes without a price or a
+    valid Tehran timestamp are dropped.
     """
-    headers = {'User-Agent': ua.random}
-    try:
-        response = requests.get(BASE_API_ASSETS, headers=headers)
-        response.raise_for_status()
-        data = response.json()
-    except requests.RequestException as e:
-        return f"Error fetching asset API: {e}"
-
     tehran_tz = pytz.timezone('Asia/Tehran')
-    assets_data = data.get('current', {})
-    new_logs_count = 0
-
-    for symbol, details in assets_data.items():
-        price = clean_price(details.get('p'))
-        timestamp_str = details.get('ts')
+    quotes = []
+    for symbol, details in data.get('current', {}).items():
+        quote = QUOTE_FIELDS(details)
+        price = quote['price']
+        timestamp_str = quote['timestamp']
 
         if price is None or not timestamp_str:
             continue
             
         try:
             naive_dt = datetime.strptime(timestamp_str, '%Y-%m-%d %H:%M:%S')
-            aware_dt = tehran_tz.localize(naive_dt)
+            quote['timestamp'] = tehran_tz.localize(naive_dt)
         except (ValueError, TypeError):
             continue
 
         # --- UPDATED LOGIC: Use the static map ---
         asset_info = STATIC_NAME_MAP.get(symbol, {})
-        name_fa = asset_info.get('name_fa') or symbol.replace('_', ' ').title()
-        name_en = asset_info.get('name_en') or symbol.replace('_', ' ').title()
-        
-        category = determine_category(symbol, name_en)
-
-        # Use update_or_create to keep names and categories fresh
-        asset, _ = Asset.objects.update_or_create(
-            symbol=symbol,
-            defaults={
-                'name_fa': name_fa,
-                'name_en': name_en,
-                'category': category
-            }
-        )
-
-        _, log_created = AssetPriceLog.objects.get_or_create(
-            asset=asset,
-            timestamp=aware_dt,
-            defaults={
-                'price': price,
-                'high': clean_price(details.get('h', 0)),
-                'low': clean_price(details.get('l', 0)),
-                'change_amount': clean_price(details.get('d', 0)),
-                'change_percent': details.get('dp', 0),
-            }
-        )
-        if log_created:
-            new_logs_count += 1
-
-    return f"Asset scraping finished. Created {new_logs_count} new price logs."
\ No newline at end of file
+        quote['symbol'] = symbol
+        quote['name_fa'] = asset_info.get('name_fa') or symbol.replace('_', ' ').title()
+        quote['name_en'] = asset_info.get('name_en') or symbol.replace('_', ' ').title()
+        quote['category'] = determine_category(symbol, quote['name_en'])
+        quotes.append(quote)
+    return quotes
+
+
+def changed_symbols(current):
+    """
+    Returns {symbol: (feed ts, price)} of the feed entries whose timestamp or price
+    differs from the last quote ingested for that symbol. Unchanged symbols are
+    dropped here, before they are localized, categorized or sent to the database.
+    """
+    seen = ticks.last_seen()
+    changed = {}
+    for symbol, details in current.items():
+        entry = (details.get('ts'), clean_price(details.get('p')))
+        if seen.get(symbol) != entry:
+            changed[symbol] = entry
+    return changed
+
+
+def parse_archived(record):
+    """ Re-parses an archived tgju feed response for `reparse_archive`. """
+    return parse_quotes(json.loads(record['body']))
+
+
+def save_archived(quotes):
+    """ Writes re-parsed quotes; their timestamps come from the feed, so replays are idempotent. """
+    totals = defaultdict(int)
+    for i in range(0, len(quotes), ARCHIVE_WRITE_BATCH_SIZE):
+        stats, _ = save_quotes(quotes[i:i + ARCHIVE_WRITE_BATCH_SIZE])
+        for name, count in stats.items():
+            totals[name] += count
+    return dict(totals)
+
+
+@shared_task
+def scrape_assets_prices():
+    """
+    Scrapes price data using the static name map for higher quality data.
+    """
+    headers = {'User-Agent': ua.random}
+    try:
+        response = client.get_if_changed(BASE_API_ASSETS, headers=headers)
+        if response is None:
+            return "Asset feed unchanged since the last run. Nothing to do."
+        data = response.json()
+    except requests.RequestException as e:
+        return f"Error fetching asset API: {e}"
+
+    current = data.get('current', {})
+    changed = changed_symbols(current)
+    metrics.ASSET_FEED_SYMBOLS.labels('changed').inc(len(changed))
+    metrics.ASSET_FEED_SYMBOLS.labels('unchanged').inc(len(current) - len(changed))
+
+    quotes = parse_quotes({'current': {symbol: current[symbol] for symbol in changed}})
+    count_items(len(quotes))
+    stats, inserted = save_quotes(quotes)
+    count_rows(inserted=stats['inserted'], skipped=stats['duplicate'] + len(current) - len(changed))
+    ticks.remember({quote['symbol']: changed[quote['symbol']] for quote in quotes})
+    # Only this worker's inserts: a tick another worker already stored was published there.
+    stream.publish(inserted)
+
+    client.remember(response.validators)
+    logger.info(f"{len(changed)} of {len(current)} asset symbols changed since the last tick.")
+    return (
+        f"Asset scraping finished. {len(changed)} of {len(current)} symbols changed. Created {stats['inserted']} "
+        f"new price logs, skipped {stats['duplicate']} duplicates, upserted {stats['assets_upserted']} assets."
+    )
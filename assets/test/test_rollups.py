@@ -0,0 +1,102 @@
+from datetime import datetime, timedelta
+from decimal import Decimal
+from io import StringIO
+from django.core.management import CommandError, call_command
+from django.test import TestCase
+from assets import rollups
+from assets.models import Asset, AssetCandle, AssetPriceLog
+
+
+def tehran(*args):
+    return rollups.TEHRAN_TZ.localize(datetime(*args))
+
+
+def tick(timestamp, price):
+    return {'symbol': 'price_eur', 'timestamp': timestamp, 'price': Decimal(price)}
+
+
+class RollupTest(TestCase):
+    """Test suite for the incremental OHLC candle rollups."""
+
+    def setUp(self):
+        Asset.objects.create(symbol='price_eur', name_fa='یورو', name_en='Euro')
+
+    def test_buckets_follow_tehran_wall_clock(self):
+        """Test that buckets start on local 5-minute, hour and midnight boundaries."""
+        timestamp = tehran(2025, 1, 1, 13, 47, 30)
+        self.assertEqual(rollups.bucket_start(timestamp, '5m'), tehran(2025, 1, 1, 13, 45))
+        self.assertEqual(rollups.bucket_start(timestamp, '1h'), tehran(2025, 1, 1, 13, 0))
+        self.assertEqual(rollups.bucket_start(timestamp.astimezone(rollups.pytz.utc), '1d'), tehran(2025, 1, 1))
+
+    def test_ticks_merge_into_candles_in_any_order(self):
+        """Test that batches arriving out of order still yield the right open, high, low and close."""
+        rollups.roll_up([tick(tehran(2025, 1, 1, 10, 2), '102'), tick(tehran(2025, 1, 1, 10, 4), '99')])
+        rollups.roll_up([tick(tehran(2025, 1, 1, 10, 0), '100'), tick(tehran(2025, 1, 1, 10, 6), '101')])
+
+        five = AssetCandle.objects.get(interval='5m', bucket=tehran(2025, 1, 1, 10, 0))
+        self.assertEqual((five.open, five.high, five.low, five.close, five.ticks), (100, 102, 99, 99, 3))
+        hour = AssetCandle.objects.get(interval='1h')
+        self.assertEqual((hour.open, hour.high, hour.low, hour.close, hour.ticks), (100, 102, 99, 101, 4))
+        self.assertEqual(AssetCandle.objects.filter(interval='1d').count(), 1)
+
+    def test_pick_interval_keeps_point_counts_bounded(self):
+        """Test that longer ranges get coarser resolutions."""
+        end = tehran(2025, 1, 1)
+        self.assertEqual(rollups.pick_interval(end - timedelta(hours=6), end), 'raw')
+        self.assertEqual(rollups.pick_interval(end - timedelta(days=1), end), '5m')
+        self.assertEqual(rollups.pick_interval(end - timedelta(days=14), end), '1h')
+        self.assertEqual(rollups.pick_interval(end - timedelta(days=365), end), '1d')
+
+    def test_covers_checks_that_candles_hold_every_log(self):
+        """Test that a range counts as covered only while its 5-minute candles hold all of its logs."""
+        fields = {'price': 100, 'high': 100, 'low': 100, 'change_amount': 0, 'change_percent': 0}
+        AssetPriceLog.objects.create(asset_id='price_eur', timestamp=tehran(2025, 1, 31, 23, 58), **fields)
+        AssetPriceLog.objects.create(asset_id='price_eur', timestamp=tehran(2025, 2, 1, 0, 2), **fields)
+        self.assertTrue(rollups.covers(None, tehran(2025, 2, 1)))
+        self.assertTrue(rollups.covers(tehran(2025, 2, 1), tehran(2025, 3, 1)))
+
+        AssetCandle.objects.filter(bucket__gte=tehran(2025, 2, 1)).delete()
+        self.assertTrue(rollups.covers(None, tehran(2025, 2, 1)))
+        self.assertFalse(rollups.covers(tehran(2025, 2, 1), tehran(2025, 3, 1)))
+
+
+class RebuildCandlesTest(TestCase):
+    """Test suite for the rebuild_candles management command."""
+
+    def setUp(self):
+        Asset.objects.create(symbol='price_eur', name_fa='یورو', name_en='Euro')
+        fields = {'high': 100, 'low': 100, 'change_amount': 0, 'change_percent': 0}
+        for timestamp, price in [(tehran(2025, 1, 20, 10, 0), 90), (tehran(2025, 2, 1, 10, 0), 100),
+                                 (tehran(2025, 2, 2, 10, 0), 110)]:
+            AssetPriceLog.objects.create(asset_id='price_eur', timestamp=timestamp, price=price, **fields)
+        # January's raw logs expired; only its candles remain.
+        AssetPriceLog.objects.filter(timestamp__lt=tehran(2025, 2, 1)).delete()
+
+    def rebuild(self, *args):
+        call_command('rebuild_candles', *args, stdout=StringIO())
+
+    def test_candles_older_than_the_retained_logs_are_kept(self):
+        """Test that a rebuild leaves the candles of expired logs alone and rebuilds the rest once."""
+        AssetCandle.objects.filter(bucket__gte=tehran(2025, 2, 1)).update(ticks=5)
+
+        self.rebuild()
+
+        self.assertEqual(AssetCandle.objects.get(interval='1d', bucket=tehran(2025, 1, 20)).close, 90)
+        self.assertEqual(
+            list(AssetCandle.objects.filter(interval='1d').order_by('bucket').values_list('ticks', flat=True)),
+            [1, 1, 1])
+
+    def test_since_limits_the_rebuild(self):
+        """Test that --since only replaces candles from that day on."""
+        AssetCandle.objects.filter(bucket__gte=tehran(2025, 2, 1)).update(ticks=5)
+
+        self.rebuild('--since', '2025-02-02')
+
+        self.assertEqual(AssetCandle.objects.get(interval='1d', bucket=tehran(2025, 2, 1)).ticks, 5)
+        self.assertEqual(AssetCandle.objects.get(interval='1d', bucket=tehran(2025, 2, 2)).ticks, 1)
+
+    def test_since_before_the_retained_logs_is_refused(self):
+        """Test that candles without raw logs left can't be rebuilt."""
+        with self.assertRaises(CommandError):
+            self.rebuild('--since', '2025-01-01')
+        self.assertEqual(AssetCandle.objects.filter(interval='1d').count(), 3)
@@ -0,0 +1,144 @@
+import asyncio
+import json
+from datetime import datetime
+from decimal import Decimal
+from unittest import mock
+from django.conf import settings
+from django.test import SimpleTestCase, TestCase
+from django.urls import reverse
+from assets import rollups, stream
+
+
+def quote(symbol, category, price='100'):
+    return {
+        'symbol': symbol, 'category': category, 'price': Decimal(price), 'high': Decimal(price),
+        'low': Decimal(price), 'change_amount': Decimal(0), 'change_percent': 0.0,
+        'timestamp': rollups.TEHRAN_TZ.localize(datetime(2025, 1, 1, 10, 0)),
+    }
+
+
+def received(subscriber):
+    events = []
+    while not subscriber.queue.empty():
+        events.append([item['symbol'] for item in json.loads(subscriber.queue.get_nowait())])
+    return events
+
+
+class HubTest(SimpleTestCase):
+    """Test suite for the in-process fan-out of published quotes."""
+
+    async def test_quotes_reach_only_their_followers(self):
+        """Test that subscribers get the quotes of their symbols or categories, each once per tick."""
+        hub = stream.Hub(asyncio.get_running_loop())
+        everyone = hub.subscribe()
+        euro = hub.subscribe(symbols=['price_eur'])
+        gold = hub.subscribe(categories=['GOLD'])
+        both = hub.subscribe(symbols=['price_eur'], categories=['CURRENCY_IRR'])
+        silver = hub.subscribe(categories=['METAL'])
+
+        hub.dispatch(stream.encode([quote('price_eur', 'CURRENCY_IRR'), quote('geram18', 'GOLD')]))
+        self.assertEqual(received(everyone), [['price_eur', 'geram18']])
+        self.assertEqual(received(euro), [['price_eur']])
+        self.assertEqual(received(gold), [['geram18']])
+        self.assertEqual(received(both), [['price_eur']])
+        self.assertEqual(received(silver), [])
+
+    async def test_subscribers_that_fall_behind_are_dropped(self):
+        """Test that a client whose buffer overflows gets its stream ended and is unsubscribed."""
+        hub = stream.Hub(asyncio.get_running_loop())
+        subscriber = hub.subscribe(symbols=['price_eur'])
+        for _ in range(stream.ASSET_STREAM_BUFFER + 1):
+            hub.dispatch(stream.encode([quote('price_eur', 'CURRENCY_IRR')]))
+
+        events = [event async for event in hub.events(subscriber)]
+        self.assertEqual(events, ['retry: 5000\n\n'])
+        self.assertEqual(dict(hub.by_symbol), {})
+
+    async def test_idle_streams_get_heartbeats(self):
+        """Test that a comment keeps an idle stream open."""
+        hub = stream.Hub(asyncio.get_running_loop())
+        events = hub.events(hub.subscribe(), heartbeat=0.01)
+        self.assertEqual([await anext(events), await anext(events)], ['retry: 5000\n\n', ': keep-alive\n\n'])
+        await events.aclose()
+        self.assertEqual(hub.everyone, set())
+
+
+class FakePubSub:
+    """A Redis subscription that delivers `messages` and then stays idle."""
+
+    def __init__(self, messages):
+        self.messages = messages
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        return False
+
+    async def subscribe(self, channel):
+        pass
+
+    async def listen(self):
+        for data in self.messages:
+            yield {'type': 'message', 'data': data}
+        await asyncio.Event().wait()
+
+
+class FakeRedis(FakePubSub):
+    def pubsub(self):
+        return FakePubSub(self.messages)
+
+
+@mock.patch.dict(settings.CACHES['default'], LOCATION='redis://redis:6379/1')
+class ListenerTest(SimpleTestCase):
+    """Test suite for the Redis subscription of a hub."""
+
+    async def test_malformed_messages_do_not_end_the_listener(self):
+        """Test that a bad message is dropped and the quotes published after it still arrive."""
+        messages = [b'not json', json.dumps([{'price': '1'}]).encode(), stream.encode([quote('price_eur', 'CURRENCY_IRR')])]
+        hub = stream.Hub(asyncio.get_running_loop())
+        with mock.patch.object(stream, '_uses_redis', return_value=True), \
+                mock.patch.object(stream.aioredis, 'from_url', return_value=FakeRedis(messages)):
+            everyone = hub.subscribe()
+            euro = hub.subscribe(symbols=['price_eur'])
+            with self.assertLogs('assets.stream', 'WARNING'):
+                for subscriber in (everyone, euro):
+                    self.assertEqual(
+                        [item['symbol'] for item in json.loads(await asyncio.wait_for(subscriber.queue.get(), 1))],
+                        ['price_eur'])
+        self.assertFalse(hub._listener.done())
+        hub._listener.cancel()
+
+    async def test_finished_listener_is_restarted(self):
+        """Test that a new subscriber replaces a listener task that has ended."""
+        hub = stream.Hub(asyncio.get_running_loop())
+        hub._listener = asyncio.get_running_loop().create_task(asyncio.sleep(0))
+        await hub._listener
+        with mock.patch.object(stream, '_uses_redis', return_value=True), \
+                mock.patch.object(stream.aioredis, 'from_url', return_value=FakeRedis([])):
+            finished = hub._listener
+            hub.subscribe()
+        self.assertIsNot(hub._listener, finished)
+        hub._listener.cancel()
+
+
+class AssetStreamViewTest(TestCase):
+    """Test suite for the server-sent events endpoint."""
+
+    async def test_published_quotes_are_streamed(self):
+        """Test that quotes published by a worker thread reach a connected client as an event."""
+        response = await self.async_client.get(reverse('asset-stream'), {'categories': 'gold'})
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        events = aiter(response.streaming_content)
+        self.assertEqual(await anext(events), b'retry: 5000\n\n')
+
+        await asyncio.to_thread(stream.publish, [quote('price_eur', 'CURRENCY_IRR'), quote('geram18', 'GOLD', '55.5')])
+        event = (await anext(events)).decode()
+        self.assertTrue(event.startswith('event: quotes\ndata: '))
+        data = json.loads(event.split('data: ', 1)[1])
+        self.assertEqual([(item['symbol'], item['price']) for item in data], [('geram18', '55.5')])
+
+    async def test_unknown_categories_are_rejected(self):
+        """Test that a typo in a category is a 400 instead of a silent, empty stream."""
+        response = await self.async_client.get(reverse('asset-stream'), {'categories': 'GOLD,GLOD'})
+        self.assertEqual(response.status_code, 400)
@@ -0,0 +1,161 @@
+from decimal import Decimal
+from unittest import mock
+from django.core.cache import cache
+from django.test import TestCase
+from assets import tasks, ticks
+from assets.ingest import save_quotes
+from assets.models import Asset, AssetCandle, AssetLatestPrice, AssetPriceLog
+
+
+def feed(**quotes):
+    """Builds a tgju feed payload from symbol=(price, ts) pairs."""
+    return {'current': {
+        symbol: {'p': price, 'h': price, 'l': price, 'd': '0', 'dp': 0, 'ts': ts}
+        for symbol, (price, ts) in quotes.items()
+    }}
+
+
+class SaveQuotesTest(TestCase):
+    """Test suite for the set-based asset ingest."""
+
+    def test_tick_is_written_with_a_fixed_number_of_queries(self):
+        """Test that a whole tick costs the same few statements however many symbols it has."""
+        quotes = tasks.parse_quotes(feed(**{
+            f'price_symbol_{i}': (f'{1000 + i:,}', '2025-01-01 12:00:00') for i in range(30)}))
+
+        # Read assets, upsert assets, insert logs, read and upsert the latest-price snapshots,
+        # lock the assets, read and upsert the candles, plus the savepoint. (Kept small
+        # enough that SQLite doesn't split the candle upsert into batches.)
+        with self.assertNumQueries(10):
+            stats, _ = save_quotes(quotes)
+
+        self.assertEqual(stats, {'inserted': 30, 'duplicate': 0, 'assets_upserted': 30})
+        self.assertEqual(AssetPriceLog.objects.get(asset_id='price_symbol_7').price, Decimal('1007'))
+
+    def test_repeated_tick_counts_duplicates_and_keeps_assets(self):
+        """Test that replaying a tick inserts nothing and leaves unchanged assets alone."""
+        quotes = tasks.parse_quotes(feed(price_dollar_rl=('600,000', '2025-01-01 12:00:00')))
+        save_quotes(quotes)
+        Asset.objects.filter(symbol='price_dollar_rl').update(is_monitored=True)
+
+        stats, _ = save_quotes(quotes)
+
+        self.assertEqual(stats, {'inserted': 0, 'duplicate': 1, 'assets_upserted': 0})
+        self.assertTrue(Asset.objects.get(symbol='price_dollar_rl').is_monitored)
+        self.assertEqual(AssetPriceLog.objects.count(), 1)
+
+    def test_only_inserted_logs_are_rolled_up(self):
+        """Test that logs another worker already stored are neither counted nor rolled up again."""
+        quotes = tasks.parse_quotes(feed(
+            price_eur=('700,000', '2025-01-01 12:00:00'), price_aed=('160,000', '2025-01-01 12:00:00')))
+        save_quotes([quote for quote in quotes if quote['symbol'] == 'price_eur'])
+
+        with mock.patch.object(AssetPriceLog.objects, 'filter', side_effect=AssertionError("read before insert")):
+            stats, inserted = save_quotes(quotes)
+
+        self.assertEqual(stats, {'inserted': 1, 'duplicate': 1, 'assets_upserted': 1})
+        self.assertEqual([quote['symbol'] for quote in inserted], ['price_aed'])
+        self.assertEqual(
+            dict(AssetCandle.objects.filter(interval='5m').values_list('asset_id', 'ticks')),
+            {'price_eur': 1, 'price_aed': 1})
+
+    def test_renamed_asset_is_updated_in_place(self):
+        """Test that a changed name is upserted without touching the monitoring flag."""
+        Asset.objects.create(symbol='price_eur', name_fa='old', name_en='old', is_monitored=True)
+
+        stats, _ = save_quotes(tasks.parse_quotes(feed(price_eur=('700,000', '2025-01-01 12:02:00'))))
+
+        asset = Asset.objects.get(symbol='price_eur')
+        self.assertEqual(stats['assets_upserted'], 1)
+        self.assertEqual((asset.name_en, asset.is_monitored), ('Euro (Market)', True))
+
+
+    def test_latest_price_snapshot_only_moves_forward(self):
+        """Test that the snapshot follows the newest log and ignores older ones replayed later."""
+        save_quotes(tasks.parse_quotes(feed(price_eur=('705,000', '2025-01-01 12:02:00'))))
+        save_quotes(tasks.parse_quotes(feed(price_eur=('700,000', '2025-01-01 12:00:00'))))
+        self.assertEqual(AssetLatestPrice.objects.get(asset_id='price_eur').price, Decimal('705000'))
+
+        save_quotes(tasks.parse_quotes(feed(price_eur=('710,000', '2025-01-01 12:04:00'))))
+        self.assertEqual(AssetLatestPrice.objects.get(asset_id='price_eur').price, Decimal('710000'))
+
+    def test_assets_are_locked_before_the_snapshot_is_read(self):
+        """Test that a tick and a concurrent replay can't both read the old snapshot timestamp."""
+        calls = mock.Mock()
+        with mock.patch('assets.ingest.rollups.lock_assets', calls.lock), \
+                mock.patch('assets.ingest.update_latest_prices', calls.update):
+            save_quotes(tasks.parse_quotes(feed(price_eur=('705,000', '2025-01-01 12:02:00'))))
+
+        self.assertEqual([name for name, _, _ in calls.mock_calls], ['lock', 'update'])
+
+    def test_deleting_the_newest_log_moves_the_snapshot_back(self):
+        """Test that the snapshot falls back to the newest remaining log, and goes once none is left."""
+        save_quotes(tasks.parse_quotes(feed(price_eur=('700,000', '2025-01-01 12:00:00'))))
+        save_quotes(tasks.parse_quotes(feed(price_eur=('705,000', '2025-01-01 12:02:00'))))
+
+        AssetPriceLog.objects.filter(price=Decimal('705000')).delete()
+        self.assertEqual(AssetLatestPrice.objects.get(asset_id='price_eur').price, Decimal('700000'))
+
+        AssetPriceLog.objects.all().delete()
+        self.assertFalse(AssetLatestPrice.objects.exists())
+
+
+class ScrapeAssetsPricesTest(TestCase):
+    """Test suite for the asset scraping task."""
+
+    def setUp(self):
+        cache.clear()
+
+    @mock.patch.object(tasks.stream, 'publish')
+    @mock.patch.object(tasks, 'BASE_API_ASSETS', 'https://feed.example/ajax.json')
+    @mock.patch.object(tasks.client, 'session')
+    def test_task_reports_inserted_and_duplicate_logs(self, session, publish):
+        """Test that the task summary separates new logs from duplicates and only new ones are streamed."""
+        Asset.objects.create(symbol='price_eur', name_fa='یورو', name_en='Euro (Market)', category='CURRENCY_IRR')
+        AssetPriceLog.objects.create(
+            asset_id='price_eur', price=1, high=1, low=1, change_amount=0, change_percent=0,
+            timestamp=tasks.parse_quotes(feed(price_eur=('1', '2025-01-01 12:00:00')))[0]['timestamp'])
+        body = feed(price_eur=('700,000', '2025-01-01 12:00:00'), price_dollar_rl=('600,000', '2025-01-01 12:00:00'))
+        session.get.return_value = mock.Mock(
+            status_code=200, headers={}, content=str(body).encode(), json=mock.Mock(return_value=body))
+
+        result = tasks.scrape_assets_prices()
+
+        self.assertIn("Created 1 new price logs, skipped 1 duplicates", result)
+        self.assertEqual(AssetPriceLog.objects.count(), 2)
+        self.assertEqual([quote['symbol'] for quote in publish.call_args.args[0]], ['price_dollar_rl'])
+
+    @mock.patch.object(tasks, 'BASE_API_ASSETS', 'https://feed.example/ajax.json')
+    @mock.patch.object(tasks.client, 'session')
+    def test_unchanged_symbols_are_dropped_before_parsing(self, session):
+        """Test that symbols whose ts and price were already ingested cost no parsing and no writes."""
+        first = feed(price_eur=('700,000', '2025-01-01 12:00:00'), price_dollar_rl=('600,000', '2025-01-01 12:00:00'))
+        second = feed(price_eur=('700,000', '2025-01-01 12:00:00'), price_dollar_rl=('601,000', '2025-01-01 12:02:00'))
+        session.get.side_effect = [
+            mock.Mock(status_code=200, headers={}, content=str(body).encode(), json=mock.Mock(return_value=body))
+            for body in (first, second)
+        ]
+        tasks.scrape_assets_prices()
+
+        with mock.patch.object(tasks, 'parse_quotes', wraps=tasks.parse_quotes) as parse_quotes:
+            result = tasks.scrape_assets_prices()
+
+        self.assertIn("1 of 2 symbols changed", result)
+        self.assertEqual(list(parse_quotes.call_args.args[0]['current']), ['price_dollar_rl'])
+        self.assertEqual(AssetPriceLog.objects.count(), 3)
+
+
+class LastSeenTest(TestCase):
+    """Test suite for the symbol -> last ingested quote map."""
+
+    def setUp(self):
+        cache.clear()
+
+    def test_cold_start_rebuilds_from_latest_logs(self):
+        """Test that the map is rebuilt from the newest log of each asset, in feed format."""
+        save_quotes(tasks.parse_quotes(feed(price_eur=('700,000', '2025-01-01 12:00:00'))))
+        save_quotes(tasks.parse_quotes(feed(price_eur=('705,000', '2025-01-01 12:02:00'))))
+
+        self.assertEqual(ticks.last_seen(), {'price_eur': ('2025-01-01 12:02:00', Decimal('705000'))})
+        current = feed(price_eur=('705,000', '2025-01-01 12:02:00'), price_aed=('160,000', '2025-01-01 12:02:00'))
+        self.assertEqual(list(tasks.changed_symbols(current['current'])), ['price_aed'])
@@ -2,7 +2,10 @@ from django.urls import reverse
 from rest_framework import status
 from rest_framework.test import APITestCase
 from django.contrib.auth import get_user_model
-from assets.models import Asset
+import msgpack
+from datetime import timedelta
+from django.utils import timezone
+from assets.models import Asset, AssetCandle, AssetPriceLog
 
 
 User = get_user_model()
@@ -48,6 +51,19 @@ class AssetAPITests(APITestCase):
         self.assertEqual(len(response.data), 1)
         self.assertEqual(response.data[0]['symbol'], self.asset2.symbol)
 
+    def test_list_reads_latest_price_snapshot_not_history(self):
+        """Ensure listing costs one query however long the price history is."""
+        start = timezone.now() - timedelta(days=1)
+        for minutes in range(0, 50):
+            AssetPriceLog.objects.create(
+                asset=self.asset1, price=100 + minutes, high=0, low=0, change_amount=0, change_percent=0,
+                timestamp=start + timedelta(minutes=minutes))
+
+        with self.assertNumQueries(1):
+            response = self.client.get(self.list_create_url)
+        gold = next(asset for asset in response.data if asset['symbol'] == 'gold_spot')
+        self.assertEqual(float(gold['latest_price']['price']), 149)
+
     # --- CREATE (POST) Tests ---
     def test_regular_user_cannot_create_asset(self):
         """Ensure regular users are forbidden from creating an asset."""
@@ -81,3 +97,87 @@ class AssetAPITests(APITestCase):
         response = self.client.delete(self.detail_url)
         self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
         self.assertEqual(Asset.objects.count(), 1)
+
+
+class AssetHistoryAPITests(APITestCase):
+    """
+    Test suite for the asset history endpoint.
+    """
+
+    def setUp(self):
+        self.asset = Asset.objects.create(symbol="price_eur", name_fa="یورو", name_en="Euro")
+        start = timezone.now().replace(hour=8, minute=0, second=0, microsecond=0) - timedelta(days=3)
+        for minutes in range(0, 3 * 24 * 60, 120):
+            AssetPriceLog.objects.create(
+                asset=self.asset, price=1000 + minutes, high=0, low=0, change_amount=0, change_percent=0,
+                timestamp=start + timedelta(minutes=minutes))
+        self.url = reverse('asset-history', kwargs={'pk': self.asset.pk})
+
+    def test_raw_history_is_the_default(self):
+        """Ensure the endpoint still returns raw logs when no interval is given."""
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data['results']), 36)
+        self.assertEqual(set(response.data['results'][0]), {'price', 'high', 'low', 'timestamp'})
+
+    def test_daily_candles(self):
+        """Ensure interval=1d returns one OHLC candle per Tehran day."""
+        response = self.client.get(self.url, {'interval': '1d'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn(len(response.data['results']), (3, 4))
+        self.assertEqual(set(response.data['results'][0]), {'open', 'high', 'low', 'close', 'timestamp'})
+        self.assertEqual(sum(1 for _ in response.data['results']), AssetCandle.objects.filter(interval='1d').count())
+
+    def test_auto_interval_uses_the_date_range(self):
+        """Ensure interval=auto picks daily candles for a year and raw logs for a few hours."""
+        today = timezone.localdate()
+        year = self.client.get(self.url, {'interval': 'auto', 'start_date': today - timedelta(days=365)})
+        self.assertIn('close', year.data['results'][0])
+        day = self.client.get(self.url, {'interval': 'auto', 'start_date': today, 'end_date': today})
+        self.assertTrue(all('close' in point for point in day.data['results']))
+
+    def test_unknown_interval_is_rejected(self):
+        """Ensure an unsupported interval is a 400."""
+        response = self.client.get(self.url, {'interval': '1w'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_date_range_is_inclusive_in_tehran_time(self):
+        """Ensure start_date and end_date select whole Tehran days, both ends included."""
+        day = timezone.localdate() - timedelta(days=2)
+        response = self.client.get(self.url, {'start_date': day, 'end_date': day})
+        timestamps = [timezone.localtime(log.timestamp).date() for log in AssetPriceLog.objects.all()]
+        self.assertEqual(len(response.data['results']), timestamps.count(day))
+        self.assertTrue(response.data['results'])
+
+    def test_history_is_paginated_by_cursor(self):
+        """Ensure following `next` walks the whole history newest first, without repeats."""
+        response = self.client.get(self.url, {'page_size': 10})
+        pages = [response.data['results']]
+        while response.data['next']:
+            with self.assertNumQueries(2):
+                response = self.client.get(response.data['next'])
+            pages.append(response.data['results'])
+
+        self.assertEqual([len(page) for page in pages], [10, 10, 10, 6])
+        timestamps = [point['timestamp'] for page in pages for point in page]
+        self.assertEqual(timestamps, sorted(set(timestamps), reverse=True))
+
+    def test_columnar_formats_match_the_json_points(self):
+        """Ensure columnar JSON and MessagePack carry the same points as parallel arrays."""
+        points = self.client.get(self.url, {'page_size': 5}).data['results']
+        columnar = self.client.get(self.url, {'page_size': 5, 'format': 'columnar'})
+        self.assertEqual(columnar['Content-Type'], 'application/vnd.price.columnar+json')
+        columns = columnar.json()['results']
+        self.assertEqual(set(columns), {'timestamp', 'price', 'high', 'low'})
+        self.assertEqual(columns['price'], [float(point['price']) for point in points])
+        self.assertEqual(columns['timestamp'], [int(log.timestamp.timestamp()) for log in AssetPriceLog.objects.all()[:5]])
+        self.assertIn('cursor=', columnar.json()['next'])
+
+        packed = self.client.get(self.url, {'page_size': 5}, HTTP_ACCEPT='application/msgpack')
+        self.assertEqual(packed['Content-Type'], 'application/msgpack')
+        self.assertEqual(msgpack.unpackb(packed.content)['results'], columns)
+
+    def test_candles_as_columns(self):
+        """Ensure candle columns name the bucket start `timestamp`."""
+        response = self.client.get(self.url, {'interval': '1d', 'format': 'columnar'})
+        self.assertEqual(set(response.json()['results']), {'timestamp', 'open', 'high', 'low', 'close'})
@@ -0,0 +1,35 @@
+import pytz
+from django.core.cache import cache
+from .models import AssetLatestPrice
+
+
+LAST_SEEN_KEY = 'assets:last-seen'
+# Feed timestamps are Tehran wall-clock times in this format.
+TS_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+
+def _from_db():
+    """ Builds the symbol -> (feed ts, price) map from the latest-price snapshot of every asset. """
+    tehran_tz = pytz.timezone('Asia/Tehran')
+    rows = AssetLatestPrice.objects.values_list('asset_id', 'timestamp', 'price')
+    return {symbol: (timestamp.astimezone(tehran_tz).strftime(TS_FORMAT), price) for symbol, timestamp, price in rows}
+
+
+def last_seen():
+    """
+    Returns {symbol: (feed ts, price)} of the last quote ingested per symbol.
+
+    The map lives in the cache under one key, so every worker shares it. After a
+    cold start or an eviction it is rebuilt from the latest-price snapshots.
+    """
+    seen = cache.get(LAST_SEEN_KEY)
+    if seen is None:
+        seen = _from_db()
+        cache.set(LAST_SEEN_KEY, seen, timeout=None)
+    return seen
+
+
+def remember(entries):
+    """ Records {symbol: (feed ts, price)} of quotes that were just ingested. """
+    if entries:
+        cache.set(LAST_SEEN_KEY, {**last_seen(), **entries}, timeout=None)
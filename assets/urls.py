@@ -1,10 +1,11 @@
 from django.urls import path
-from .views import AssetHistoryAPIView, AssetListCreateAPIView, AssetDetailAPIView, MonitoredAssetListView
+from .views import AssetHistoryAPIView, AssetListCreateAPIView, AssetDetailAPIView, MonitoredAssetListView, asset_stream
 
 urlpatterns = [
     path('assets/', AssetListCreateAPIView.as_view(), name='asset-list-create'),
     # Use <str:pk> because the primary key is the symbol (a string)
     path('assets/monitored/', MonitoredAssetListView.as_view(), name='asset-monitored-list'),
+    path('assets/stream/', asset_stream, name='asset-stream'),
     path('assets/<str:pk>/', AssetDetailAPIView.as_view(), name='asset-detail'),
     path('assets/<str:pk>/history/', AssetHistoryAPIView.as_view(), name='asset-history'),
 ]
@@ -1,13 +1,17 @@
-from django.http import Http404
+from django.http import Http404, JsonResponse, StreamingHttpResponse
 from django.db.models import Q
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
 from django.utils.dateparse import parse_date
+from datetime import datetime, time, timedelta
 
+from . import rollups, stream
 from .models import Asset
-from .serializers import AssetPriceLogSerializer, AssetSerializer, AssetWriteSerializer
+from .pagination import HistoryCursorPagination
+from .serializers import AssetCandleSerializer, AssetPriceLogSerializer, AssetSerializer, AssetWriteSerializer
 from permissions import IsAdminOrReadOnly
+from renderers import TIME_SERIES_RENDERERS, to_columns, wants_columns
 
 
 
@@ -21,7 +25,7 @@ class AssetListCreateAPIView(APIView):
     permission_classes = [IsAdminOrReadOnly]
 
     def get(self, request, format=None):
-        assets = Asset.objects.prefetch_related('price_logs').all()
+        assets = Asset.objects.select_related('latest_quote').all()
 
         # Filtering by Category
         category = request.query_params.get('category', None)
@@ -58,7 +62,7 @@ class AssetDetailAPIView(APIView):
     def get_object(self, pk):
         try:
             # The primary key for Asset is the 'symbol' field
-            return Asset.objects.prefetch_related('price_logs').get(pk=pk)
+            return Asset.objects.select_related('latest_quote').get(pk=pk)
         except Asset.DoesNotExist:
             raise Http404
 
@@ -92,7 +96,7 @@ class MonitoredAssetListView(APIView):
 
 
     def get(self, request, format=None):
-        monitored_assets = Asset.objects.filter(is_monitored=True).prefetch_related('price_logs')
+        monitored_assets = Asset.objects.filter(is_monitored=True).select_related('latest_quote')
         
         serializer = self.serializer_class(monitored_assets, many=True)
         return Response(serializer.data)
@@ -100,9 +104,17 @@ class MonitoredAssetListView(APIView):
 
 class AssetHistoryAPIView(APIView):
     """
-    A read-only endpoint to get the price history for a single asset.
+    A read-only endpoint to get the price history for a single asset, newest first.
+    - Filter by date with `?start_date=YYYY-MM-DD&end_date=YYYY-MM-DD` (Tehran days, both inclusive)
+    - Pick a resolution with `?interval=raw|5m|1h|1d|auto` (default `raw`).
+      Candle intervals return OHLC candles; `auto` picks the finest resolution
+      that covers the date range in a few hundred points.
+    - Results are paginated by cursor: follow `next`, and set `?page_size=` up to the configured maximum.
+    - `?format=columnar` (JSON) or `?format=msgpack`, or the matching Accept header, return the
+      page as parallel arrays, with timestamps in Unix seconds and prices as numbers.
     """
     permission_classes = [IsAdminOrReadOnly]
+    renderer_classes = TIME_SERIES_RENDERERS
     serializer_class = AssetPriceLogSerializer
 
     def get(self, request, pk, format=None):
@@ -112,23 +124,74 @@ class AssetHistoryAPIView(APIView):
             return Response({"error": "Asset not found"}, status=status.HTTP_404_NOT_FOUND)
 
         # Get the date range from the URL query parameters
-        start_date_str = request.query_params.get('start_date')
-        end_date_str = request.query_params.get('end_date')
-
-        # Start with all price logs for this asset
-        price_logs = asset.price_logs.all()
-
-        # Filter by start date if provided
-        if start_date_str:
-            start_date = parse_date(start_date_str)
-            if start_date:
-                price_logs = price_logs.filter(timestamp__date__gte=start_date)
-
-        # Filter by end date if provided
-        if end_date_str:
-            end_date = parse_date(end_date_str)
-            if end_date:
-                price_logs = price_logs.filter(timestamp__date__lte=end_date)
-        
-        serializer = self.serializer_class(price_logs, many=True)
-        return Response(serializer.data)
+        start_date = parse_date(request.query_params.get('start_date') or '')
+        end_date = parse_date(request.query_params.get('end_date') or '')
+        start, end = self.date_bounds(start_date, end_date)
+
+        interval = request.query_params.get('interval', 'raw')
+        if interval == 'auto':
+            interval = self.auto_interval(asset, start, end)
+        if interval == 'raw':
+            # Start with all price logs for this asset
+            history, field, serializer_class = asset.price_logs.all(), 'timestamp', self.serializer_class
+        elif interval in rollups.INTERVALS:
+            history, field, serializer_class = asset.candles.filter(interval=interval), 'bucket', AssetCandleSerializer
+        else:
+            choices = ', '.join(['raw', *rollups.INTERVALS, 'auto'])
+            return Response({"error": f"interval must be one of: {choices}"}, status=status.HTTP_400_BAD_REQUEST)
+
+        # Plain bounds on the column keep the (asset, timestamp) index usable, unlike casting it to a date.
+        if start:
+            history = history.filter(**{f'{field}__gte': start})
+        if end:
+            history = history.filter(**{f'{field}__lt': end})
+
+        paginator = HistoryCursorPagination(field)
+        if wants_columns(request):
+            # Plain rows are enough for the cursor and skip building a model and serializer per point.
+            fields = [name for name in serializer_class.Meta.fields if name != 'timestamp']
+            page = paginator.paginate_queryset(history.values(field, *fields), request, view=self)
+            columns = to_columns(page, [field, *fields])
+            return paginator.get_paginated_response({'timestamp': columns.pop(field), **columns})
+
+        page = paginator.paginate_queryset(history, request, view=self)
+        serializer = serializer_class(page, many=True)
+        return paginator.get_paginated_response(serializer.data)
+
+    @staticmethod
+    def date_bounds(start_date, end_date):
+        """ Turns an inclusive range of Tehran dates into half-open [start, end) timestamps; None is unbounded. """
+        start = rollups.TEHRAN_TZ.localize(datetime.combine(start_date, time())) if start_date else None
+        end = rollups.TEHRAN_TZ.localize(datetime.combine(end_date + timedelta(days=1), time())) if end_date else None
+        return start, end
+
+    @staticmethod
+    def auto_interval(asset, start, end):
+        """ Picks the resolution for the requested range; an open start means since the first log. """
+        if start is None:
+            start = asset.price_logs.order_by('timestamp').values_list('timestamp', flat=True).first()
+            if start is None:
+                return 'raw'
+        return rollups.pick_interval(start, end)
+
+
+async def asset_stream(request):
+    """
+    Streams asset quotes as server-sent events while the scraper writes them (ASGI only).
+    - Follow some assets with `?symbols=price_eur,sekee` and/or `?categories=GOLD,COIN`;
+      without either, every changed quote is streamed.
+    - Each `quotes` event carries a JSON list of the changed quotes the client follows.
+    """
+    symbols = [symbol for symbol in request.GET.get('symbols', '').split(',') if symbol]
+    categories = [category.upper() for category in request.GET.get('categories', '').split(',') if category]
+    unknown = set(categories) - {choice for choice, _ in Asset.CATEGORY_CHOICES}
+    if unknown:
+        return JsonResponse({"error": f"Unknown categories: {', '.join(sorted(unknown))}"}, status=400)
+
+    hub = stream.hub()
+    subscriber = hub.subscribe(symbols, categories)
+    response = StreamingHttpResponse(hub.events(subscriber), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    # Tells nginx not to buffer the stream.
+    response['X-Accel-Buffering'] = 'no'
+    return response
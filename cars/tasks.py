@@ -1,13 +1,93 @@
+import json
+import logging
 import requests
+from datetime import datetime
 from celery import shared_task
 from django.utils import timezone
 from fake_useragent import UserAgent
+from scraping.extract import Extractor, Field
+from scraping.http import HttpClient
+from scraping.instrumentation import count_items, count_rows
+from scraping.ratelimit import limited_session
 from decouple import config
 from .models import Brand, Vehicle, PriceLog
 
+logger = logging.getLogger(__name__)
 ua = UserAgent()
+client = HttpClient(limited_session(), archive_source='cars')
+
 BASE_API_URL_CAR = config('BASE_API_URL_CAR')
 
+DAILY_CAR_FIELDS = Extractor({
+    'brand_fa': ('car_properties', 'brand', 'title'),
+    'brand_en': ('car_properties', 'brand', 'title_en'),
+    'model_fa': ('car_properties', 'model', 'title'),
+    'model_en': ('car_properties', 'model', 'title_en'),
+    'trim_fa': ('car_properties', 'trim', 'title'),
+    'trim_en': ('car_properties', 'trim', 'title_en'),
+    'year': ('car_properties', 'year', 'title'),
+    'option_fa': ('car_properties', 'option', 'title'),
+    'price': Field('price', default=None),
+})
+
+
+def save_car_page(data, log_date):
+    """ Writes the vehicles of one Khodro45 page and returns how many new price logs it created. """
+    created_count, existing_count = 0, 0
+    car_groups = data.get('results', [])
+    for car_group in car_groups:
+        cars = DAILY_CAR_FIELDS.many(car_group.get('dailycars', []))
+        count_items(len(cars))
+        for car in cars:
+            brand_fa, brand_en = car['brand_fa'], car['brand_en']
+            model_fa, model_en = car['model_fa'], car['model_en']
+            trim_fa, trim_en = car['trim_fa'], car['trim_en']
+            year, option_fa, price = car['year'], car['option_fa'], car['price']
+
+            # Skip record if essential data is missing
+            if not all([brand_fa, model_fa, trim_fa, year, price]):
+                continue
+
+            # Use 'defaults' to add the English name only when creating a new brand
+            brand_obj, _ = Brand.objects.get_or_create(
+                name_fa=(brand_fa or '').strip(),
+                defaults={'name_en': (brand_en or '').strip()}
+            )
+
+            # Use 'defaults' to add English details on vehicle creation
+            vehicle_obj, _ = Vehicle.objects.get_or_create(
+                brand=brand_obj,
+                model_fa=(model_fa or '').strip(),
+                trim_fa=(trim_fa or '').strip(),
+                production_year=int(year),
+                specifications_fa=(option_fa or '').strip(),
+                defaults={
+                    'model_en': (model_en or '').strip(),
+                    'trim_en': (trim_en or '').strip(),
+                }
+            )
+
+            _, price_log_created = PriceLog.objects.get_or_create(
+                vehicle=vehicle_obj,
+                log_date=log_date,
+                defaults={'price': price} 
+            )
+            if price_log_created:
+                created_count += 1
+            else:
+                existing_count += 1
+    count_rows(inserted=created_count, skipped=existing_count)
+    return created_count
+
+
+def parse_archived(record):
+    """ Returns an archived Khodro45 page and the date it was scraped on, for `reparse_archive`. """
+    return [(json.loads(record['body']), datetime.fromisoformat(record['fetched_at']).date())]
+
+
+def save_archived(pages):
+    """ Writes re-parsed Khodro45 pages with the price date of their original scrape. """
+    return {'price_logs_created': sum(save_car_page(data, log_date) for data, log_date in pages)}
 
 
 @shared_task
@@ -26,64 +106,15 @@ def scrape_car_prices():
     vehicles_processed_count = 0
 
     while page_url:
-        print(f"Fetching car data from: {page_url}")
+        logger.info(f"Fetching car data from: {page_url}")
         try:
-            response = requests.get(page_url, headers=HEADERS)
-            response.raise_for_status()
-            data = response.json()
+            data = client.get_json(page_url, headers=HEADERS)
         except requests.RequestException as e:
-            print(f"Error fetching API: {e}")
+            # Retries are exhausted, and the next page's URL comes from this one.
+            logger.error(f"Giving up on car prices at {page_url}: {e}")
             break
 
-        car_groups = data.get('results', [])
-        for car_group in car_groups:
-            for daily_car in car_group.get('dailycars', []):
-                
-                props = daily_car.get('car_properties', {})
-                brand_props = props.get('brand', {})
-                brand_fa = brand_props.get('title')
-                brand_en = brand_props.get('title_en')
-                model_props = props.get('model', {})
-                model_fa = model_props.get('title')
-                model_en = model_props.get('title_en')
-                trim_props = props.get('trim', {})
-                trim_fa = trim_props.get('title')
-                trim_en = trim_props.get('title_en')
-                year = props.get('year', {}).get('title')
-                option_fa = props.get('option', {}).get('title')
-                price = daily_car.get('price')
-
-                # Skip record if essential data is missing
-                if not all([brand_fa, model_fa, trim_fa, year, price]):
-                    continue
-
-                # Use 'defaults' to add the English name only when creating a new brand
-                brand_obj, _ = Brand.objects.get_or_create(
-                    name_fa=(brand_fa or '').strip(),
-                    defaults={'name_en': (brand_en or '').strip()}
-                )
-
-                # Use 'defaults' to add English details on vehicle creation
-                vehicle_obj, _ = Vehicle.objects.get_or_create(
-                    brand=brand_obj,
-                    model_fa=(model_fa or '').strip(),
-                    trim_fa=(trim_fa or '').strip(),
-                    production_year=int(year),
-                    specifications_fa=(option_fa or '').strip(),
-                    defaults={
-                        'model_en': (model_en or '').strip(),
-                        'trim_en': (trim_en or '').strip(),
-                    }
-                )
-
-                _, price_log_created = PriceLog.objects.get_or_create(
-                    vehicle=vehicle_obj,
-                    log_date=timezone.now().date(),
-                    defaults={'price': price} 
-                )
-                if price_log_created:
-                    vehicles_processed_count += 1
-
+        vehicles_processed_count += save_car_page(data, timezone.now().date())
         page_url = data.get('next')
 
     return f"Car scraping finished. Processed {vehicles_processed_count} new price logs."
\ No newline at end of file
@@ -2,7 +2,8 @@ from django.urls import reverse
 from rest_framework import status
 from rest_framework.test import APITestCase
 from django.contrib.auth import get_user_model
-from cars.models import Brand, Vehicle
+from datetime import date
+from cars.models import Brand, PriceLog, Vehicle
 
 
 User = get_user_model()
@@ -148,3 +149,16 @@ class VehicleAPITests(APITestCase):
         response = self.client.delete(self.detail_url)
         self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
         self.assertFalse(Vehicle.objects.filter(pk=self.vehicle.pk).exists())
+
+    def test_price_logs_as_columns(self):
+        """Test that price logs are served newest first, as objects or as parallel columns."""
+        PriceLog.objects.create(vehicle=self.vehicle, price=1_500_000_000, log_date=date(2025, 1, 1))
+        PriceLog.objects.create(vehicle=self.vehicle, price=1_600_000_000, log_date=date(2025, 1, 2))
+        url = reverse('vehicle-price-logs', kwargs={'pk': self.vehicle.pk})
+
+        response = self.client.get(url)
+        self.assertEqual(response.data[0], {'price': 1_600_000_000, 'log_date': '2025-01-02'})
+        response = self.client.get(url, {'format': 'columnar'})
+        self.assertEqual(response['Content-Type'], 'application/vnd.price.columnar+json')
+        self.assertEqual(response.json(), {'log_date': ['2025-01-02', '2025-01-01'], 'price': [1_600_000_000, 1_500_000_000]})
+        self.assertEqual(self.client.get(reverse('vehicle-price-logs', kwargs={'pk': 0})).status_code, status.HTTP_404_NOT_FOUND)
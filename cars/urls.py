@@ -9,4 +9,5 @@ urlpatterns = [
     # Vehicle URLs
     path('vehicles/', views.VehicleListCreateAPIView.as_view(), name='vehicle-list-create'),
     path('vehicles/<int:pk>/', views.VehicleDetailAPIView.as_view(), name='vehicle-detail'),
+    path('vehicles/<int:pk>/price-logs/', views.VehiclePriceLogAPIView.as_view(), name='vehicle-price-logs'),
 ]
@@ -4,9 +4,10 @@ from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
 
-from .models import Brand, Vehicle
-from .serializers import BrandSerializer, VehicleSerializer, VehicleWriteSerializer
+from .models import Brand, PriceLog, Vehicle
+from .serializers import BrandSerializer, PriceLogSerializer, VehicleSerializer, VehicleWriteSerializer
 from permissions import IsAdminOrReadOnly
+from renderers import TIME_SERIES_RENDERERS, to_columns, wants_columns
 
 
 
@@ -125,4 +126,24 @@ class VehicleDetailAPIView(APIView):
     def delete(self, request, pk, format=None):
         vehicle = self.get_object(pk)
         vehicle.delete()
-        return Response(status=status.HTTP_204_NO_CONTENT)
\ No newline at end of file
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+class VehiclePriceLogAPIView(APIView):
+    """
+    Price history of a vehicle, newest first.
+    - `?format=columnar` (JSON) or `?format=msgpack`, or the matching Accept header, return
+      parallel arrays of dates and prices.
+    """
+    permission_classes = [IsAdminOrReadOnly]
+    renderer_classes = TIME_SERIES_RENDERERS
+
+    def get(self, request, pk, format=None):
+        if not Vehicle.objects.filter(pk=pk).exists():
+            raise Http404
+        logs = PriceLog.objects.filter(vehicle_id=pk).order_by('-log_date')
+        if wants_columns(request):
+            fields = PriceLogSerializer.Meta.fields
+            return Response(to_columns(logs.values_list(*fields), fields))
+        serializer = PriceLogSerializer(logs, many=True)
+        return Response(serializer.data)
@@ -44,6 +44,7 @@ INSTALLED_APPS = [
     'motorcycles',
     'assets',
     'products',
+    'scraping',
     #third-party-apps
     'rest_framework',
     'rest_framework_simplejwt.token_blacklist',
@@ -106,6 +107,17 @@ DATABASES = {
 AUTH_USER_MODEL = "accounts.CustomUser"
 
 
+# Cache
+# Shared between the web app and the Celery workers (e.g. for scraper cache invalidation)
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': f"redis://{config('REDIS_HOST', default='redis')}:{config('REDIS_PORT', default=6379)}/1",
+    }
+}
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
@@ -148,6 +160,9 @@ STATIC_ROOT = BASE_DIR / "staticfiles"
 MEDIA_URL = 'media/'
 MEDIA_ROOT = BASE_DIR/'media'
 
+# Raw upstream responses are archived here for re-parsing (see scraping.archive); empty disables it.
+SCRAPE_ARCHIVE_DIR = config('SCRAPE_ARCHIVE_DIR', default='')
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
@@ -280,4 +295,14 @@ CELERY_BEAT_SCHEDULE = {
         'task': 'products.tasks.run_all_products_scrape',
         'schedule': crontab(minute='*/2'),
     },
+    # Refresh the products whose volatility-based schedule says they are due.
+    'dispatch-due-products-every-2-minutes': {
+        'task': 'products.tasks.dispatch_due_products',
+        'schedule': crontab(minute='*/2'),
+    },
+    # Create next months' price log partitions and expire old ones (see scraping.partitions).
+    'maintain-price-log-partitions-every-day': {
+        'task': 'scraping.tasks.maintain_partitions',
+        'schedule': crontab(hour=5, minute=15),
+    },
 }
\ No newline at end of file
@@ -17,6 +17,7 @@ Including another URLconf
 from django.contrib import admin
 from django.urls import path, include
 from drf_spectacular.views import SpectacularAPIView, SpectacularRedocView, SpectacularSwaggerView
+from scraping.views import metrics_view
 
 
 urlpatterns = [
@@ -35,4 +36,7 @@ urlpatterns = [
     
     # Serves the alternative Redoc documentation
     path('api/redoc/', SpectacularRedocView.as_view(url_name='schema'), name='redoc'),
+
+    # Prometheus metrics; nginx keeps this internal to the compose network
+    path('metrics/', metrics_view, name='metrics'),
 ]
@@ -0,0 +1,16 @@
+# Generated by Django 5.2 on 2026-10-17 18:05
+
+from django.db import migrations
+from scraping.partitions import partition_by_month
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('motorcycles', '0001_initial'),
+    ]
+
+    operations = [
+        # PostgreSQL only: the table becomes range-partitioned by month. Reversing leaves it partitioned.
+        migrations.RunPython(partition_by_month('motorcycles.motorcyclepricelog'), migrations.RunPython.noop),
+    ]
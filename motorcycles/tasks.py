@@ -1,14 +1,88 @@
+import json
+import logging
 import requests
+from datetime import datetime
 from celery import shared_task
 from django.utils import timezone
 from fake_useragent import UserAgent
+from scraping.extract import Extractor, Field
+from scraping.http import HttpClient
+from scraping.instrumentation import count_items, count_rows
+from scraping.ratelimit import limited_session
 from decouple import config
 from .models import MotorcycleBrand, Motorcycle, MotorcyclePriceLog
 
+logger = logging.getLogger(__name__)
 ua = UserAgent()
+client = HttpClient(limited_session(), archive_source='motorcycles')
+# The scrape ends after this many pages in a row fail even after retries.
+MAX_CONSECUTIVE_FAILED_PAGES = 3
+
+MOTORCYCLE_FIELDS = Extractor({
+    'brand_fa': 'brand_fa',
+    'brand_en': 'brand',  # The english slug from API
+    'model_fa': 'model_fa',
+    'model_en': 'model',  # The english slug from API
+    'trim_fa': 'class',
+    'production_year': Field('model_year', default=None),
+    'origin': ('manufacture_type', 'display_name'),
+    'source': 'price_provider',
+    'price': Field('price', default=None),
+})
 BASE_API_URL_MOTOR = config('BASE_API_URL_MOTOR')
 
 
+def save_motorcycle_page(brand_groups, log_date):
+    """ Writes the motorcycles of one Bama page and returns how many price logs it processed. """
+    processed_count, created_count = 0, 0
+    items = MOTORCYCLE_FIELDS.many([i for brand in brand_groups for i in brand.get('items', [])])
+    count_items(len(items))
+    for item in items:
+        brand_fa, brand_en = item['brand_fa'], item['brand_en']
+        model_fa, model_en = item['model_fa'], item['model_en']
+        price = item['price']
+
+        if not all([brand_fa, model_fa, price]):
+            continue
+        
+        # Use 'defaults' to add English name only when creating a new brand
+        brand_obj, _ = MotorcycleBrand.objects.get_or_create(
+            name_fa=(brand_fa or '').strip(),
+            defaults={'name_en_slug': (brand_en or '').strip()}
+        )
+        
+        motorcycle_obj, _ = Motorcycle.objects.get_or_create(
+            brand=brand_obj,
+            model_fa=(model_fa or '').strip(),
+            trim_fa=(item['trim_fa'] or '').strip() or None,
+            production_year=item['production_year'],
+            # Use defaults to add English model slug and origin on creation
+            defaults={
+                'model_en_slug': (model_en or '').strip(),
+                'origin': (item['origin'] or '').strip()
+            }
+        )
+
+        _, price_log_created = MotorcyclePriceLog.objects.get_or_create(
+            motorcycle=motorcycle_obj,
+            log_date=log_date,
+            source=(item['source'] or 'Unknown').strip(),
+            defaults={'price': price}
+        )
+        processed_count += 1
+        created_count += price_log_created
+    count_rows(inserted=created_count, skipped=processed_count - created_count)
+    return processed_count
+
+
+def parse_archived(record):
+    """ Returns an archived Bama page and the date it was scraped on, for `reparse_archive`. """
+    return [(json.loads(record['body']).get('data', []), datetime.fromisoformat(record['fetched_at']).date())]
+
+
+def save_archived(pages):
+    """ Writes re-parsed Bama pages with the price date of their original scrape. """
+    return {'price_logs_processed': sum(save_motorcycle_page(groups, log_date) for groups, log_date in pages)}
 
 
 @shared_task
@@ -25,60 +99,30 @@ def scrape_motorcycle_prices():
     
     page_index = 1
     processed_count = 0
+    failed_pages = 0
     
     while True:
         params = {'pageIndex': page_index, 'pageSize': 3}
         
-        print(f"Fetching Bama motorcycle data, page {page_index}...")
+        logger.info(f"Fetching Bama motorcycle data, page {page_index}...")
         try:
-            response = requests.get(BASE_API_URL_MOTOR, headers=HEADERS, params=params)
-            response.raise_for_status()
-            response_data = response.json()
+            response_data = client.get_json(BASE_API_URL_MOTOR, headers=HEADERS, params=params)
         except requests.RequestException as e:
-            print(f"Error fetching Bama API: {e}")
-            break
+            failed_pages += 1
+            logger.error(f"Skipping Bama page {page_index}: {e}")
+            if failed_pages >= MAX_CONSECUTIVE_FAILED_PAGES:
+                logger.error(f"{failed_pages} Bama pages in a row failed. Ending scrape.")
+                break
+            page_index += 1
+            continue
+        failed_pages = 0
 
         brand_groups = response_data.get('data', [])
         if not brand_groups:
-            print("No more data found. Ending scrape.")
+            logger.info("No more data found. Ending scrape.")
             break
 
-        for item in [i for brand in brand_groups for i in brand.get('items', [])]:
-            brand_fa = item.get('brand_fa')
-            brand_en = item.get('brand') # The english slug from API
-            model_fa = item.get('model_fa')
-            model_en = item.get('model') # The english slug from API
-            price = item.get('price')
-
-            if not all([brand_fa, model_fa, price]):
-                continue
-            
-            # Use 'defaults' to add English name only when creating a new brand
-            brand_obj, _ = MotorcycleBrand.objects.get_or_create(
-                name_fa=(brand_fa or '').strip(),
-                defaults={'name_en_slug': (brand_en or '').strip()}
-            )
-            
-            motorcycle_obj, _ = Motorcycle.objects.get_or_create(
-                brand=brand_obj,
-                model_fa=(model_fa or '').strip(),
-                trim_fa=(item.get('class') or '').strip() or None,
-                production_year=item.get('model_year'),
-                # Use defaults to add English model slug and origin on creation
-                defaults={
-                    'model_en_slug': (model_en or '').strip(),
-                    'origin': (item.get('manufacture_type', {}).get('display_name') or '').strip()
-                }
-            )
-
-            MotorcyclePriceLog.objects.get_or_create(
-                motorcycle=motorcycle_obj,
-                log_date=timezone.now().date(),
-                source=(item.get('price_provider') or 'Unknown').strip(),
-                defaults={'price': price}
-            )
-            processed_count += 1
-
+        processed_count += save_motorcycle_page(brand_groups, timezone.now().date())
         page_index += 1
 
     return f"Bama scraping finished. Processed {processed_count} price logs."
\ No newline at end of file
@@ -1,8 +1,10 @@
+import msgpack
+from datetime import date
 from django.urls import reverse
 from rest_framework import status
 from rest_framework.test import APITestCase
 from django.contrib.auth import get_user_model
-from ..models import MotorcycleBrand, Motorcycle
+from ..models import MotorcycleBrand, Motorcycle, MotorcyclePriceLog
 
 
 User = get_user_model()
@@ -135,4 +137,29 @@ class MotorcycleAPITests(APITestCase):
         self.client.force_authenticate(user=self.admin_user)
         response = self.client.delete(self.detail_url)
         self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
-        self.assertFalse(Motorcycle.objects.filter(pk=self.motorcycle.pk).exists())
\ No newline at end of file
+        self.assertFalse(Motorcycle.objects.filter(pk=self.motorcycle.pk).exists())
+
+    def test_price_logs_as_columns(self):
+        """Test that price logs are served as equally long columns in serializer field order."""
+        MotorcyclePriceLog.objects.create(motorcycle=self.motorcycle, price=900_000_000, log_date=date(2025, 1, 1), source='site')
+        MotorcyclePriceLog.objects.create(motorcycle=self.motorcycle, price=950_000_000, log_date=date(2025, 1, 2), source='site')
+        url = reverse('motorcycle-price-logs', kwargs={'pk': self.motorcycle.pk})
+
+        response = self.client.get(url, {'format': 'columnar'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response['Content-Type'], 'application/vnd.price.columnar+json')
+        columns = response.json()
+        self.assertEqual(list(columns), ['price', 'log_date', 'source'])
+        self.assertEqual({len(values) for values in columns.values()}, {2})
+        self.assertEqual(columns['log_date'], ['2025-01-02', '2025-01-01'])
+        self.assertEqual(columns['price'], [950_000_000, 900_000_000])
+
+    def test_price_logs_as_msgpack(self):
+        """Test that the MessagePack response decodes to the same columns as the columnar JSON."""
+        MotorcyclePriceLog.objects.create(motorcycle=self.motorcycle, price=900_000_000, log_date=date(2025, 1, 1), source='site')
+        url = reverse('motorcycle-price-logs', kwargs={'pk': self.motorcycle.pk})
+
+        response = self.client.get(url, HTTP_ACCEPT='application/msgpack')
+        self.assertEqual(response['Content-Type'], 'application/msgpack')
+        self.assertEqual(msgpack.unpackb(response.content), self.client.get(url, {'format': 'columnar'}).json())
+        self.assertEqual(msgpack.unpackb(response.content), {'price': [900_000_000], 'log_date': ['2025-01-01'], 'source': ['site']})
@@ -9,4 +9,5 @@ urlpatterns = [
     # Motorcycle URLs
     path('motorcycles/', views.MotorcycleListCreateAPIView.as_view(), name='motorcycle-list-create'),
     path('motorcycles/<int:pk>/', views.MotorcycleDetailAPIView.as_view(), name='motorcycle-detail'),
+    path('motorcycles/<int:pk>/price-logs/', views.MotorcyclePriceLogAPIView.as_view(), name='motorcycle-price-logs'),
 ]
@@ -4,13 +4,15 @@ from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
 
-from .models import MotorcycleBrand, Motorcycle
+from .models import MotorcycleBrand, Motorcycle, MotorcyclePriceLog
 from .serializers import (
     MotorcycleBrandSerializer, 
+    MotorcyclePriceLogSerializer,
     MotorcycleSerializer, 
     MotorcycleWriteSerializer
 )
 from permissions import IsAdminOrReadOnly
+from renderers import TIME_SERIES_RENDERERS, to_columns, wants_columns
 
 
 
@@ -129,4 +131,24 @@ class MotorcycleDetailAPIView(APIView):
     def delete(self, request, pk, format=None):
         motorcycle = self.get_object(pk)
         motorcycle.delete()
-        return Response(status=status.HTTP_204_NO_CONTENT)
\ No newline at end of file
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+class MotorcyclePriceLogAPIView(APIView):
+    """
+    Price history of a motorcycle, newest first.
+    - `?format=columnar` (JSON) or `?format=msgpack`, or the matching Accept header, return
+      parallel arrays of dates, prices and sources.
+    """
+    permission_classes = [IsAdminOrReadOnly]
+    renderer_classes = TIME_SERIES_RENDERERS
+
+    def get(self, request, pk, format=None):
+        if not Motorcycle.objects.filter(pk=pk).exists():
+            raise Http404
+        logs = MotorcyclePriceLog.objects.filter(motorcycle_id=pk).order_by('-log_date')
+        if wants_columns(request):
+            fields = MotorcyclePriceLogSerializer.Meta.fields
+            return Response(to_columns(logs.values_list(*fields), fields))
+        serializer = MotorcyclePriceLogSerializer(logs, many=True)
+        return Response(serializer.data)
@@ -3,7 +3,7 @@ from django.utils.html import format_html
 from django.db.models import Prefetch
 from .models import (
     Brand, Category, PriceHistory, Product, Variant, ProductImage,
-    ReviewAttribute, SpecGroup, SpecAttribute, ProductSpecification
+    ReviewAttribute, SpecGroup, SpecAttribute, ProductSpecification, ScrapeCycle
 )
 
 
@@ -262,4 +262,16 @@ class PriceHistoryAdmin(admin.ModelAdmin):
     date_hierarchy = 'timestamp'
     
     # Add pagination
-    list_per_page = 25
\ No newline at end of file
+    list_per_page = 25
+
+
+@admin.register(ScrapeCycle)
+class ScrapeCycleAdmin(admin.ModelAdmin):
+    list_display = ('id', 'product_type', 'status', 'products_seen', 'products_queued',
+                    'blocked_by', 'started_at', 'finished_at')
+    list_filter = ('status', 'product_type')
+    readonly_fields = ('product_type', 'status', 'products_seen', 'products_queued',
+                       'blocked_by', 'started_at', 'finished_at')
+    date_hierarchy = 'started_at'
+    ordering = ('-started_at',)
+    list_per_page = 25
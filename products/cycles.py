@@ -0,0 +1,138 @@
+import redis
+from decouple import config
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.core.cache.backends.redis import RedisCache
+from django.db.models import F
+from django.utils import timezone
+from .models import ScrapeCycle
+
+
+# Safety net: a lease is dropped after this many seconds even if its cycle never reports back.
+SCRAPE_LEASE_TIMEOUT = config('SCRAPE_LEASE_TIMEOUT', default=900, cast=int)
+# A product queued or refreshed within this many seconds is not queued again.
+PRODUCT_FRESHNESS_WINDOW = config('PRODUCT_FRESHNESS_WINDOW', default=300, cast=int)
+
+
+# Client for claiming products in one round trip, created on first use.
+_redis = None
+
+
+def _redis_client():
+    global _redis
+    if _redis is None:
+        _redis = redis.Redis.from_url(settings.CACHES['default']['LOCATION'])
+    return _redis
+
+
+def _uses_redis():
+    return isinstance(caches['default'], RedisCache)
+
+
+def _lease_key(product_type):
+    return f'products:scrape-lease:{product_type}'
+
+
+def _rerun_key(product_type):
+    return f'products:scrape-rerun:{product_type}'
+
+
+def _pending_key(cycle_id):
+    return f'products:scrape-pending:{cycle_id}'
+
+
+def _claim_key(product_id):
+    return f'products:detail-claim:{product_id}'
+
+
+def start(product_type):
+    """
+    Tries to take the scrape lease of `product_type` for a new cycle.
+
+    Returns:
+        The new cycle's ID, or None if the previous cycle is still in flight. In
+        that case the first overlapping cycle is merged into a single follow-up run
+        of the previous one, and any further ones are skipped.
+    """
+    cycle = ScrapeCycle.objects.create(product_type=product_type)
+    if cache.add(_lease_key(product_type), cycle.pk, timeout=SCRAPE_LEASE_TIMEOUT):
+        # The cycle's own list scrape is the first unit of pending work.
+        cache.set(_pending_key(cycle.pk), 1, timeout=SCRAPE_LEASE_TIMEOUT)
+        return cycle.pk
+
+    merged = cache.add(_rerun_key(product_type), 1, timeout=SCRAPE_LEASE_TIMEOUT)
+    ScrapeCycle.objects.filter(pk=cycle.pk).update(
+        status='merged' if merged else 'skipped',
+        blocked_by_id=cache.get(_lease_key(product_type)),
+        finished_at=timezone.now(),
+    )
+    return None
+
+
+def add_work(cycle_id, count=1):
+    """ Registers `count` more tasks that must finish before the cycle is over. """
+    try:
+        cache.incr(_pending_key(cycle_id), count)
+    except ValueError:
+        pass  # The lease already expired; the cycle is no longer tracked.
+
+
+def complete_work(cycle_id, product_type):
+    """
+    Marks one task of the cycle as done. The last one finishes the cycle and
+    releases the lease.
+
+    Returns:
+        True if a follow-up cycle was merged in while this one was running.
+    """
+    try:
+        remaining = cache.decr(_pending_key(cycle_id))
+    except ValueError:
+        remaining = 0
+    if remaining > 0:
+        return False
+
+    cache.delete(_pending_key(cycle_id))
+    ScrapeCycle.objects.filter(pk=cycle_id, status='running').update(status='finished', finished_at=timezone.now())
+    if cache.get(_lease_key(product_type)) == cycle_id:
+        cache.delete(_lease_key(product_type))
+    return cache.delete(_rerun_key(product_type))
+
+
+def claim_products(product_ids):
+    """
+    Claims products for a detail refresh. A product that is already queued or was
+    refreshed within PRODUCT_FRESHNESS_WINDOW keeps its claim and is left out.
+
+    With a Redis cache the claims are pipelined SET NX EX commands on the cache's
+    keys, so a list window costs one round trip however many products it lists.
+
+    Returns:
+        The IDs that were claimed and should be queued.
+    """
+    product_ids = list(dict.fromkeys(product_ids))
+    if not _uses_redis():
+        return [
+            product_id for product_id in product_ids
+            if cache.add(_claim_key(product_id), 1, timeout=PRODUCT_FRESHNESS_WINDOW)
+        ]
+    pipeline = _redis_client().pipeline(transaction=False)
+    for product_id in product_ids:
+        pipeline.set(cache.make_key(_claim_key(product_id)), 1, nx=True, ex=PRODUCT_FRESHNESS_WINDOW)
+    return [product_id for product_id, claimed in zip(product_ids, pipeline.execute()) if claimed]
+
+
+def mark_refreshed(product_ids):
+    """ Restarts the freshness window of products that were just refreshed. """
+    cache.set_many({_claim_key(product_id): 1 for product_id in product_ids}, timeout=PRODUCT_FRESHNESS_WINDOW)
+
+
+def release_products(product_ids):
+    """ Drops the claims of products whose refresh failed, so the next cycle retries them. """
+    cache.delete_many([_claim_key(product_id) for product_id in product_ids])
+
+
+def record_queue_depth(cycle_id, seen, queued):
+    """ Adds the products seen on list pages and the ones queued after coalescing to the cycle. """
+    ScrapeCycle.objects.filter(pk=cycle_id).update(
+        products_seen=F('products_seen') + seen, products_queued=F('products_queued') + queued)
@@ -0,0 +1,92 @@
+from collections import OrderedDict
+from decouple import config
+from django.core.cache import cache
+from .models import Brand, Category, SpecGroup, SpecAttribute
+
+
+# Maximum number of rows each worker keeps per dimension.
+DIMENSION_CACHE_SIZE = config('DIMENSION_CACHE_SIZE', default=10000, cast=int)
+
+# Shared counter bumped whenever a dimension row is edited outside the scraper.
+GENERATION_KEY = 'products:dimensions:generation'
+
+
+class DimensionCache:
+    """
+    A bounded, worker-local LRU map of dimension rows (brands, categories, spec
+    groups and attributes) that almost never change.
+
+    The cache is warmed with one query the first time it is used and after every
+    invalidation. Invalidation is signalled through a generation counter in the
+    shared Django cache, so an edit made in the admin (web process) reaches every
+    Celery worker on its next batch.
+    """
+
+    def __init__(self, loader, maxsize=DIMENSION_CACHE_SIZE):
+        self._loader = loader
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._generation = None
+
+    def sync(self, generation):
+        """ Drops and re-warms the cache if `generation` differs from the one it was built for. """
+        if generation != self._generation:
+            self._data.clear()
+            self.set_many(self._loader(self.maxsize))
+            self._generation = generation
+
+    def get_many(self, keys):
+        found = {}
+        for key in keys:
+            if key in self._data:
+                self._data.move_to_end(key)
+                found[key] = self._data[key]
+        return found
+
+    def set_many(self, mapping):
+        for key, value in mapping.items():
+            self._data[key] = value
+            self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def __len__(self):
+        return len(self._data)
+
+
+def _row_loader(model, fields):
+    """ Loads `model` rows as {api_id: (pk, {field: value})}. """
+    def load(limit):
+        return {
+            row['api_id']: (row.pop('pk'), row)
+            for row in model.objects.values('pk', *fields).order_by('-pk')[:limit]
+        }
+    return load
+
+
+def _load_spec_groups(limit):
+    return dict(SpecGroup.objects.values_list('title', 'pk').order_by('-pk')[:limit])
+
+
+def _load_spec_attributes(limit):
+    rows = SpecAttribute.objects.values_list('group__title', 'title', 'pk').order_by('-pk')[:limit]
+    return {(group_title, title): pk for group_title, title, pk in rows}
+
+
+brands = DimensionCache(_row_loader(Brand, ['api_id', 'code', 'title_fa', 'title_en', 'logo_url']))
+categories = DimensionCache(_row_loader(Category, ['api_id', 'code', 'title_fa', 'title_en']))
+spec_groups = DimensionCache(_load_spec_groups)
+spec_attributes = DimensionCache(_load_spec_attributes)
+
+
+def sync_all():
+    """ Re-warms the worker's dimension caches if a dimension was edited since the last batch. """
+    generation = cache.get(GENERATION_KEY, 0)
+    for dimension in (brands, categories, spec_groups, spec_attributes):
+        dimension.sync(generation)
+
+
+def invalidate():
+    """ Marks every worker's dimension caches as stale. """
+    if not cache.add(GENERATION_KEY, 1, timeout=None):
+        cache.incr(GENERATION_KEY)
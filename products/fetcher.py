@@ -0,0 +1,96 @@
+import asyncio
+import queue
+import threading
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from urllib.parse import urlsplit
+from scraping.ratelimit import RateLimitedAdapter
+
+
+_DONE = object()
+
+
+class AsyncFetcher:
+    """
+    Fetches many JSON URLs concurrently on an asyncio event loop.
+
+    At most `per_host` requests are in flight per upstream host, and the blocking
+    `requests` calls run on a thread pool that shares the session's connection pool,
+    so one worker keeps the upstream busy instead of waiting on each response in turn.
+    Every request goes through the client's retries and circuit breaker and takes
+    a token from the host's cluster-wide rate limiter.
+    """
+
+    def __init__(self, client, per_host=8):
+        self.client = client
+        self.per_host = per_host
+        adapter = RateLimitedAdapter(pool_connections=per_host, pool_maxsize=per_host)
+        client.session.mount('https://', adapter)
+        client.session.mount('http://', adapter)
+
+    def _get_json_if_changed(self, url, archive_tags=None):
+        response = self.client.get_if_changed(url, archive_tags)
+        return None if response is None else (response.json(), response.validators)
+
+    async def _produce(self, items, parse, conditional, archive_tags, results):
+        loop = asyncio.get_running_loop()
+        limits = defaultdict(lambda: asyncio.Semaphore(self.per_host))
+        get = partial(self._get_json_if_changed if conditional else self.client.get_json, archive_tags=archive_tags)
+
+        async def fetch(key, url):
+            async with limits[urlsplit(url).netloc]:
+                try:
+                    payload = await loop.run_in_executor(executor, get, url)
+                    if parse and conditional and payload is not None:
+                        payload = (parse(payload[0]), payload[1])
+                    elif parse and not conditional:
+                        payload = parse(payload)
+                    results.put((key, payload))
+                except Exception as e:
+                    results.put((key, e))
+
+        with ThreadPoolExecutor(max_workers=max(1, min(len(items), self.per_host * 4))) as executor:
+            await asyncio.gather(*(fetch(key, url) for key, url in items))
+        results.put(_DONE)
+
+    def iter_batches(self, items, batch_size, parse=None, conditional=False, archive_tags=None):
+        """
+        Fetches `items`, an iterable of (key, url) pairs, and yields lists of
+        (key, parsed payload) in completion order, `batch_size` at a time.
+
+        A failed request yields its exception in place of the payload. The event
+        loop runs on a background thread, so the caller can write each batch to the
+        database while the remaining requests are still in flight.
+
+        With `conditional`, URLs are fetched with HttpClient.get_if_changed and each
+        payload is None if unchanged, or a (parsed payload, validators) pair whose
+        validators the caller passes to the client's remember() once it is processed.
+        `archive_tags` are stored with every archived response.
+        """
+        items = list(items)
+        if not items:
+            return
+        results = queue.Queue()
+        thread = threading.Thread(
+            target=lambda: asyncio.run(self._produce(items, parse, conditional, archive_tags, results)), daemon=True)
+        thread.start()
+
+        batch = []
+        while (result := results.get()) is not _DONE:
+            batch.append(result)
+            if len(batch) >= batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+        thread.join()
+
+    def fetch_all(self, items, parse=None, conditional=False, archive_tags=None):
+        """ Fetches all (key, url) pairs and returns a {key: parsed payload or exception} dict. """
+        items = list(items)
+        return {
+            key: payload
+            for batch in self.iter_batches(items, len(items) or 1, parse, conditional, archive_tags)
+            for key, payload in batch
+        }
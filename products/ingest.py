@@ -0,0 +1,334 @@
+import hashlib
+import json
+from django.db import transaction
+from django.utils import timezone
+from . import dimensions
+from .models import (
+    PriceHistory, Product, Brand, Category, ProductImage, ProductSpecification, Variant,
+    ReviewAttribute, SpecGroup, SpecAttribute, simple_slugify
+)
+
+
+def _upsert(model, rows, unique_field, update_fields):
+    """
+    Inserts or updates `rows` in a single statement and returns a
+    {unique_field value: pk} map for all of them.
+    """
+    if not rows:
+        return {}
+    model.objects.bulk_create(
+        [model(**row) for row in rows],
+        update_conflicts=True,
+        unique_fields=[unique_field],
+        update_fields=update_fields,
+    )
+    keys = [row[unique_field] for row in rows]
+    return dict(model.objects.filter(**{f'{unique_field}__in': keys}).values_list(unique_field, 'pk'))
+
+
+def _save_dimension(model, dimension, rows, update_fields):
+    """
+    Upserts only the dimension rows that are unseen or differ from the worker's
+    cached copy, and returns {api_id: pk} for all of them.
+    """
+    rows = list({row['api_id']: row for row in rows}.values())
+    known = dimension.get_many(row['api_id'] for row in rows)
+    pks = {api_id: pk for api_id, (pk, _) in known.items()}
+
+    changed = [row for row in rows if known.get(row['api_id'], (None, None))[1] != row]
+    if changed:
+        upserted = _upsert(model, changed, 'api_id', update_fields)
+        pks.update(upserted)
+        # Only cache rows once they are committed, so a rolled back batch can't leave stale pks behind.
+        fresh = {row['api_id']: (upserted[row['api_id']], dict(row)) for row in changed}
+        transaction.on_commit(lambda: dimension.set_many(fresh))
+    return pks
+
+
+def _resolve_spec_attributes(keys):
+    """
+    Maps (group title, attribute title) pairs to SpecAttribute pks. Cached pairs
+    cost no queries; unseen groups and attributes are inserted with ON CONFLICT DO
+    NOTHING, so workers racing to create the same row don't raise IntegrityError.
+    """
+    attributes = dimensions.spec_attributes.get_many(keys)
+    missing = set(keys) - attributes.keys()
+    if not missing:
+        return attributes
+
+    group_titles = {group_title for group_title, _ in missing}
+    groups = dimensions.spec_groups.get_many(group_titles)
+    if new_groups := group_titles - groups.keys():
+        SpecGroup.objects.bulk_create([SpecGroup(title=title) for title in new_groups], ignore_conflicts=True)
+        fresh_groups = dict(SpecGroup.objects.filter(title__in=new_groups).values_list('title', 'pk'))
+        groups.update(fresh_groups)
+        transaction.on_commit(lambda: dimensions.spec_groups.set_many(fresh_groups))
+
+    SpecAttribute.objects.bulk_create(
+        [SpecAttribute(group_id=groups[group_title], title=attr_title) for group_title, attr_title in missing],
+        ignore_conflicts=True)
+    rows = SpecAttribute.objects.filter(
+        group_id__in=[groups[group_title] for group_title in group_titles],
+        title__in={attr_title for _, attr_title in missing},
+    ).values_list('group__title', 'title', 'pk')
+    fresh_attributes = {(group_title, title): pk for group_title, title, pk in rows if (group_title, title) in missing}
+    attributes.update(fresh_attributes)
+    transaction.on_commit(lambda: dimensions.spec_attributes.set_many(fresh_attributes))
+    return attributes
+
+
+def fingerprint(record):
+    """
+    Returns (content_hash, prices_hash) for a parsed product record. The content
+    hash covers everything except variant prices, so a price-only change can be
+    told apart from a change that needs the full write path.
+    """
+    content = {
+        'brand': record['brand'],
+        'category': record['category'],
+        'product': record['product'],
+        'variants': sorted(
+            ({k: v for k, v in variant.items() if k not in ('selling_price', 'rrp_price')}
+             for variant in record['variants']), key=lambda variant: variant['api_id']),
+        'review_attributes': sorted(record['review_attributes'].items()),
+        'specifications': sorted([*key, value] for key, value in record['specifications'].items()),
+        'images': sorted(record['images'].items()),
+    }
+    prices = sorted((v['api_id'], v['selling_price'], v['rrp_price']) for v in record['variants'])
+    return tuple(
+        hashlib.sha256(json.dumps(value, sort_keys=True, ensure_ascii=False).encode()).hexdigest()
+        for value in (content, prices)
+    )
+
+
+def _save_product_rows(records):
+    """ Upserts the brands, categories and products of `records`; returns {api_id: pk}. """
+    brands = _save_dimension(
+        Brand, dimensions.brands, [r['brand'] for r in records],
+        ['code', 'title_fa', 'title_en', 'logo_url', 'updated_at'])
+    categories = _save_dimension(
+        Category, dimensions.categories, [r['category'] for r in records],
+        ['code', 'title_fa', 'title_en', 'updated_at'])
+
+    return _upsert(Product, [
+        {
+            'api_id': record['api_id'],
+            'slug': simple_slugify(
+                f"{record['api_id']}-{record['product']['title_en'] or record['product']['title_fa']}"),
+            'brand_id': brands[record['brand']['api_id']],
+            'category_id': categories[record['category']['api_id']],
+            'content_hash': record['content_hash'],
+            'prices_hash': record['prices_hash'],
+            **record['product'],
+        }
+        for record in records
+    ], 'api_id', [
+        'title_fa', 'title_en', 'brand', 'category', 'status', 'product_type', 'rating_rate',
+        'rating_count', 'review_description', 'content_hash', 'prices_hash', 'updated_at'
+    ])
+
+
+def _sync_variants(records, products, prune):
+    """
+    Upserts the variants of `records`, appends PriceHistory where the price moved
+    and deletes variants of the `prune` products that are no longer listed.
+    """
+    variant_rows = {}
+    for record in records:
+        for data in record['variants']:
+            variant_rows[data['api_id']] = {
+                'product_id': products[record['api_id']], 'last_recorded_price': data['selling_price'], **data}
+    previous_prices = dict(
+        Variant.objects.filter(api_id__in=variant_rows.keys()).values_list('api_id', 'last_recorded_price'))
+
+    variants = _upsert(Variant, list(variant_rows.values()), 'api_id', [
+        'product', 'seller_name', 'color_name', 'color_hex', 'warranty_name',
+        'selling_price', 'rrp_price', 'last_recorded_price'
+    ])
+    if prune:
+        Variant.objects.filter(product_id__in=prune).exclude(api_id__in=variants.keys()).delete()
+
+    history_to_create = [
+        PriceHistory(variant_id=variants[api_id], selling_price=row['selling_price'], rrp_price=row['rrp_price'])
+        for api_id, row in variant_rows.items()
+        if previous_prices.get(api_id) != row['selling_price']
+    ]
+    if history_to_create:
+        PriceHistory.objects.bulk_create(history_to_create)
+
+
+def _reconcile(model, product_pks, key_field, value_field, desired):
+    """
+    Brings the `model` rows of `product_pks` in line with `desired`, a
+    {(product pk, key): value} dict: missing rows are inserted, rows with a
+    different value are updated and rows no longer listed are deleted.
+    Rows that already match are left untouched.
+    """
+    existing = {
+        (product_pk, key): (value, pk)
+        for product_pk, key, value, pk in model.objects.filter(product_id__in=product_pks).values_list(
+            'product_id', key_field, value_field, 'pk')
+    }
+    to_delete = [pk for key, (_, pk) in existing.items() if key not in desired]
+    to_update = [
+        model(pk=pk, **{value_field: desired[key]})
+        for key, (value, pk) in existing.items() if key in desired and desired[key] != value
+    ]
+    to_create = [
+        model(product_id=product_pk, **{key_field: key, value_field: value})
+        for (product_pk, key), value in desired.items() if (product_pk, key) not in existing
+    ]
+
+    if to_delete:
+        model.objects.filter(pk__in=to_delete).delete()
+    if to_update:
+        model.objects.bulk_update(to_update, [value_field])
+    if to_create:
+        model.objects.bulk_create(to_create)
+
+
+def _sync_related(records, products):
+    """ Reconciles the review attributes, specifications and images of `records`. """
+    product_pks = [products[record['api_id']] for record in records]
+
+    _reconcile(ReviewAttribute, product_pks, 'title', 'value', {
+        (products[record['api_id']], title): value
+        for record in records for title, value in record['review_attributes'].items()
+    })
+
+    attributes = _resolve_spec_attributes({key for r in records for key in r['specifications']})
+    _reconcile(ProductSpecification, product_pks, 'attribute_id', 'value', {
+        (products[record['api_id']], attributes[key]): value
+        for record in records for key, value in record['specifications'].items()
+    })
+
+    _reconcile(ProductImage, product_pks, 'image_url', 'is_main', {
+        (products[record['api_id']], url): is_main
+        for record in records for url, is_main in record['images'].items()
+    })
+
+
+def save_products(records):
+    """
+    Writes a batch of parsed product records in a single transaction using
+    set-based upserts, so the number of queries does not grow with the batch size.
+
+    Each record is compared with the fingerprints stored on its Product: unchanged
+    products are skipped entirely, price-only changes touch just the variants and
+    PriceHistory, and everything else goes through the full write path.
+
+    Returns:
+        A dict with 'created', 'updated', 'price_only' and 'unchanged' product counts.
+    """
+    stats = {'created': 0, 'updated': 0, 'price_only': 0, 'unchanged': 0}
+    # The last occurrence of a product wins if it was fetched twice in one batch.
+    records = list({record['api_id']: record for record in records}.values())
+    if not records:
+        return stats
+
+    for record in records:
+        record['content_hash'], record['prices_hash'] = fingerprint(record)
+    dimensions.sync_all()
+
+    with transaction.atomic():
+        existing = {
+            api_id: (pk, content_hash, prices_hash)
+            for api_id, pk, content_hash, prices_hash in Product.objects.filter(
+                api_id__in=[record['api_id'] for record in records]
+            ).values_list('api_id', 'pk', 'content_hash', 'prices_hash')
+        }
+
+        full, price_only = [], []
+        for record in records:
+            known = existing.get(record['api_id'])
+            if known is None:
+                stats['created'] += 1
+                full.append(record)
+            elif known[1] != record['content_hash']:
+                stats['updated'] += 1
+                full.append(record)
+            elif known[2] != record['prices_hash']:
+                stats['price_only'] += 1
+                price_only.append(record)
+            else:
+                stats['unchanged'] += 1
+
+        products = {record['api_id']: existing[record['api_id']][0] for record in price_only}
+        if full:
+            products.update(_save_product_rows(full))
+        if price_only:
+            Product.objects.bulk_update([
+                Product(pk=products[record['api_id']], prices_hash=record['prices_hash'])
+                for record in price_only
+            ], ['prices_hash'])
+
+        if full or price_only:
+            _sync_variants(full + price_only, products, prune=[products[record['api_id']] for record in full])
+        if full:
+            _sync_related(full, products)
+
+    return stats
+
+
+def apply_list_prices(items):
+    """
+    Applies the prices found on list pages to stored products in bulk and decides
+    which products still need a detail fetch: new products, products whose status
+    changed or whose listed variant is unknown, and products due for a refresh.
+    Repriced products lose their prices_hash, so their next detail payload is
+    written.
+
+    Args:
+        items: Parsed list items with 'api_id', 'status', 'variant_id',
+            'selling_price' and 'rrp_price'.
+
+    Returns:
+        A (product api_ids needing a detail fetch, number of variants repriced) tuple.
+    """
+    now = timezone.now()
+    stored = {
+        api_id: (status, next_refresh_at)
+        for api_id, status, next_refresh_at in Product.objects.filter(
+            api_id__in=[item['api_id'] for item in items]
+        ).values_list('api_id', 'status', 'next_refresh_at')
+    }
+    variants = {
+        row[0]: row[1:]
+        for row in Variant.objects.filter(
+            api_id__in=[item['variant_id'] for item in items if item['variant_id']]
+        ).values_list('api_id', 'pk', 'product__api_id', 'selling_price', 'rrp_price', 'last_recorded_price')
+    }
+
+    need_detail, repriced, repriced_products, history_to_create = [], [], set(), []
+    for item in items:
+        product = stored.get(item['api_id'])
+        if (product is None or (item['status'] and item['status'] != product[0])
+                or product[1] is None or product[1] <= now):
+            need_detail.append(item['api_id'])
+            continue
+        if not (item['variant_id'] and item['selling_price']):
+            continue  # The list doesn't price this product; its schedule will refresh it.
+
+        variant = variants.get(item['variant_id'])
+        if variant is None or variant[1] != item['api_id']:
+            need_detail.append(item['api_id'])
+            continue
+        pk, _, selling_price, rrp_price, last_recorded_price = variant
+        if (selling_price, rrp_price) != (item['selling_price'], item['rrp_price']):
+            repriced.append(Variant(
+                pk=pk, selling_price=item['selling_price'], rrp_price=item['rrp_price'],
+                last_recorded_price=item['selling_price']))
+            repriced_products.add(item['api_id'])
+            if last_recorded_price != item['selling_price']:
+                history_to_create.append(PriceHistory(
+                    variant_id=pk, selling_price=item['selling_price'], rrp_price=item['rrp_price']))
+
+    if repriced:
+        with transaction.atomic():
+            Variant.objects.bulk_update(repriced, ['selling_price', 'rrp_price', 'last_recorded_price'])
+            # The stored prices no longer match prices_hash, so the next detail payload must not be
+            # skipped as unchanged, even when it carries the prices the hash was taken from.
+            Product.objects.filter(api_id__in=repriced_products).update(prices_hash='')
+            if history_to_create:
+                PriceHistory.objects.bulk_create(history_to_create)
+    return need_detail, len(repriced)
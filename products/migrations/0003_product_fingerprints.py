@@ -0,0 +1,23 @@
+# Generated by Django 5.2 on 2026-10-17 12:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0002_pricehistory'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='content_hash',
+            field=models.CharField(blank=True, help_text='Hash of the payload without variant prices', max_length=64),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='prices_hash',
+            field=models.CharField(blank=True, help_text='Hash of the variant prices', max_length=64),
+        ),
+    ]
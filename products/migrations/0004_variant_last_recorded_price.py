@@ -0,0 +1,31 @@
+# Generated by Django 5.2 on 2026-10-17 12:34
+
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def backfill_last_recorded_price(apps, schema_editor):
+    Variant = apps.get_model('products', 'Variant')
+    PriceHistory = apps.get_model('products', 'PriceHistory')
+    latest = PriceHistory.objects.filter(variant=OuterRef('pk')).order_by('-timestamp')
+    Variant.objects.update(last_recorded_price=Subquery(latest.values('selling_price')[:1]))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0003_product_fingerprints'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='variant',
+            name='last_recorded_price',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='pricehistory',
+            index=models.Index(fields=['variant', '-timestamp'], name='products_pr_variant_2014b4_idx'),
+        ),
+        migrations.RunPython(backfill_last_recorded_price, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2 on 2026-10-17 12:38
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0004_variant_last_recorded_price'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ScrapeCycle',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('product_type', models.CharField(db_index=True, max_length=50)),
+                ('status', models.CharField(choices=[('running', 'Running'), ('finished', 'Finished'), ('merged', 'Merged into a follow-up run'), ('skipped', 'Skipped')], db_index=True, default='running', max_length=20)),
+                ('started_at', models.DateTimeField(auto_now_add=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('blocked_by', models.ForeignKey(blank=True, help_text='The in-flight cycle that caused this one to be skipped or merged', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='overlapping_cycles', to='products.scrapecycle')),
+            ],
+            options={
+                'ordering': ['-started_at'],
+            },
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2 on 2026-10-17 12:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0005_scrapecycle'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='scrapecycle',
+            name='products_queued',
+            field=models.PositiveIntegerField(default=0, help_text='Products queued after coalescing duplicates'),
+        ),
+        migrations.AddField(
+            model_name='scrapecycle',
+            name='products_seen',
+            field=models.PositiveIntegerField(default=0, help_text='Products listed on the scraped pages'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2 on 2026-10-17 12:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0006_scrapecycle_queue_depth'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='next_refresh_at',
+            field=models.DateTimeField(blank=True, db_index=True, help_text='When the scraper should refresh the product next', null=True),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='product_type',
+            field=models.CharField(blank=True, db_index=True, help_text='The SCRAPE_CONFIG type the product is scraped as', max_length=50),
+        ),
+    ]
@@ -0,0 +1,16 @@
+# Generated by Django 5.2 on 2026-10-17 18:05
+
+from django.db import migrations
+from scraping.partitions import partition_by_month
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0007_product_refresh_schedule'),
+    ]
+
+    operations = [
+        # PostgreSQL only: the table becomes range-partitioned by month. Reversing leaves it partitioned.
+        migrations.RunPython(partition_by_month('products.pricehistory'), migrations.RunPython.noop),
+    ]
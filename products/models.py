@@ -46,6 +46,7 @@ class Product(models.Model):
     title_fa = models.CharField(max_length=255)
     title_en = models.CharField(max_length=255)
     status = models.CharField(max_length=50, default='marketable', db_index=True)
+    product_type = models.CharField(max_length=50, blank=True, db_index=True, help_text="The SCRAPE_CONFIG type the product is scraped as")
 
     brand = models.ForeignKey(Brand, on_delete=models.PROTECT, related_name="products")
     category = models.ForeignKey(Category, on_delete=models.PROTECT, related_name="products")
@@ -55,6 +56,11 @@ class Product(models.Model):
     rating_count = models.PositiveIntegerField(default=0)
     
     review_description = models.TextField(blank=True, null=True, help_text="Stores the 'description' from the review object")
+
+    # Fingerprints of the last ingested payload, used to skip unchanged products
+    content_hash = models.CharField(max_length=64, blank=True, help_text="Hash of the payload without variant prices")
+    prices_hash = models.CharField(max_length=64, blank=True, help_text="Hash of the variant prices")
+    next_refresh_at = models.DateTimeField(null=True, blank=True, db_index=True, help_text="When the scraper should refresh the product next")
     
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
@@ -131,6 +137,9 @@ class Variant(models.Model):
     warranty_name = models.CharField(max_length=255, blank=True)
     selling_price = models.PositiveIntegerField(default=0)
     rrp_price = models.PositiveIntegerField(default=0)
+    # Selling price of the most recent PriceHistory row, so the scraper can decide
+    # whether to append history without querying the history table.
+    last_recorded_price = models.PositiveIntegerField(null=True, blank=True)
     
     class Meta:
         unique_together = ('product', 'api_id')
@@ -158,6 +167,38 @@ class PriceHistory(models.Model):
 
     class Meta:
         ordering = ['-timestamp'] # Order by most recent price first
+        indexes = [
+            models.Index(fields=['variant', '-timestamp']),
+        ]
 
     def __str__(self):
         return f"{self.variant.api_id} - Price: {self.selling_price} on {self.timestamp.strftime('%Y-%m-%d')}"
+
+
+
+class ScrapeCycle(models.Model):
+    """
+    Records each scheduled scrape of a product type, including the cycles that were
+    skipped or merged because the previous one was still in flight.
+    """
+    STATUS_CHOICES = [
+        ('running', 'Running'),
+        ('finished', 'Finished'),
+        ('merged', 'Merged into a follow-up run'),
+        ('skipped', 'Skipped'),
+    ]
+    product_type = models.CharField(max_length=50, db_index=True)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='running', db_index=True)
+    blocked_by = models.ForeignKey(
+        'self', on_delete=models.SET_NULL, null=True, blank=True, related_name="overlapping_cycles",
+        help_text="The in-flight cycle that caused this one to be skipped or merged")
+    products_seen = models.PositiveIntegerField(default=0, help_text="Products listed on the scraped pages")
+    products_queued = models.PositiveIntegerField(default=0, help_text="Products queued after coalescing duplicates")
+    started_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-started_at']
+
+    def __str__(self):
+        return f"{self.product_type} cycle #{self.pk} ({self.status})"
@@ -0,0 +1,106 @@
+import math
+from datetime import timedelta
+from decouple import config
+from django.core.cache import cache
+from django.db.models import Count, F, Q
+from django.utils import timezone
+from .models import Product
+
+
+# Refresh interval of a product whose price never moves, before popularity and status adjustments.
+PRODUCT_REFRESH_BASE_INTERVAL = config('PRODUCT_REFRESH_BASE_INTERVAL', default=6 * 60 * 60, cast=int)
+PRODUCT_REFRESH_MIN_INTERVAL = config('PRODUCT_REFRESH_MIN_INTERVAL', default=2 * 60, cast=int)
+# No product is scheduled further out than this, whatever its volatility.
+PRODUCT_MAX_STALENESS = config('PRODUCT_MAX_STALENESS', default=24 * 60 * 60, cast=int)
+# Number of due products dispatched per beat tick.
+PRODUCT_DUE_SLICE = config('PRODUCT_DUE_SLICE', default=500, cast=int)
+# Price changes are counted over this many days to estimate volatility.
+VOLATILITY_WINDOW_DAYS = 7
+
+
+def refresh_interval(price_changes, status, rating_count):
+    """
+    Returns the number of seconds until a product should be refreshed again.
+
+    The base interval shrinks with the product's daily price change rate and its
+    popularity (rating count), grows for products that are not marketable, and is
+    clamped between PRODUCT_REFRESH_MIN_INTERVAL and PRODUCT_MAX_STALENESS.
+    """
+    interval = PRODUCT_REFRESH_BASE_INTERVAL / (1 + price_changes / VOLATILITY_WINDOW_DAYS)
+    interval /= 1 + math.log10(1 + (rating_count or 0)) / 2
+    if status != 'marketable':
+        interval *= 4
+    return max(PRODUCT_REFRESH_MIN_INTERVAL, min(PRODUCT_MAX_STALENESS, interval))
+
+
+def _failures_key(api_id):
+    return f'products:refresh-failures:{api_id}'
+
+
+def retry_delay(failures):
+    """
+    Returns the number of seconds until a product whose refresh failed `failures`
+    times in a row is retried: PRODUCT_REFRESH_MIN_INTERVAL, doubled with every
+    further failure up to PRODUCT_MAX_STALENESS.
+    """
+    return min(PRODUCT_MAX_STALENESS, PRODUCT_REFRESH_MIN_INTERVAL * 2 ** min(failures - 1, 20))
+
+
+def reschedule(api_ids):
+    """ Sets next_refresh_at of just-refreshed products from their recent price history. """
+    api_ids = list(api_ids)
+    cache.delete_many([_failures_key(api_id) for api_id in api_ids])
+    now = timezone.now()
+    since = now - timedelta(days=VOLATILITY_WINDOW_DAYS)
+    rows = Product.objects.filter(api_id__in=api_ids).annotate(
+        price_changes=Count('variants__price_history', filter=Q(variants__price_history__timestamp__gte=since))
+    ).values_list('pk', 'status', 'rating_count', 'price_changes')
+
+    Product.objects.bulk_update([
+        Product(pk=pk, next_refresh_at=now + timedelta(seconds=refresh_interval(changes, status, rating_count)))
+        for pk, status, rating_count, changes in rows
+    ], ['next_refresh_at'])
+
+
+def back_off(api_ids):
+    """
+    Pushes next_refresh_at of products whose refresh failed or was skipped out by
+    retry_delay() of their consecutive failures, so they aren't dispatched again
+    on every tick. reschedule() resets the count once a refresh succeeds.
+    """
+    keys = {api_id: _failures_key(api_id) for api_id in api_ids}
+    if not keys:
+        return
+    stored = cache.get_many(keys.values())
+    failures = {api_id: stored.get(key, 0) + 1 for api_id, key in keys.items()}
+    # The count must outlive the longest delay, or the next failure would start over.
+    cache.set_many({keys[api_id]: count for api_id, count in failures.items()}, timeout=2 * PRODUCT_MAX_STALENESS)
+
+    now = timezone.now()
+    Product.objects.bulk_update([
+        Product(pk=pk, next_refresh_at=now + timedelta(seconds=retry_delay(failures[api_id])))
+        for api_id, pk in Product.objects.filter(api_id__in=keys).values_list('api_id', 'pk')
+    ], ['next_refresh_at'])
+
+
+def due_products(product_types=None, limit=PRODUCT_DUE_SLICE):
+    """
+    Returns (api_id, product_type) pairs of the products that are due, most overdue
+    first. Products that were never scheduled count as the most overdue. With
+    `product_types`, products of other types (e.g. ones no longer scraped) are
+    left out, so they can't fill the slice.
+    """
+    products = Product.objects.filter(Q(next_refresh_at__lte=timezone.now()) | Q(next_refresh_at__isnull=True))
+    if product_types is not None:
+        products = products.filter(product_type__in=product_types)
+    return list(
+        products.exclude(product_type='')
+        .order_by(F('next_refresh_at').asc(nulls_first=True))
+        .values_list('api_id', 'product_type')[:limit]
+    )
+
+
+def postpone(api_ids, seconds):
+    """ Moves dispatched products out of the due slice while their refresh is queued. """
+    Product.objects.filter(api_id__in=api_ids).update(next_refresh_at=timezone.now() + timedelta(seconds=seconds))
+
@@ -0,0 +1,13 @@
+from django.db.models.signals import post_save, post_delete
+from . import dimensions
+from .models import Brand, Category, SpecGroup, SpecAttribute
+
+
+def invalidate_dimension_caches(sender, **kwargs):
+    """ Makes the scraper workers reload their dimension caches after an admin or API edit. """
+    dimensions.invalidate()
+
+
+for model in (Brand, Category, SpecGroup, SpecAttribute):
+    post_save.connect(invalidate_dimension_caches, sender=model)
+    post_delete.connect(invalidate_dimension_caches, sender=model)
@@ -1,10 +1,20 @@
+import json
 import requests
+import time
+from collections import defaultdict
+from functools import partial
 from celery import shared_task
-from django.db import transaction, IntegrityError
+from django.db import IntegrityError
 import logging
 from decouple import config
 from fake_useragent import UserAgent
-from .models import PriceHistory, Product, Brand, Category, ProductImage, ProductSpecification, Variant, ReviewAttribute, SpecGroup, SpecAttribute
+from scraping.extract import Extractor, Field, safe_get
+from scraping.http import HttpClient
+from scraping.instrumentation import count_items, count_rows
+from . import cycles, scheduler
+from .fetcher import AsyncFetcher
+from .ingest import apply_list_prices, save_products
+from .models import Product
 
 
 LIST_API_URL_MOBILE = config('LIST_API_URL_MOBILE')
@@ -12,6 +22,15 @@ LIST_API_URL_PC = config('LIST_API_URL_PC')
 DETAIL_API_URL_MOBILE = config('DETAIL_API_URL_MOBILE')
 DETAIL_API_URL_PC = config('DETAIL_API_URL_PC')
 
+# Number of products fetched and written together by one batch task.
+PRODUCT_BATCH_SIZE = config('PRODUCT_BATCH_SIZE', default=20, cast=int)
+# Upper bound of concurrent requests a single worker sends to one upstream host.
+SCRAPE_MAX_IN_FLIGHT_PER_HOST = config('SCRAPE_MAX_IN_FLIGHT_PER_HOST', default=8, cast=int)
+# List pages requested together; no further window is requested once a page comes back empty.
+LIST_PAGE_WINDOW = config('LIST_PAGE_WINDOW', default=4, cast=int)
+# Re-parsed archive records are written this many products at a time.
+ARCHIVE_WRITE_BATCH_SIZE = 500
+
 
 SCRAPE_CONFIG = {
     'mobile': {
@@ -48,227 +67,363 @@ session.headers.update({
     'Accept': 'application/json, text/plain, */*',
     'Referer': 'https://www.digikala.com/',
 })
+client = HttpClient(session, archive_source='products')
+fetcher = AsyncFetcher(client, per_host=SCRAPE_MAX_IN_FLIGHT_PER_HOST)
+
+
+def rial_to_toman(price):
+    """ Digikala prices are in rials; the models store tomans. """
+    return (price or 0) // 10
+
+
+# Compiled once; each call reads a whole payload level (see scraping.extract.Extractor).
+PRODUCT_FIELDS = Extractor({
+    'api_id': 'id',
+    'title_fa': 'title_fa',
+    'title_en': 'title_en',
+    'status': Field('status', default='unavailable'),
+    'rating_rate': Field(('rating', 'rate'), default=0),
+    'rating_count': Field(('rating', 'count'), default=0),
+    'review_description': ('review', 'description'),
+    'review_attributes': Field(('review', 'attributes'), default=[]),
+    'specifications': Field('specifications', default=[]),
+    'main_image_url': ('images', 'main', 'url', 0),
+    'images': Field(('images', 'list'), default=[]),
+    'variants': Field('variants', default=[]),
+    'brand': Field('brand', default={}),
+    'category': Field('category', default={}),
+})
+BRAND_FIELDS = Extractor({
+    'api_id': 'id',
+    'code': 'code',
+    'title_fa': 'title_fa',
+    'title_en': 'title_en',
+    'logo_url': ('logo', 'url', 0),
+})
+CATEGORY_FIELDS = Extractor({
+    'api_id': 'id',
+    'code': 'code',
+    'title_fa': 'title_fa',
+    'title_en': 'title_en',
+})
+VARIANT_FIELDS = Extractor({
+    'api_id': 'id',
+    'seller_name': ('seller', 'title'),
+    'color_name': ('color', 'title'),
+    'color_hex': ('color', 'hex_code'),
+    'warranty_name': ('warranty', 'title_fa'),
+    'selling_price': Field(('price', 'selling_price'), default=0, convert=rial_to_toman),
+    'rrp_price': Field(('price', 'rrp_price'), default=0, convert=rial_to_toman),
+})
+LIST_ITEM_FIELDS = Extractor({
+    'api_id': 'id',
+    'status': 'status',
+    'variant_id': Field(('default_variant', 'id'), default=None),
+    'selling_price': Field(('default_variant', 'price', 'selling_price'), default=0, convert=rial_to_toman),
+    'rrp_price': Field(('default_variant', 'price', 'rrp_price'), default=0, convert=rial_to_toman),
+})
+TITLED_VALUES = Extractor({
+    'title': 'title',
+    'values': Field('values', default=[]),
+    'attributes': Field('attributes', default=[]),
+})
 
 
-def safe_get(data, *keys, default=''):
+def parse_product_payload(product_data, product_type=''):
     """
-    Safely get nested values from dict/list structures.
-
-    Args:
-        data: The data structure to get value from
-        *keys: Keys/indices to traverse (e.g., 'rating', 'rate')
-        default: Default value if path doesn't exist
+    Normalizes a Digikala product payload into a plain record for the batch writer.
 
     Returns:
-        The value at the path or default if not found
+        A dict with the product, brand, category and child rows, or None when
+        the payload is missing the product, brand or category ID.
     """
-    if not data:
-        return default
+    if not product_data:
+        return None
+    fields = PRODUCT_FIELDS(product_data)
+    brand = BRAND_FIELDS(fields.pop('brand'))
+    category = CATEGORY_FIELDS(fields.pop('category'))
+    if not (fields['api_id'] and brand['api_id'] and category['api_id']):
+        return None
+
+    variants = [variant for variant in VARIANT_FIELDS.many(fields.pop('variants')) if variant['api_id']]
+
+    review_attributes = {}
+    for attr in TITLED_VALUES.many(fields.pop('review_attributes')):
+        if (title := attr['title']) and title not in review_attributes:
+            review_attributes[title] = ", ".join(attr['values']).strip()
+
+    specifications = {}
+    for group in TITLED_VALUES.many(fields.pop('specifications')):
+        if not (group_title := group['title']):
+            continue
+        for attr in TITLED_VALUES.many(group['attributes']):
+            if not (attr_title := attr['title']):
+                continue
+            value_str = ", ".join(v.strip() for v in attr['values'] if v and v.strip())
+            if value_str:
+                specifications.setdefault((group_title, attr_title), value_str)
+
+    main_image_url = fields.pop('main_image_url')
+    images = {}
+    for img_data in fields.pop('images'):
+        if url := safe_get(img_data, 'url', 0):
+            images.setdefault(url, url == main_image_url)
+
+    api_id = fields.pop('api_id')
+    return {
+        'api_id': api_id,
+        'brand': brand,
+        'category': category,
+        'product': {**fields, 'product_type': product_type},
+        'variants': variants,
+        'review_attributes': review_attributes,
+        'specifications': specifications,
+        'images': images,
+    }
 
-    current = data
-    for key in keys:
-        try:
-            if isinstance(current, (list, tuple)):
-                # Handle list indices or get first element if key is not an integer
-                current = current[key] if isinstance(key, int) else current[0]
-            elif isinstance(current, dict):
-                current = current.get(key, default)
-            else:
-                return default
 
-            if current is None:
-                return default
+def parse_list_item(product_item):
+    """
+    Normalizes a product from a list page: its status and the price of its
+    default variant. Returns None if the item has no product ID.
+    """
+    item = LIST_ITEM_FIELDS(product_item)
+    return item if item['api_id'] else None
 
-        except (IndexError, KeyError, TypeError):
-            return default
 
-    return current
+def fetch_product_data(product_id, product_type):
+    """ Downloads the detail payload of a single product. """
+    url = SCRAPE_CONFIG[product_type]['detail_url'].format(
+        product_id=product_id)
+    return safe_get(client.get_json(url, archive_tags={'product_type': product_type}), 'data', 'product')
 
 
 @shared_task
 def fetch_and_save_product_details(product_id, product_type):
     """Fetches details, updates product, and tracks price history."""
-    url = SCRAPE_CONFIG[product_type]['detail_url'].format(
-        product_id=product_id)
     logger.info(f"Processing product ID: {product_id}")
     try:
-        response = session.get(url, timeout=20)
-        response.raise_for_status()
-        product_data = safe_get(response.json(), 'data', 'product')
-
-        if not (product_data and safe_get(product_data, 'id')):
-            return f"Skipped {product_id}: No product data."
-
-        brand_data = safe_get(product_data, 'brand')
-        category_data = safe_get(product_data, 'category')
-        if not (safe_get(brand_data, 'id') and safe_get(category_data, 'id')):
-            return f"Skipped {product_id}: Missing brand or category ID."
-
-        with transaction.atomic():
-            brand, _ = Brand.objects.update_or_create(
-                api_id=safe_get(brand_data, 'id'),
-                defaults={
-                    'code': safe_get(brand_data, 'code', default=''),
-                    'title_fa': safe_get(brand_data, 'title_fa', default=''),
-                    'title_en': safe_get(brand_data, 'title_en', default=''),
-                    'logo_url': safe_get(brand_data, 'logo', 'url', 0, default='')
-                }
-            )
-            category, _ = Category.objects.update_or_create(
-                api_id=safe_get(category_data, 'id'),
-                defaults={
-                    'code': safe_get(category_data, 'code', default=''),
-                    'title_fa': safe_get(category_data, 'title_fa', default=''),
-                    'title_en': safe_get(category_data, 'title_en', default='')
-                }
-            )
-            product, created = Product.objects.update_or_create(
-                api_id=safe_get(product_data, 'id'),
-                defaults={
-                    'title_fa': safe_get(product_data, 'title_fa', default=''),
-                    'title_en': safe_get(product_data, 'title_en', default=''),
-                    'brand': brand,
-                    'category': category,
-                    'status': safe_get(product_data, 'status', default='unavailable'),
-                    'rating_rate': safe_get(product_data, 'rating', 'rate', default=0),
-                    'rating_count': safe_get(product_data, 'rating', 'count', default=0),
-                    'review_description': safe_get(product_data, 'review', 'description', default=''),
-                }
-            )
-
-            # --- Sync Variants and Price History ---
-            variants_from_api = safe_get(product_data, 'variants', default=[])
-            api_variant_ids = {v['id']
-                            for v in variants_from_api if v.get('id')}
-            history_to_create = []
-
-            for data in variants_from_api:
-                if not (variant_id := safe_get(data, 'id')):
-                    continue
-                price_info = safe_get(data, 'price', default={})
-                new_price = (
-                    safe_get(price_info, 'selling_price', default=0) or 0) // 10
-                new_rrp = (
-                    safe_get(price_info, 'rrp_price', default=0) or 0) // 10
-
-                variant, _ = Variant.objects.update_or_create(
-                    api_id=variant_id, product=product,
-                    defaults={
-                        'seller_name': safe_get(data, 'seller', 'title', default=''),
-                        'color_name': safe_get(data, 'color', 'title', default=''),
-                        'color_hex': safe_get(data, 'color', 'hex_code', default=''),
-                        'warranty_name': safe_get(data, 'warranty', 'title_fa', default=''),
-                        'selling_price': new_price, 'rrp_price': new_rrp
-                    }
-                )
-                latest_history = PriceHistory.objects.filter(
-                    variant=variant).first()
-                if not latest_history or latest_history.selling_price != new_price:
-                    history_to_create.append(PriceHistory(
-                        variant=variant, selling_price=new_price, rrp_price=new_rrp))
-
-            if history_to_create:
-                PriceHistory.objects.bulk_create(history_to_create)
-
-            Variant.objects.filter(product=product).exclude(
-                api_id__in=api_variant_ids).delete()
-
-            # --- Sync other related data ---
-            ReviewAttribute.objects.filter(product=product).delete()
-            review_attrs_to_create = [
-                ReviewAttribute(product=product, title=safe_get(
-                    attr, 'title'), value=", ".join(safe_get(attr, 'values', default=[])).strip())
-                for attr in safe_get(
-                    product_data,
-                    'review',
-                    'attributes',
-                    default=[]
-                    ) if safe_get(attr, 'title')
-            ]
-            if review_attrs_to_create:
-                ReviewAttribute.objects.bulk_create(review_attrs_to_create)
-
-            ProductSpecification.objects.filter(product=product).delete()
-            specs_to_create = []
-            for group_data in safe_get(product_data, 'specifications', default=[]):
-                if not (group_title := safe_get(group_data, 'title')):
-                    continue
-                group, _ = SpecGroup.objects.get_or_create(title=group_title)
-                for attr_data in safe_get(group_data, 'attributes', default=[]):
-                    if not (attr_title := safe_get(attr_data, 'title')):
-                        continue
-                    attribute, _ = SpecAttribute.objects.get_or_create(
-                        group=group, title=attr_title)
-                    value_str = ", ".join(v.strip() for v in safe_get(
-                        attr_data, 'values', default=[]) if v and v.strip())
-                    if value_str:
-                        specs_to_create.append(ProductSpecification(
-                            product=product, attribute=attribute, value=value_str))
-            if specs_to_create:
-                ProductSpecification.objects.bulk_create(specs_to_create)
-
-            ProductImage.objects.filter(product=product).delete()
-            main_image_url = safe_get(product_data, 'images', 'main', 'url', 0)
-            images_to_create = [
-                ProductImage(product=product, image_url=url,
-                            is_main=(url == main_image_url))
-                for img_data in safe_get(
-                    product_data,
-                    'images',
-                    'list',
-                    default=[]) if (url := safe_get(img_data, 'url', 0)
-                                    )
-            ]
-            if images_to_create:
-                ProductImage.objects.bulk_create(images_to_create)
-
-        logger.info(
-            f"Successfully {'created' if created else 'updated'} product ID: {product_id}")
-        return f"Success: {'Created' if created else 'Updated'} {product_id}"
+        record = parse_product_payload(fetch_product_data(product_id, product_type), product_type)
+        if record is None:
+            return f"Skipped {product_id}: Missing product, brand or category data."
+
+        stats = save_products([record])
+        scheduler.reschedule([record['api_id']])
+        outcome = next(name for name, count in stats.items() if count).replace('_', '-')
+
+        logger.info(f"Successfully processed product ID: {product_id} ({outcome})")
+        return f"Success: {outcome.capitalize()} {product_id}"
 
     except IntegrityError as e:
         logger.error(f"DB integrity error for {product_id}: {e}.")
         return f"Failed {product_id}: IntegrityError"
 
 
+def parse_detail_response(payload, product_type):
+    """ Extracts and normalizes the product from a detail endpoint response. """
+    return parse_product_payload(safe_get(payload, 'data', 'product'), product_type)
+
+
+def parse_archived(record):
+    """
+    Re-parses an archived detail response for `reparse_archive`. List pages are
+    not replayed, since their prices are only meaningful at the time of the scrape.
+
+    The product type is the one the response was fetched for. Records archived
+    before it was stored are matched to a type by their detail URL.
+    """
+    product_types = [
+        product_type for product_type, urls in SCRAPE_CONFIG.items()
+        if urls['detail_url'] and record['url'].startswith(urls['detail_url'].split('{', 1)[0])
+    ]
+    if not product_types:
+        return []
+    product_type = record.get('tags', {}).get('product_type')
+    if product_type is None and len(product_types) == 1:
+        product_type = product_types[0]
+    # Old records of product types sharing one detail endpoint are told apart by the stored product in save_archived().
+    record = parse_detail_response(json.loads(record['body']), product_type)
+    return [record] if record else []
+
+
+def save_archived(records):
+    """ Writes re-parsed products in large batches, keeping only the newest record of each product. """
+    records = list({record['api_id']: record for record in records}.values())
+    unknown = [record for record in records if record['product']['product_type'] is None]
+    if unknown:
+        stored = dict(Product.objects.filter(
+            api_id__in=[record['api_id'] for record in unknown]).values_list('api_id', 'product_type'))
+        for record in unknown:
+            record['product']['product_type'] = stored.get(record['api_id'], '')
+
+    totals = defaultdict(int)
+    for i in range(0, len(records), ARCHIVE_WRITE_BATCH_SIZE):
+        for name, count in save_products(records[i:i + ARCHIVE_WRITE_BATCH_SIZE]).items():
+            totals[name] += count
+    return dict(totals)
+
+
+def _complete_cycle_work(cycle_id, product_type):
+    """ Reports a finished task to its scrape cycle and starts the merged follow-up cycle, if any. """
+    if cycle_id and cycles.complete_work(cycle_id, product_type):
+        start_scrape_cycle(product_type)
+
+
 @shared_task
-def scrape_products(product_type, start_page=1, max_pages=10):
+def fetch_and_save_products_batch(product_ids, product_type, cycle_id=None):
+    """
+    Fetches the details of a page's worth of products concurrently and writes
+    them in batches, instead of one task and one transaction per product.
+    """
+    try:
+        return _fetch_and_save_products_batch(product_ids, product_type)
+    finally:
+        _complete_cycle_work(cycle_id, product_type)
+
+
+def _fetch_and_save_products_batch(product_ids, product_type):
+    detail_url = SCRAPE_CONFIG[product_type]['detail_url']
+    started = time.perf_counter()
+    write_ms, skipped = 0, 0
+    totals = {'created': 0, 'updated': 0, 'price_only': 0, 'unchanged': 0}
+
+    items = [(product_id, detail_url.format(product_id=product_id)) for product_id in product_ids]
+    parse = partial(parse_detail_response, product_type=product_type)
+    archive_tags = {'product_type': product_type}
+    for batch in fetcher.iter_batches(items, PRODUCT_BATCH_SIZE, parse=parse, archive_tags=archive_tags):
+        records, failed, incomplete = [], [], []
+        for product_id, record in batch:
+            if isinstance(record, Exception):
+                logger.error(f"Failed to fetch product {product_id}: {record}")
+                failed.append(product_id)
+            elif record is None:
+                incomplete.append(product_id)
+            else:
+                records.append(record)
+
+        write_started = time.perf_counter()
+        try:
+            stats = save_products(records)
+        except IntegrityError as e:
+            logger.error(f"DB integrity error for batch {[r['api_id'] for r in records]}: {e}.")
+            failed.extend(r['api_id'] for r in records)
+            continue
+        else:
+            for name, count in stats.items():
+                totals[name] += count
+            count_items(len(records))
+            count_rows(
+                inserted=stats['created'], updated=stats['updated'] + stats['price_only'], skipped=stats['unchanged'])
+            scheduler.reschedule([record['api_id'] for record in records])
+        finally:
+            write_ms += (time.perf_counter() - write_started) * 1000
+            skipped += len(failed) + len(incomplete)
+            cycles.release_products(failed)
+            # Retried later rather than on every beat tick while the upstream keeps failing.
+            scheduler.back_off(failed + incomplete)
+            cycles.mark_refreshed(product_id for product_id, _ in batch if product_id not in failed)
+
+    total_ms = (time.perf_counter() - started) * 1000
+    summary = (
+        f"{totals['created']} created, {totals['updated']} updated, {totals['price_only']} price-only, "
+        f"{totals['unchanged']} unchanged, {skipped} skipped"
+    )
+    logger.info(
+        f"'{product_type}' batch of {len(product_ids)}: {summary} (total {total_ms:.0f} ms, write {write_ms:.0f} ms).")
+    return f"Batch completed for '{product_type}': {summary} in {total_ms:.0f} ms."
+
+
+@shared_task
+def scrape_products(product_type, start_page=1, max_pages=10, batch_size=None, cycle_id=None):
     """Scrape products from the API and save them to the database."""
+    try:
+        return _scrape_products(product_type, start_page, max_pages, batch_size, cycle_id)
+    finally:
+        _complete_cycle_work(cycle_id, product_type)
+
+
+def _scrape_products(product_type, start_page, max_pages, batch_size, cycle_id):
+    batch_size = batch_size or PRODUCT_BATCH_SIZE
     logger.info(
         f"Starting '{product_type}' scrape from page {start_page} for {max_pages} pages.")
-    queued_count = 0
-    for page_num in range(start_page, start_page + max_pages):
-        try:
-            url = SCRAPE_CONFIG[product_type]['list_url'].format(page=page_num)
-            response = session.get(url, timeout=15)
-            response.raise_for_status()
-            products = safe_get(response.json(), 'data',
-                                'products', default=[])
-
-            if not products:
+    list_url = SCRAPE_CONFIG[product_type]['list_url']
+    end_page = start_page + max_pages
+
+    seen_count, repriced_count, queued_count, unchanged_pages = 0, 0, 0, 0
+    exhausted = False
+    for window_start in range(start_page, end_page, LIST_PAGE_WINDOW):
+        pages = fetcher.fetch_all(
+            ((page_num, list_url.format(page=page_num))
+             for page_num in range(window_start, min(window_start + LIST_PAGE_WINDOW, end_page))),
+            conditional=True)
+        for page_num in sorted(pages):
+            result = pages[page_num]
+            if isinstance(result, requests.exceptions.RequestException):
+                logger.error(
+                    f"Network error on page {page_num} for '{product_type}': {result}")
+                continue
+            if result is None:
+                # Same content as the last time this page was processed in full.
+                unchanged_pages += 1
+                continue
+            try:
+                if isinstance(result, Exception):
+                    raise result
+                payload, validators = result
+                products = safe_get(payload, 'data', 'products', default=[])
+
+                if not products:
+                    logger.info(
+                        f"No more products on page {page_num} for '{product_type}'. Stopping scrape.")
+                    exhausted = True
+                    break
+
+                # Prices on the list page are applied directly; only new, changed or due
+                # products are fetched, unless they are already queued or were refreshed recently.
+                items = [item for product_item in products if (item := parse_list_item(product_item))]
+                seen_count += len(items)
+                count_items(len(items))
+                need_detail, repriced = apply_list_prices(items)
+                repriced_count += repriced
+                count_rows(updated=repriced)
+                product_ids = cycles.claim_products(need_detail)
+                for i in range(0, len(product_ids), batch_size):
+                    if cycle_id:
+                        cycles.add_work(cycle_id)
+                    fetch_and_save_products_batch.delay(product_ids[i:i + batch_size], product_type, cycle_id)
+                queued_count += len(product_ids)
+
+                client.remember(validators)
                 logger.info(
-                    f"No more products on page {page_num} for '{product_type}'. Stopping scrape.")
-                break
-
-            for product_item in products:
-                # The 'if not exists' check is removed to ensure every product gets updated.
-                if product_id := product_item.get('id'):
-                    fetch_and_save_product_details.delay(
-                        product_id, product_type)
-                    queued_count += 1
-
-            logger.info(
-                f"Queued {queued_count} detail tasks from page {page_num}.")
-        except requests.exceptions.RequestException as e:
-            logger.error(
-                f"Network error on page {page_num} for '{product_type}': {e}")
-        except Exception as e:
-            logger.exception(
-                f"Unexpected error on page {page_num} for '{product_type}': {e}")
-
+                    f"Queued {queued_count} products in batches of {batch_size} from page {page_num}.")
+            except Exception as e:
+                logger.exception(
+                    f"Unexpected error on page {page_num} for '{product_type}': {e}")
+        if exhausted:
+            break
+
+    if cycle_id:
+        cycles.record_queue_depth(cycle_id, seen_count, queued_count)
     logger.info(
-        f"'{product_type}' scrape finished. Total tasks queued: {queued_count}.")
-    return f"Scraping completed for '{product_type}': {queued_count} tasks queued."
+        f"'{product_type}' scrape finished. Products seen: {seen_count}, repriced from list pages: "
+        f"{repriced_count}, queued after coalescing: {queued_count}, unchanged pages: {unchanged_pages}.")
+    return (
+        f"Scraping completed for '{product_type}': {queued_count} of {seen_count} products queued, "
+        f"{repriced_count} variants repriced from list pages."
+    )
+
+
+def start_scrape_cycle(product_type):
+    """
+    Queues a scrape of `product_type` unless its previous cycle is still in flight.
+    Returns True if a new cycle was started.
+    """
+    cycle_id = cycles.start(product_type)
+    if cycle_id is None:
+        logger.info(f"Previous '{product_type}' scrape cycle still running; not starting a new one.")
+        return False
+    scrape_products.delay(product_type=product_type, cycle_id=cycle_id)
+    return True
 
 
 @shared_task
@@ -276,12 +431,47 @@ def run_all_products_scrape():
     """
     A master task that initiates scraping for all configured product types.
     This is ideal for scheduling with Celery Beat.
+
+    A product type whose previous cycle is still in flight is not queued again,
+    so slow cycles can't pile up in the queue.
     """
     logger.info("Starting scrapes for all configured product types.")
+    started, held_back = 0, 0
     for product_type in SCRAPE_CONFIG.keys():
         if SCRAPE_CONFIG[product_type]['list_url']:  # Only run if URL is configured
-            scrape_products.delay(product_type=product_type)
+            if start_scrape_cycle(product_type):
+                started += 1
+            else:
+                held_back += 1
         else:
             logger.warning(
                 f"Skipping scrape for '{product_type}': LIST_API_URL not configured.")
-    return "All scrape tasks have been queued."
+    return f"{started} scrape cycles queued, {held_back} held back by an in-flight cycle."
+
+
+@shared_task
+def dispatch_due_products(batch_size=None):
+    """
+    Queues detail refreshes for the slice of products whose next_refresh_at has
+    passed, most overdue first. This is ideal for scheduling with Celery Beat.
+    """
+    batch_size = batch_size or PRODUCT_BATCH_SIZE
+    due = scheduler.due_products(SCRAPE_CONFIG)
+    by_type = defaultdict(list)
+    for api_id, product_type in due:
+        by_type[product_type].append(api_id)
+
+    queued_count = 0
+    for product_type, product_ids in by_type.items():
+        # Products a list scrape already queued are postponed too; their refresh reschedules them.
+        scheduler.postpone(product_ids, cycles.PRODUCT_FRESHNESS_WINDOW)
+        product_ids = cycles.claim_products(product_ids)
+        for i in range(0, len(product_ids), batch_size):
+            fetch_and_save_products_batch.delay(product_ids[i:i + batch_size], product_type)
+        queued_count += len(product_ids)
+
+    if len(due) >= scheduler.PRODUCT_DUE_SLICE:
+        logger.warning(
+            f"Due slice is full ({len(due)} products); raise PRODUCT_DUE_SLICE or add workers to keep up.")
+    logger.info(f"Dispatched {queued_count} of {len(due)} due products.")
+    return f"Dispatched {queued_count} of {len(due)} due products."
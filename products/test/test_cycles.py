@@ -0,0 +1,89 @@
+from unittest import mock
+from django.core.cache import cache
+from django.test import TestCase
+from products import cycles, tasks
+from products.models import ScrapeCycle
+
+
+
+
+class ScrapeCycleLeaseTest(TestCase):
+    """Test suite for the single-flight guard around scheduled product scrapes."""
+
+    def setUp(self):
+        cache.clear()
+
+    def test_overlapping_cycles_are_merged_then_skipped(self):
+        """Test that only one cycle runs per type and overlapping ticks are recorded."""
+        first = cycles.start('mobile')
+        self.assertIsNotNone(first)
+        self.assertIsNone(cycles.start('mobile'))
+        self.assertIsNone(cycles.start('mobile'))
+
+        statuses = list(ScrapeCycle.objects.order_by('pk').values_list('status', 'blocked_by'))
+        self.assertEqual(statuses, [('running', None), ('merged', first), ('skipped', first)])
+
+    def test_cycle_finishes_after_all_work_completes(self):
+        """Test that the lease is held until the list scrape and every batch have reported back."""
+        cycle_id = cycles.start('pc')
+        cycles.add_work(cycle_id, 2)
+
+        self.assertFalse(cycles.complete_work(cycle_id, 'pc'))
+        self.assertFalse(cycles.complete_work(cycle_id, 'pc'))
+        self.assertIsNone(cycles.start('pc'))  # Still held: one batch is outstanding.
+
+        self.assertTrue(cycles.complete_work(cycle_id, 'pc'))  # The merged tick asks for a follow-up.
+        self.assertEqual(ScrapeCycle.objects.get(pk=cycle_id).status, 'finished')
+        self.assertIsNotNone(cycles.start('pc'))
+
+    @mock.patch.object(tasks.scrape_products, 'delay')
+    def test_run_all_products_scrape_holds_back_in_flight_types(self, delay):
+        """Test that the beat task doesn't queue a type whose previous cycle is still running."""
+        cycles.start('mobile')
+        result = tasks.run_all_products_scrape()
+
+        self.assertIn("held back", result)
+        queued = {c.kwargs['product_type'] for c in delay.call_args_list}
+        self.assertEqual(queued, set(tasks.SCRAPE_CONFIG) - {'mobile'})
+
+    @mock.patch.object(tasks.scrape_products, 'delay')
+    @mock.patch.object(tasks, '_fetch_and_save_products_batch', return_value='done')
+    def test_last_batch_starts_merged_follow_up(self, _, delay):
+        """Test that the task finishing a cycle starts the follow-up merged into it."""
+        cycle_id = cycles.start('console')
+        cycles.start('console')
+        cycles.add_work(cycle_id)  # One batch queued by the list scrape...
+        cycles.complete_work(cycle_id, 'console')  # ...which then finishes itself.
+
+        tasks.fetch_and_save_products_batch([1], 'console', cycle_id)
+
+        delay.assert_called_once()
+        self.assertEqual(delay.call_args.kwargs['product_type'], 'console')
+
+
+class ClaimProductsTest(TestCase):
+    """Test suite for claiming products before a detail refresh."""
+
+    def setUp(self):
+        cache.clear()
+
+    def test_claims_are_taken_once(self):
+        """Test that a product is claimed once per freshness window and released claims can be retaken."""
+        self.assertEqual(cycles.claim_products([1, 2, 2]), [1, 2])
+        self.assertEqual(cycles.claim_products([2, 3]), [3])
+        cycles.release_products([2])
+        self.assertEqual(cycles.claim_products([2]), [2])
+
+    @mock.patch.object(cycles, '_uses_redis', return_value=True)
+    @mock.patch.object(cycles, '_redis_client')
+    def test_redis_claims_take_one_round_trip(self, redis_client, uses_redis):
+        """Test that the claims of a whole list window go out in a single pipeline."""
+        pipeline = redis_client.return_value.pipeline.return_value
+        pipeline.execute.return_value = [True, None, True]
+
+        self.assertEqual(cycles.claim_products([1, 2, 3, 1]), [1, 3])
+
+        pipeline.set.assert_any_call(
+            cache.make_key('products:detail-claim:2'), 1, nx=True, ex=cycles.PRODUCT_FRESHNESS_WINDOW)
+        self.assertEqual(pipeline.set.call_count, 3)
+        pipeline.execute.assert_called_once_with()
@@ -0,0 +1,54 @@
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from products import dimensions, tasks
+from products.ingest import save_products
+from products.models import Brand, SpecGroup
+from products.test.test_tasks import make_payload
+
+
+
+
+class DimensionCacheTest(TestCase):
+    """Test suite for the worker-local dimension cache."""
+
+    def setUp(self):
+        dimensions.invalidate()
+
+    def save(self, *product_ids):
+        with self.captureOnCommitCallbacks(execute=True):
+            return save_products([tasks.parse_product_payload(make_payload(pid)) for pid in product_ids])
+
+    def test_lru_eviction_is_bounded(self):
+        """Test that the least recently used keys are evicted beyond maxsize."""
+        cache = dimensions.DimensionCache(lambda limit: {}, maxsize=2)
+        cache.sync(0)
+        cache.set_many({'a': 1, 'b': 2})
+        cache.get_many(['a'])
+        cache.set_many({'c': 3})
+        self.assertEqual(len(cache), 2)
+        self.assertEqual(cache.get_many(['a', 'b', 'c']), {'a': 1, 'c': 3})
+
+    def test_known_dimensions_are_not_written_again(self):
+        """Test that cached brands, categories and spec rows cost no queries on the next batch."""
+        self.save(1)
+        with CaptureQueriesContext(connection) as queries:
+            self.save(2)
+        tables = ' '.join(q['sql'] for q in queries)
+        for table in ('products_brand', 'products_category', 'products_specgroup', 'products_specattribute'):
+            self.assertNotIn(table, tables)
+
+    def test_cache_is_warmed_from_database(self):
+        """Test that a fresh worker learns existing spec groups in one bulk load."""
+        SpecGroup.objects.create(title='Display')
+        dimensions.sync_all()
+        self.assertEqual(set(dimensions.spec_groups.get_many(['Display'])), {'Display'})
+
+    def test_admin_edit_invalidates_cache(self):
+        """Test that editing a brand outside the scraper forces the next batch to re-sync it."""
+        self.save(1)
+        Brand.objects.filter(api_id=10).update(title_en='Edited')
+        Brand.objects.get(api_id=10).save()  # As the admin would, firing post_save.
+
+        self.save(2)
+        self.assertEqual(Brand.objects.get(api_id=10).title_en, 'Samsung')
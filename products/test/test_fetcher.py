@@ -0,0 +1,58 @@
+import threading
+import time
+from unittest import mock
+import requests
+from django.test import SimpleTestCase
+from products.fetcher import AsyncFetcher
+from scraping.http import HttpClient
+
+
+
+
+class AsyncFetcherTest(SimpleTestCase):
+    """Test suite for the bounded-concurrency fetch engine."""
+
+    def setUp(self):
+        self.lock = threading.Lock()
+        self.in_flight = {}
+        self.peak = {}
+
+    def fake_get(self, url, timeout):
+        host = url.split('/')[2]
+        with self.lock:
+            self.in_flight[host] = self.in_flight.get(host, 0) + 1
+            self.peak[host] = max(self.peak.get(host, 0), self.in_flight[host])
+        time.sleep(0.01)
+        with self.lock:
+            self.in_flight[host] -= 1
+        if url.endswith('/fail'):
+            raise requests.ConnectionError('boom')
+        response = mock.Mock(status_code=200, content=b'{}')
+        response.json.return_value = {'url': url}
+        return response
+
+    def make_fetcher(self, per_host):
+        session = requests.Session()
+        session.get = self.fake_get
+        return AsyncFetcher(HttpClient(session, retries=0), per_host=per_host)
+
+    def test_in_flight_requests_are_bounded_per_host(self):
+        """Test that no host ever sees more than `per_host` concurrent requests."""
+        fetcher = self.make_fetcher(per_host=3)
+        items = [(i, f'http://host-{i % 2}/item/{i}') for i in range(20)]
+        results = fetcher.fetch_all(items)
+
+        self.assertEqual(len(results), 20)
+        self.assertEqual(set(self.peak), {'host-0', 'host-1'})
+        self.assertTrue(all(1 < peak <= 3 for peak in self.peak.values()), self.peak)
+
+    def test_results_are_yielded_in_batches_with_errors_inline(self):
+        """Test that payloads arrive parsed, in batches, and failures are reported per key."""
+        fetcher = self.make_fetcher(per_host=4)
+        items = [(i, f'http://host/item/{i}') for i in range(9)] + [('bad', 'http://host/fail')]
+        batches = list(fetcher.iter_batches(items, batch_size=4, parse=lambda payload: payload['url']))
+
+        self.assertEqual([len(batch) for batch in batches], [4, 4, 2])
+        results = dict(pair for batch in batches for pair in batch)
+        self.assertEqual(results[3], 'http://host/item/3')
+        self.assertIsInstance(results['bad'], requests.ConnectionError)
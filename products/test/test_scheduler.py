@@ -0,0 +1,88 @@
+from datetime import timedelta
+from unittest import mock
+from django.core.cache import cache
+from django.test import TestCase
+from django.utils import timezone
+from products import dimensions, scheduler, tasks
+from products.ingest import save_products
+from products.models import PriceHistory, Product, Variant
+from products.test.test_tasks import json_response, make_payload
+
+
+
+
+class RefreshSchedulerTest(TestCase):
+    """Test suite for the volatility-aware product refresh scheduler."""
+
+    def setUp(self):
+        cache.clear()
+        dimensions.invalidate()
+        save_products([tasks.parse_product_payload(make_payload(pid), 'mobile') for pid in (1, 2)])
+
+    def test_interval_follows_volatility_popularity_and_status(self):
+        """Test that volatile, popular and marketable products are refreshed sooner."""
+        static = scheduler.refresh_interval(0, 'marketable', 0)
+        self.assertLess(scheduler.refresh_interval(20, 'marketable', 0), static)
+        self.assertLess(scheduler.refresh_interval(0, 'marketable', 5000), static)
+        self.assertGreater(scheduler.refresh_interval(0, 'unavailable', 0), static)
+
+    def test_interval_is_bounded_by_max_staleness(self):
+        """Test that no product is scheduled beyond the staleness limit or below the minimum."""
+        self.assertEqual(scheduler.refresh_interval(0, 'unavailable', 0), scheduler.PRODUCT_MAX_STALENESS)
+        self.assertEqual(scheduler.refresh_interval(10 ** 6, 'marketable', 10 ** 6), scheduler.PRODUCT_REFRESH_MIN_INTERVAL)
+
+    def test_reschedule_uses_price_history(self):
+        """Test that the product with more recent price changes is due earlier."""
+        volatile = Variant.objects.get(product__api_id=1)
+        PriceHistory.objects.bulk_create(
+            [PriceHistory(variant=volatile, selling_price=i, rrp_price=i) for i in range(10)])
+
+        scheduler.reschedule([1, 2])
+
+        first, second = (Product.objects.get(api_id=pid).next_refresh_at for pid in (1, 2))
+        self.assertLess(first, second)
+
+    @mock.patch.object(tasks.session, 'get')
+    def test_failed_refreshes_back_off(self, session_get):
+        """Test that products whose refresh failed are retried later and later until one succeeds."""
+        incomplete = make_payload(1)
+        incomplete['brand'] = {}
+        session_get.side_effect = lambda url, **kwargs: json_response(
+            {'data': {'product': incomplete if url.rstrip('/').endswith('/1') else make_payload(2)}})
+
+        delays = []
+        for _ in range(3):
+            started = timezone.now()
+            tasks.fetch_and_save_products_batch([1, 2], 'mobile')
+            delays.append((Product.objects.get(api_id=1).next_refresh_at - started).total_seconds())
+        minimum = scheduler.PRODUCT_REFRESH_MIN_INTERVAL
+        self.assertEqual([round(delay / minimum) for delay in delays], [1, 2, 4])
+        self.assertGreater(Product.objects.get(api_id=2).next_refresh_at, timezone.now() + timedelta(seconds=minimum))
+
+        session_get.side_effect = lambda url, **kwargs: json_response({'data': {'product': make_payload(1)}})
+        tasks.fetch_and_save_products_batch([1], 'mobile')
+        scheduler.back_off([1])
+        self.assertLess(Product.objects.get(api_id=1).next_refresh_at, timezone.now() + timedelta(seconds=minimum + 5))
+
+    @mock.patch.object(tasks.fetch_and_save_products_batch, 'delay')
+    def test_dispatch_only_queues_due_products(self, delay):
+        """Test that beat dispatches the due slice and moves it out of the way."""
+        Product.objects.filter(api_id=1).update(next_refresh_at=timezone.now() - timedelta(minutes=1))
+        Product.objects.filter(api_id=2).update(next_refresh_at=timezone.now() + timedelta(hours=1))
+
+        self.assertIn("Dispatched 1 of 1", tasks.dispatch_due_products())
+        delay.assert_called_once_with([1], 'mobile')
+        self.assertEqual(scheduler.due_products(), [])
+
+    @mock.patch.object(tasks.fetch_and_save_products_batch, 'delay')
+    def test_undispatchable_products_leave_the_due_slice(self, delay):
+        """Test that products already queued by a list scrape or of a removed type don't stay at its head."""
+        Product.objects.update(next_refresh_at=timezone.now() - timedelta(minutes=1))
+        Product.objects.filter(api_id=2).update(product_type='removed')
+        tasks.cycles.claim_products([1])
+
+        self.assertEqual(scheduler.due_products(tasks.SCRAPE_CONFIG), [(1, 'mobile')])
+        self.assertIn("Dispatched 0 of 1", tasks.dispatch_due_products())
+        delay.assert_not_called()
+        self.assertEqual(scheduler.due_products(tasks.SCRAPE_CONFIG), [])
+
@@ -0,0 +1,333 @@
+from unittest import mock
+import json
+from datetime import timedelta
+import requests
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from products.ingest import save_products
+from products.models import (
+    PriceHistory, Product, ProductImage, ProductSpecification, ReviewAttribute, ScrapeCycle, Variant
+)
+from products import dimensions, tasks
+
+
+
+
+def make_payload(product_id, selling_price=1000000, variant_ids=(1,)):
+    """Builds a Digikala-shaped product payload for the tests."""
+    return {
+        'id': product_id,
+        'title_fa': f'محصول {product_id}',
+        'title_en': f'Product {product_id}',
+        'status': 'marketable',
+        'brand': {'id': 10, 'code': 'samsung', 'title_fa': 'سامسونگ', 'title_en': 'Samsung'},
+        'category': {'id': 20, 'code': 'mobile-phone', 'title_fa': 'گوشی', 'title_en': 'Mobile'},
+        'rating': {'rate': 4.5, 'count': 12},
+        'review': {
+            'description': 'Good phone',
+            'attributes': [{'title': 'Memory', 'values': ['128GB']}],
+        },
+        'variants': [
+            {
+                'id': product_id * 100 + variant_id,
+                'seller': {'title': 'Digikala'},
+                'color': {'title': 'Black', 'hex_code': '#000000'},
+                'warranty': {'title_fa': 'گارانتی'},
+                'price': {'selling_price': selling_price, 'rrp_price': selling_price},
+            }
+            for variant_id in variant_ids
+        ],
+        'specifications': [
+            {'title': 'Display', 'attributes': [{'title': 'Size', 'values': ['6.1 inch']}]},
+        ],
+        'images': {
+            'main': {'url': [f'https://img/{product_id}/main.jpg']},
+            'list': [{'url': [f'https://img/{product_id}/main.jpg']}, {'url': [f'https://img/{product_id}/2.jpg']}],
+        },
+    }
+
+
+class SaveProductsTest(TestCase):
+    """Test suite for the set-based product batch writer."""
+
+    def setUp(self):
+        dimensions.invalidate()
+
+    def test_batch_creates_products_and_related_rows(self):
+        """Test that a batch writes products, variants, history and child rows."""
+        records = [tasks.parse_product_payload(make_payload(pid)) for pid in (1, 2, 3)]
+        stats = save_products(records)
+
+        self.assertEqual(stats, {'created': 3, 'updated': 0, 'price_only': 0, 'unchanged': 0})
+        self.assertEqual(Product.objects.count(), 3)
+        self.assertEqual(Variant.objects.count(), 3)
+        self.assertEqual(PriceHistory.objects.count(), 3)
+        self.assertEqual(ReviewAttribute.objects.count(), 3)
+        self.assertEqual(ProductSpecification.objects.count(), 3)
+        self.assertEqual(ProductImage.objects.filter(is_main=True).count(), 3)
+        self.assertEqual(Product.objects.get(api_id=1).slug, '1-product-1')
+
+    def test_query_count_does_not_grow_with_batch_size(self):
+        """Test that writing ten products costs the same number of queries as writing two."""
+        dimensions.sync_all()
+        with CaptureQueriesContext(connection) as small:
+            save_products([tasks.parse_product_payload(make_payload(pid)) for pid in (1, 2)])
+        with CaptureQueriesContext(connection) as large:
+            save_products([tasks.parse_product_payload(make_payload(pid)) for pid in range(3, 13)])
+        self.assertEqual(len(small), len(large))
+
+    def test_price_history_only_appended_on_price_change(self):
+        """Test that re-saving the same price does not add history, but a new price does."""
+        save_products([tasks.parse_product_payload(make_payload(1))])
+        Product.objects.update(prices_hash='')
+        save_products([tasks.parse_product_payload(make_payload(1))])
+        self.assertEqual(PriceHistory.objects.count(), 1)
+
+        save_products([tasks.parse_product_payload(make_payload(1, selling_price=2000000))])
+        self.assertEqual(PriceHistory.objects.count(), 2)
+        self.assertEqual(Variant.objects.get().selling_price, 200000)
+
+    def test_unchanged_products_are_skipped(self):
+        """Test that an identical payload is detected by fingerprint and not written at all."""
+        save_products([tasks.parse_product_payload(make_payload(1))])
+        with CaptureQueriesContext(connection) as queries:
+            stats = save_products([tasks.parse_product_payload(make_payload(1))])
+        self.assertEqual(stats['unchanged'], 1)
+        self.assertFalse([q for q in queries if not q['sql'].startswith(('SELECT', 'SAVEPOINT', 'RELEASE'))])
+
+    def test_price_only_change_keeps_related_rows(self):
+        """Test that a price-only change updates variants and history but leaves other rows alone."""
+        save_products([tasks.parse_product_payload(make_payload(1))])
+        image_ids = set(ProductImage.objects.values_list('pk', flat=True))
+
+        stats = save_products([tasks.parse_product_payload(make_payload(1, selling_price=2000000))])
+
+        self.assertEqual(stats['price_only'], 1)
+        self.assertEqual(PriceHistory.objects.count(), 2)
+        self.assertEqual(set(ProductImage.objects.values_list('pk', flat=True)), image_ids)
+
+    def test_content_change_takes_full_path(self):
+        """Test that a changed title is written and counted as a full update."""
+        save_products([tasks.parse_product_payload(make_payload(1))])
+        payload = make_payload(1)
+        payload['title_en'] = 'Renamed'
+        stats = save_products([tasks.parse_product_payload(payload)])
+        self.assertEqual(stats['updated'], 1)
+        self.assertEqual(Product.objects.get().title_en, 'Renamed')
+
+    def test_history_decision_does_not_read_price_history(self):
+        """Test that the last recorded price comes from the variant row, not the history table."""
+        save_products([tasks.parse_product_payload(make_payload(1, variant_ids=(1, 2, 3)))])
+        self.assertEqual(set(Variant.objects.values_list('last_recorded_price', flat=True)), {100000})
+
+        with CaptureQueriesContext(connection) as queries:
+            save_products([tasks.parse_product_payload(make_payload(1, selling_price=2000000, variant_ids=(1, 2, 3)))])
+        history_reads = [q for q in queries if q['sql'].startswith('SELECT') and 'products_pricehistory' in q['sql']]
+        self.assertEqual(history_reads, [])
+        self.assertEqual(PriceHistory.objects.count(), 6)
+
+    def test_related_rows_are_reconciled_in_place(self):
+        """Test that changed child rows are updated, new ones added and missing ones removed."""
+        save_products([tasks.parse_product_payload(make_payload(1))])
+        spec = ProductSpecification.objects.get()
+        main_image = ProductImage.objects.get(is_main=True)
+
+        payload = make_payload(1)
+        payload['title_en'] = 'Refreshed'
+        payload['specifications'][0]['attributes'][0]['values'] = ['6.7 inch']
+        payload['review']['attributes'] = [{'title': 'Battery', 'values': ['5000mAh']}]
+        payload['images']['list'] = payload['images']['list'][:1]
+        save_products([tasks.parse_product_payload(payload)])
+
+        spec.refresh_from_db()
+        self.assertEqual(spec.value, '6.7 inch')
+        self.assertEqual(list(ProductImage.objects.values_list('pk', flat=True)), [main_image.pk])
+        self.assertEqual(list(ReviewAttribute.objects.values_list('title', flat=True)), ['Battery'])
+
+    def test_removed_variants_are_deleted(self):
+        """Test that variants missing from the payload are removed."""
+        save_products([tasks.parse_product_payload(make_payload(1, variant_ids=(1, 2)))])
+        save_products([tasks.parse_product_payload(make_payload(1, variant_ids=(2,)))])
+        self.assertEqual(list(Variant.objects.values_list('api_id', flat=True)), [102])
+
+
+def json_response(payload):
+    """Builds a mocked requests response returning `payload`."""
+    response = mock.Mock(status_code=200, headers={}, content=json.dumps(payload).encode())
+    response.json.return_value = payload
+    return response
+
+
+class ProductBatchTaskTest(TestCase):
+    """Test suite for the batched ingestion tasks."""
+
+    def setUp(self):
+        cache.clear()
+        dimensions.invalidate()
+
+    @mock.patch.object(tasks.session, 'get')
+    def test_batch_task_skips_incomplete_payloads(self, session_get):
+        """Test that products without brand data are skipped and the rest are written."""
+        incomplete = make_payload(2)
+        incomplete['brand'] = {}
+        payloads = {1: make_payload(1), 2: incomplete}
+        session_get.side_effect = lambda url, **kwargs: json_response(
+            {'data': {'product': payloads[int(url.rstrip('/').rsplit('/', 1)[1])]}})
+
+        result = tasks.fetch_and_save_products_batch([1, 2], 'mobile')
+
+        self.assertIn("1 created, 0 updated, 0 price-only, 0 unchanged, 1 skipped", result)
+        self.assertEqual(list(Product.objects.values_list('api_id', flat=True)), [1])
+
+    @mock.patch.object(tasks.fetch_and_save_products_batch, 'delay')
+    @mock.patch.object(tasks.session, 'get')
+    def test_scrape_products_queues_batches(self, session_get, delay):
+        """Test that list pages are split into batch tasks of the configured size."""
+        def list_page(url, **kwargs):
+            products = [{'id': i} for i in range(1, 6)] if url.endswith('page=1') else []
+            return json_response({'data': {'products': products}})
+        session_get.side_effect = list_page
+
+        tasks.scrape_products('mobile', batch_size=2)
+
+        self.assertEqual(
+            [c.args for c in delay.call_args_list],
+            [([1, 2], 'mobile', None), ([3, 4], 'mobile', None), ([5], 'mobile', None)],
+        )
+
+    @mock.patch.object(tasks, 'LIST_PAGE_WINDOW', 2)
+    @mock.patch.object(tasks.fetch_and_save_products_batch, 'delay')
+    @mock.patch.object(tasks.session, 'get')
+    def test_list_pages_stop_after_an_empty_window(self, session_get, delay):
+        """Test that list pages are requested a window at a time and none after an empty page."""
+        def list_page(url, **kwargs):
+            products = [{'id': int(url.rsplit('=', 1)[1])}] if url.endswith(('page=1', 'page=2')) else []
+            return json_response({'data': {'products': products}})
+        session_get.side_effect = list_page
+
+        tasks.scrape_products('mobile', max_pages=50)
+
+        self.assertEqual(
+            sorted(int(c.args[0].rsplit('=', 1)[1]) for c in session_get.call_args_list), [1, 2, 3, 4])
+        self.assertEqual([c.args[0] for c in delay.call_args_list], [[1], [2]])
+
+    @mock.patch.object(tasks.fetch_and_save_products_batch, 'delay')
+    @mock.patch.object(tasks.session, 'get')
+    def test_duplicate_products_are_coalesced(self, session_get, delay):
+        """Test that products already queued by an earlier scrape are not queued again."""
+        def list_page(url, **kwargs):
+            products = [{'id': 1}, {'id': 2}, {'id': 2}] if url.endswith(('page=1', 'page=2')) else []
+            # The pages change between scrapes, so the second one is not skipped as unchanged.
+            return json_response({'data': {'products': products, 'scrape': len(delay.call_args_list)}})
+        session_get.side_effect = list_page
+        cycle = ScrapeCycle.objects.create(product_type='mobile')
+
+        tasks.scrape_products('mobile', max_pages=3, cycle_id=cycle.pk)
+        result = tasks.scrape_products('mobile', max_pages=3)
+
+        self.assertEqual([c.args[0] for c in delay.call_args_list], [[1, 2]])
+        self.assertIn("0 of 6 products queued", result)
+        cycle.refresh_from_db()
+        self.assertEqual((cycle.products_seen, cycle.products_queued), (6, 2))
+
+    @mock.patch('scraping.http.time.sleep')
+    @mock.patch.object(tasks.fetch_and_save_products_batch, 'delay')
+    @mock.patch.object(tasks.session, 'get')
+    def test_failed_fetch_releases_claim(self, session_get, delay, sleep):
+        """Test that a product whose detail fetch failed can be queued again right away."""
+        session_get.side_effect = requests.ConnectionError('down')
+        self.assertEqual(tasks.cycles.claim_products([7]), [7])
+
+        tasks.fetch_and_save_products_batch([7], 'mobile')
+
+        self.assertEqual(tasks.cycles.claim_products([7]), [7])
+
+
+def list_item(product_id, selling_price=1000000, status='marketable'):
+    """Builds a Digikala-shaped list page item priced through its default variant."""
+    return {
+        'id': product_id,
+        'status': status,
+        'default_variant': {
+            'id': product_id * 100 + 1,
+            'price': {'selling_price': selling_price, 'rrp_price': selling_price},
+        },
+    }
+
+
+class ListFastPathTest(TestCase):
+    """Test suite for applying list page data without fetching product details."""
+
+    def setUp(self):
+        cache.clear()
+        dimensions.invalidate()
+        save_products([tasks.parse_product_payload(make_payload(pid), 'mobile') for pid in (1, 2, 3)])
+        Product.objects.update(next_refresh_at=timezone.now() + timedelta(hours=1))
+
+    def scrape(self, session_get, items):
+        session_get.side_effect = lambda url, **kwargs: json_response(
+            {'data': {'products': items if url.endswith('page=1') else []}})
+        return tasks.scrape_products('mobile', max_pages=2)
+
+    @mock.patch.object(tasks.fetch_and_save_products_batch, 'delay')
+    @mock.patch.object(tasks.session, 'get')
+    def test_list_price_change_is_applied_without_detail_fetch(self, session_get, delay):
+        """Test that a changed list price updates the variant and history in place."""
+        result = self.scrape(session_get, [list_item(1, selling_price=2000000), list_item(2)])
+
+        delay.assert_not_called()
+        self.assertIn("0 of 2 products queued, 1 variants repriced", result)
+        variant = Variant.objects.get(api_id=101)
+        self.assertEqual((variant.selling_price, variant.last_recorded_price), (200000, 200000))
+        self.assertEqual(PriceHistory.objects.filter(variant=variant).count(), 2)
+        self.assertEqual(PriceHistory.objects.count(), 4)
+
+    @mock.patch.object(tasks.fetch_and_save_products_batch, 'delay')
+    @mock.patch.object(tasks.session, 'get')
+    def test_detail_reverting_a_list_price_is_written(self, session_get, delay):
+        """Test that a detail payload back at the old price is not skipped after a list reprice."""
+        self.scrape(session_get, [list_item(1, selling_price=2000000)])
+
+        stats = save_products([tasks.parse_product_payload(make_payload(1), 'mobile')])
+
+        self.assertEqual(stats['price_only'], 1)
+        variant = Variant.objects.get(api_id=101)
+        self.assertEqual((variant.selling_price, variant.last_recorded_price), (100000, 100000))
+        self.assertEqual(
+            list(PriceHistory.objects.filter(variant=variant).order_by('id').values_list('selling_price', flat=True)),
+            [100000, 200000, 100000])
+        self.assertEqual(save_products([tasks.parse_product_payload(make_payload(1), 'mobile')])['unchanged'], 1)
+
+    @mock.patch.object(tasks.fetch_and_save_products_batch, 'delay')
+    @mock.patch.object(tasks.session, 'get')
+    def test_new_changed_and_due_products_are_fetched(self, session_get, delay):
+        """Test that new products, status changes and stale details still get a detail fetch."""
+        Product.objects.filter(api_id=2).update(next_refresh_at=timezone.now() - timedelta(minutes=1))
+        unknown_variant = list_item(3)
+        unknown_variant['default_variant']['id'] = 399
+
+        self.scrape(session_get, [list_item(1, status='out_of_stock'), list_item(2), unknown_variant, list_item(4)])
+
+        self.assertEqual(delay.call_args.args[0], [1, 2, 3, 4])
+        self.assertEqual(PriceHistory.objects.count(), 3)
+
+    @mock.patch.object(tasks.fetch_and_save_products_batch, 'delay')
+    @mock.patch.object(tasks.session, 'get')
+    def test_unchanged_list_pages_are_skipped(self, session_get, delay):
+        """Test that a list page with the same body or a 304 is not parsed or written again."""
+        page = json_response({'data': {'products': [list_item(1, selling_price=2000000)]}})
+        page.headers = {'ETag': '"v1"'}
+        not_modified = mock.Mock(status_code=304, headers={}, content=b'')
+        session_get.side_effect = lambda url, **kwargs: (
+            not_modified if kwargs['headers'].get('If-None-Match') == '"v1"' and url.endswith('page=1')
+            else page if url.endswith('page=1') else json_response({'data': {'products': []}}))
+
+        self.assertIn("1 variants repriced", tasks.scrape_products('mobile', max_pages=2))
+
+        with mock.patch.object(tasks, 'apply_list_prices') as apply:
+            result = tasks.scrape_products('mobile', max_pages=2)
+        apply.assert_not_called()
+        self.assertIn("0 of 0 products queued", result)
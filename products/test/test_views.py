@@ -0,0 +1,54 @@
+from datetime import datetime, timezone as dt_timezone
+import msgpack
+from django.core.cache import cache
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+from products.ingest import save_products
+from products.models import PriceHistory, Variant
+from products import dimensions, tasks
+from .test_tasks import make_payload
+
+
+class ProductPriceHistoryViewTest(APITestCase):
+    """Test suite for the product price history endpoint."""
+
+    def setUp(self):
+        cache.clear()
+        dimensions.invalidate()
+        save_products([tasks.parse_product_payload(make_payload(1, variant_ids=(1, 2)), 'mobile')])
+        PriceHistory.objects.all().delete()
+        for api_id, day, price in [(101, 1, 1000), (101, 2, 1100), (102, 1, 2000)]:
+            history = PriceHistory.objects.create(
+                variant=Variant.objects.get(api_id=api_id), selling_price=price, rrp_price=price + 100)
+            PriceHistory.objects.filter(pk=history.pk).update(
+                timestamp=datetime(2025, 1, day, tzinfo=dt_timezone.utc))
+        self.url = reverse('product-price-history', kwargs={'lookup': 1})
+
+    def test_history_as_columns(self):
+        """Test that the history is served as equally long columns in a fixed order."""
+        response = self.client.get(self.url, {'format': 'columnar'})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response['Content-Type'], 'application/vnd.price.columnar+json')
+        columns = response.json()
+        self.assertEqual(list(columns), ['variant', 'timestamp', 'selling_price', 'rrp_price'])
+        self.assertEqual({len(values) for values in columns.values()}, {3})
+        self.assertEqual(columns['variant'], [101, 101, 102])
+        self.assertEqual(columns['timestamp'], [1735776000, 1735689600, 1735689600])
+        self.assertEqual(columns['selling_price'], [1100, 1000, 2000])
+        self.assertEqual(columns['rrp_price'], [1200, 1100, 2100])
+
+    def test_history_as_msgpack(self):
+        """Test that the MessagePack response decodes to the same columns as the columnar JSON."""
+        response = self.client.get(self.url, HTTP_ACCEPT='application/msgpack')
+
+        self.assertEqual(response['Content-Type'], 'application/msgpack')
+        self.assertEqual(msgpack.unpackb(response.content), self.client.get(self.url, {'format': 'columnar'}).json())
+
+    def test_history_defaults_to_json_objects(self):
+        """Test that plain JSON still returns one object per price point."""
+        response = self.client.get(self.url)
+
+        self.assertEqual(len(response.data), 3)
+        self.assertEqual(response.data[0]['selling_price'], 1100)
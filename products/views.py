@@ -7,6 +7,7 @@ from .models import PriceHistory, Product, Brand, Category
 from .serializers import (
     PriceHistorySerializer, ProductSerializer, ProductListSerializer, BrandSerializer, CategorySerializer
 )
+from renderers import TIME_SERIES_RENDERERS, to_columns, wants_columns
 
 
 class ProductListView(APIView):
@@ -213,7 +214,11 @@ class ProductSearchView(APIView):
 class ProductPriceHistoryView(APIView):
     """
     Provides the price history for all variants of a specific product.
+    - `?format=columnar` (JSON) or `?format=msgpack`, or the matching Accept header, return
+      parallel arrays of variant ids, timestamps (Unix seconds) and prices.
     """
+    renderer_classes = TIME_SERIES_RENDERERS
+
     def get(self, request, lookup, format=None):
         """
         Handles the GET request to retrieve price history.
@@ -223,6 +228,10 @@ class ProductPriceHistoryView(APIView):
         queryset = PriceHistory.objects.filter(
             variant__product=product
         ).select_related('variant').order_by('variant__api_id', '-timestamp')
-        
+        if wants_columns(request):
+            fields = ['variant__api_id', 'timestamp', 'selling_price', 'rrp_price']
+            columns = to_columns(queryset.values_list(*fields), fields)
+            return Response({'variant': columns.pop('variant__api_id'), **columns})
+
         serializer = PriceHistorySerializer(queryset, many=True)
         return Response(serializer.data)
@@ -0,0 +1,71 @@
+from datetime import date, datetime
+from decimal import Decimal
+import msgpack
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+from rest_framework.settings import api_settings
+
+
+# Formats in which time series are served as parallel arrays instead of one object per point.
+COLUMNAR_FORMATS = ('columnar', 'msgpack')
+
+# Timestamps become Unix seconds, decimals floats and dates ISO strings.
+_CONVERTERS = {
+    datetime: lambda value: int(value.timestamp()),
+    Decimal: float,
+    date: date.isoformat,
+}
+
+
+def _column(values):
+    sample = next((value for value in values if value is not None), None)
+    convert = _CONVERTERS.get(type(sample))
+    if convert is None:
+        return list(values)
+    return [None if value is None else convert(value) for value in values]
+
+
+def to_columns(rows, fields):
+    """
+    Turns rows (tuples from `values_list(*fields)`, or dicts from `values()`)
+    into {field: [values]}, converting one column at a time without building
+    a serializer per row.
+    """
+    rows = list(rows)
+    if rows and isinstance(rows[0], dict):
+        rows = [tuple(row[field] for field in fields) for row in rows]
+    columns = list(zip(*rows)) if rows else [()] * len(fields)
+    return {field: _column(column) for field, column in zip(fields, columns)}
+
+
+def wants_columns(request):
+    """ Whether content negotiation picked a columnar format for `request`. """
+    return request.accepted_renderer.format in COLUMNAR_FORMATS
+
+
+class ColumnarJSONRenderer(JSONRenderer):
+    """
+    Compact JSON for time series in columnar form. Requested with
+    `Accept: application/vnd.price.columnar+json` or `?format=columnar`.
+    """
+    media_type = 'application/vnd.price.columnar+json'
+    format = 'columnar'
+
+
+class MessagePackRenderer(BaseRenderer):
+    """
+    MessagePack for time series in columnar form. Requested with
+    `Accept: application/msgpack` or `?format=msgpack`.
+    """
+    media_type = 'application/msgpack'
+    format = 'msgpack'
+    charset = None
+    render_style = 'binary'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        return msgpack.packb(data, default=str)
+
+
+# Renderers of the time series endpoints: the defaults first, so plain JSON stays the default.
+TIME_SERIES_RENDERERS = [*api_settings.DEFAULT_RENDERER_CLASSES, ColumnarJSONRenderer, MessagePackRenderer]
@@ -0,0 +1,9 @@
+from django.apps import AppConfig
+
+
+class ScrapingConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'scraping'
+
+    def ready(self):
+        from . import instrumentation  # noqa: F401  Connects the Celery signal handlers.
@@ -0,0 +1,73 @@
+import gzip
+import json
+import logging
+import os
+import socket
+import threading
+from datetime import date
+from pathlib import Path
+from django.conf import settings
+from django.utils import timezone
+
+
+logger = logging.getLogger(__name__)
+
+_lock = threading.Lock()
+
+
+def _root():
+    return Path(settings.SCRAPE_ARCHIVE_DIR) if settings.SCRAPE_ARCHIVE_DIR else None
+
+
+def append(source, url, body, tags=None):
+    """
+    Appends one raw upstream response to the archive of `source`, with optional
+    `tags` (a dict) recording what the response was fetched for.
+
+    Records go to <SCRAPE_ARCHIVE_DIR>/<source>/<local date>/<host>-<pid>-<hour>.jsonl.gz.
+    Each record is its own gzip member, so files are only ever appended to, every
+    process writes its own files, and a day splits into many files to re-parse in
+    parallel. Archiving is off when SCRAPE_ARCHIVE_DIR is empty, and a failure to
+    write is logged but never fails the scrape.
+    """
+    if not (root := _root()):
+        return
+    now = timezone.now()
+    local = timezone.localtime(now)
+    path = root / source / local.date().isoformat() / f'{socket.gethostname()}-{os.getpid()}-{local:%H}.jsonl.gz'
+    if isinstance(body, bytes):
+        body = body.decode('utf-8', errors='replace')
+    record = {'url': url, 'fetched_at': now.isoformat(), 'body': body}
+    if tags:
+        record['tags'] = tags
+    line = json.dumps(record, ensure_ascii=False) + '\n'
+    try:
+        with _lock:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            with open(path, 'ab') as archive_file:
+                archive_file.write(gzip.compress(line.encode()))
+    except OSError:
+        logger.exception(f"Could not archive the response of {url} to {path}.")
+
+
+def partitions(source, since=None, until=None):
+    """ Returns [(date, [file paths])] of the archive of `source` between `since` and `until`, oldest first. """
+    if not (root := _root()) or not (root / source).is_dir():
+        return []
+    found = []
+    for day_dir in sorted((root / source).iterdir()):
+        try:
+            day = date.fromisoformat(day_dir.name)
+        except ValueError:
+            continue
+        if (since and day < since) or (until and day > until):
+            continue
+        found.append((day, sorted(day_dir.glob('*.jsonl.gz'))))
+    return found
+
+
+def read(path):
+    """ Yields the records of one archive file in the order they were written. """
+    with gzip.open(path, 'rt', encoding='utf-8') as archive_file:
+        for line in archive_file:
+            yield json.loads(line)
@@ -0,0 +1,121 @@
+def safe_get(data, *keys, default=''):
+    """
+    Safely get nested values from dict/list structures.
+
+    Args:
+        data: The data structure to get value from
+        *keys: Keys/indices to traverse (e.g., 'rating', 'rate')
+        default: Default value if path doesn't exist
+
+    Returns:
+        The value at the path or default if not found
+    """
+    if not data:
+        return default
+
+    current = data
+    for key in keys:
+        try:
+            if isinstance(current, (list, tuple)):
+                # Handle list indices or get first element if key is not an integer
+                current = current[key] if isinstance(key, int) else current[0]
+            elif isinstance(current, dict):
+                current = current.get(key, default)
+            else:
+                return default
+
+            if current is None:
+                return default
+
+        except (IndexError, KeyError, TypeError):
+            return default
+
+    return current
+
+
+def _item(sequence, index):
+    """ Indexes only into lists and tuples, like safe_get does. """
+    if isinstance(sequence, (list, tuple)):
+        return sequence[index]
+    raise TypeError(f"Cannot index {type(sequence).__name__} with {index}")
+
+
+class Field:
+    """
+    One output field of an Extractor: the path to read, the value to use when the
+    path is missing or None, and an optional conversion applied to the result.
+    """
+
+    def __init__(self, path, default='', convert=None):
+        self.path = (path,) if isinstance(path, (str, int)) else tuple(path)
+        self.default = default
+        self.convert = convert
+
+
+class Extractor:
+    """
+    Maps a JSON payload to a flat dict of fields, declared once as {name: path}.
+
+    The mapping is compiled into a single Python function with one direct
+    subscript chain per field (`data['rating']['rate']`), so a whole payload is
+    read without walking it from the root once per field. When a chain fails
+    (a missing key, an unexpected list or a non-dict), that field falls back to
+    safe_get, so the results follow safe_get's rules.
+
+    Example:
+        VARIANT = Extractor({
+            'api_id': 'id',
+            'seller_name': ('seller', 'title'),
+            'selling_price': Field(('price', 'selling_price'), default=0),
+        })
+        VARIANT(payload)  # {'api_id': ..., 'seller_name': ..., 'selling_price': ...}
+    """
+
+    def __init__(self, fields):
+        self.fields = {
+            name: field if isinstance(field, Field) else Field(field) for name, field in fields.items()
+        }
+        self._extract = self._compile()
+
+    def _compile(self):
+        namespace = {'_item': _item, '_fallbacks': [], '_defaults': [], '_converts': []}
+        lines = ['def extract(data):', '    out = {}']
+        for i, (name, field) in enumerate(self.fields.items()):
+            namespace['_fallbacks'].append(
+                lambda data, path=field.path, default=field.default: safe_get(data, *path, default=default))
+            namespace['_defaults'].append(field.default)
+            namespace['_converts'].append(field.convert)
+            access = 'data'
+            for key in field.path:
+                access = f'_item({access}, {key})' if isinstance(key, int) else f'{access}[{key!r}]'
+            lines += [
+                '    try:',
+                f'        value = {access}',
+                '    except (KeyError, IndexError, TypeError):',
+                f'        value = _fallbacks[{i}](data)',
+                '    else:',
+                '        if value is None:',
+                f'            value = _defaults[{i}]',
+            ]
+            if field.convert:
+                lines.append(f'    value = _converts[{i}](value)')
+            lines.append(f'    out[{name!r}] = value')
+        lines.append('    return out')
+        exec('\n'.join(lines), namespace)
+        return namespace['extract']
+
+    def __call__(self, data):
+        return self._extract(data)
+
+    def many(self, items):
+        """ Extracts every payload in `items`. """
+        extract = self._extract
+        return [extract(item) for item in items or ()]
+
+    def reference(self, data):
+        """ Extracts `data` with one safe_get call per field; the baseline the compiled version is measured against. """
+        out = {}
+        for name, field in self.fields.items():
+            value = safe_get(data, *field.path, default=field.default)
+            out[name] = field.convert(value) if field.convert else value
+        return out
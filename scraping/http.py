@@ -0,0 +1,208 @@
+import hashlib
+import logging
+import random
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from urllib.parse import urlsplit
+import requests
+from decouple import config
+from django.core.cache import cache
+from . import archive, metrics
+
+
+logger = logging.getLogger(__name__)
+
+SCRAPE_HTTP_TIMEOUT = config('SCRAPE_HTTP_TIMEOUT', default=20, cast=float)
+SCRAPE_HTTP_RETRIES = config('SCRAPE_HTTP_RETRIES', default=3, cast=int)
+# Retry n waits a random time between 0 and min(SCRAPE_HTTP_BACKOFF_MAX, SCRAPE_HTTP_BACKOFF_BASE * 2**n).
+SCRAPE_HTTP_BACKOFF_BASE = config('SCRAPE_HTTP_BACKOFF_BASE', default=0.5, cast=float)
+SCRAPE_HTTP_BACKOFF_MAX = config('SCRAPE_HTTP_BACKOFF_MAX', default=30, cast=float)
+# A backup request is sent when the first one takes longer than this many seconds (0 disables hedging).
+SCRAPE_HTTP_HEDGE_AFTER = config('SCRAPE_HTTP_HEDGE_AFTER', default=0, cast=float)
+# This many consecutive failures open a host's circuit for SCRAPE_BREAKER_COOLDOWN seconds.
+SCRAPE_BREAKER_THRESHOLD = config('SCRAPE_BREAKER_THRESHOLD', default=5, cast=int)
+SCRAPE_BREAKER_COOLDOWN = config('SCRAPE_BREAKER_COOLDOWN', default=60, cast=int)
+# Stored ETag/Last-Modified/body hash of a URL expire after this many seconds, so
+# unchanged content is still processed in full now and then.
+SCRAPE_VALIDATORS_TTL = config('SCRAPE_VALIDATORS_TTL', default=3600, cast=int)
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+_CLOSED, _HALF_OPEN, _OPEN = 0, 1, 2
+
+
+class CircuitOpen(requests.exceptions.RequestException):
+    """ Raised instead of calling a host whose circuit breaker is open. """
+
+
+class CircuitBreaker:
+    """
+    A per-host circuit breaker whose state lives in the Django cache, so all
+    workers stop calling a failing host together.
+
+    After `threshold` consecutive failures the circuit opens for `cooldown`
+    seconds. Then it is half-open: a single probe request is let through, and
+    its outcome closes the circuit or opens it again.
+    """
+
+    def __init__(self, threshold=SCRAPE_BREAKER_THRESHOLD, cooldown=SCRAPE_BREAKER_COOLDOWN):
+        self.threshold = threshold
+        self.cooldown = cooldown
+
+    def state(self, host):
+        """ Returns 0 (closed), 1 (half-open) or 2 (open). """
+        state = cache.get_many([f'scraping:breaker-open:{host}', f'scraping:breaker-failures:{host}'])
+        if state.get(f'scraping:breaker-open:{host}'):
+            return _OPEN
+        return _HALF_OPEN if state.get(f'scraping:breaker-failures:{host}', 0) >= self.threshold else _CLOSED
+
+    def allow(self, host):
+        """ Returns whether a request to `host` may be sent now. """
+        state = self.state(host)
+        metrics.CIRCUIT_BREAKER_STATE.labels(host).set(state)
+        if state == _HALF_OPEN:
+            return cache.add(f'scraping:breaker-probe:{host}', 1, timeout=self.cooldown)
+        return state == _CLOSED
+
+    def record_success(self, host):
+        if self.state(host) != _CLOSED:
+            logger.info(f"Circuit for {host} closed again.")
+        cache.delete_many([f'scraping:breaker-failures:{host}', f'scraping:breaker-probe:{host}'])
+        metrics.CIRCUIT_BREAKER_STATE.labels(host).set(_CLOSED)
+
+    def record_failure(self, host):
+        cache.add(f'scraping:breaker-failures:{host}', 0, timeout=None)
+        if cache.incr(f'scraping:breaker-failures:{host}') >= self.threshold:
+            cache.set(f'scraping:breaker-open:{host}', 1, timeout=self.cooldown)
+            cache.delete(f'scraping:breaker-probe:{host}')
+            metrics.CIRCUIT_BREAKER_STATE.labels(host).set(_OPEN)
+            logger.warning(f"Circuit for {host} opened for {self.cooldown}s after repeated failures.")
+
+
+class HttpClient:
+    """
+    Sends scraper GET requests with a timeout, jittered exponential retries on
+    connection errors, timeouts and 429/5xx responses, a circuit breaker per
+    host, and optionally a hedged backup request when the first one is slow.
+
+    Only the final outcome is returned or raised; the exceptions are
+    requests.RequestException subclasses, so callers keep their error handling.
+    With `archive_source`, every response body that gets processed is also
+    appended to the raw payload archive under that source, along with the
+    `archive_tags` passed to the request.
+    """
+
+    def __init__(self, session, timeout=SCRAPE_HTTP_TIMEOUT, retries=SCRAPE_HTTP_RETRIES,
+                 hedge_after=SCRAPE_HTTP_HEDGE_AFTER, breaker=None, archive_source=None):
+        self.session = session
+        self.archive_source = archive_source
+        self.timeout = timeout
+        self.retries = retries
+        self.hedge_after = hedge_after
+        self.breaker = breaker or CircuitBreaker()
+        self._hedge_pool = ThreadPoolExecutor(max_workers=32) if hedge_after else None
+
+    def _send(self, host, url, kwargs):
+        if not self._hedge_pool:
+            return self.session.get(url, timeout=self.timeout, **kwargs)
+
+        first = self._hedge_pool.submit(self.session.get, url, timeout=self.timeout, **kwargs)
+        if wait([first], timeout=self.hedge_after).done:
+            return first.result()
+        metrics.HTTP_HEDGED_REQUESTS.labels(host).inc()
+        pending = {first, self._hedge_pool.submit(self.session.get, url, timeout=self.timeout, **kwargs)}
+        while True:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in sorted(done, key=lambda future: future.exception() is not None):
+                if future.exception() is None or not pending:
+                    return future.result()
+
+    def _archive(self, response, tags=None):
+        if self.archive_source and response.status_code == 200:
+            archive.append(self.archive_source, response.url or '', response.content, tags)
+
+    def get(self, url, archive_tags=None, **kwargs):
+        """
+        Returns the response to a GET of `url`.
+
+        Raises:
+            CircuitOpen: If the host's circuit is open.
+            requests.RequestException: If the last attempt failed.
+        """
+        response = self._get(url, kwargs)
+        self._archive(response, archive_tags)
+        return response
+
+    def _get(self, url, kwargs):
+        host = urlsplit(url).netloc
+        for attempt in range(self.retries + 1):
+            if not self.breaker.allow(host):
+                raise CircuitOpen(f"Circuit for {host} is open, not requesting {url}.")
+            started = time.perf_counter()
+            try:
+                response = self._send(host, url, kwargs)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                metrics.HTTP_REQUEST_SECONDS.labels(host, 'error').observe(time.perf_counter() - started)
+                error = e
+                self.breaker.record_failure(host)
+            else:
+                metrics.HTTP_REQUEST_SECONDS.labels(host, response.status_code).observe(time.perf_counter() - started)
+                metrics.HTTP_RESPONSE_BYTES.labels(host).inc(len(response.content or b''))
+                if response.status_code not in RETRY_STATUSES:
+                    self.breaker.record_success(host)
+                    response.raise_for_status()
+                    return response
+                error = requests.HTTPError(f"{response.status_code} from {url}", response=response)
+                if response.status_code != 429:  # Throttling is the rate limiter's business.
+                    self.breaker.record_failure(host)
+
+            if attempt == self.retries:
+                raise error
+            delay = random.uniform(0, min(SCRAPE_HTTP_BACKOFF_MAX, SCRAPE_HTTP_BACKOFF_BASE * 2 ** attempt))
+            metrics.HTTP_RETRIES.labels(host).inc()
+            logger.warning(f"Attempt {attempt + 1} for {url} failed ({error}). Retrying in {delay:.1f}s.")
+            time.sleep(delay)
+
+    def get_json(self, url, archive_tags=None, **kwargs):
+        return self.get(url, archive_tags, **kwargs).json()
+
+    def get_if_changed(self, url, archive_tags=None, **kwargs):
+        """
+        Sends a conditional GET of `url` using the validators remembered for it.
+
+        Returns:
+            None if the upstream answered 304 or sent the same body as last time.
+            Otherwise the response, with a `validators` attribute to pass to
+            remember() once its content has been processed.
+        """
+        full_url = requests.Request('GET', url, params=kwargs.get('params')).prepare().url
+        key = f'scraping:validators:{hashlib.sha1(full_url.encode()).hexdigest()}'
+        known = cache.get(key) or {}
+        headers = dict(kwargs.pop('headers', None) or {})
+        if known.get('etag'):
+            headers['If-None-Match'] = known['etag']
+        if known.get('last_modified'):
+            headers['If-Modified-Since'] = known['last_modified']
+
+        response = self._get(url, {**kwargs, 'headers': headers})
+        host = urlsplit(url).netloc
+        if response.status_code == 304:
+            metrics.HTTP_UNCHANGED_RESPONSES.labels(host, 'not-modified').inc()
+            return None
+        body_hash = hashlib.sha256(response.content).hexdigest()
+        if body_hash == known.get('body_hash'):
+            metrics.HTTP_UNCHANGED_RESPONSES.labels(host, 'same-body').inc()
+            return None
+
+        response.validators = {
+            'key': key,
+            'etag': response.headers.get('ETag'),
+            'last_modified': response.headers.get('Last-Modified'),
+            'body_hash': body_hash,
+        }
+        self._archive(response, archive_tags)
+        return response
+
+    def remember(self, validators):
+        """ Stores the validators of a processed response, so the next identical one is skipped. """
+        cache.set(validators['key'], validators, timeout=SCRAPE_VALIDATORS_TTL)
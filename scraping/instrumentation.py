@@ -0,0 +1,136 @@
+import logging
+import os
+import threading
+import time
+from datetime import datetime
+from celery import signals
+from decouple import config
+from django.db import connection
+from prometheus_client import REGISTRY, CollectorRegistry, multiprocess, start_http_server
+from . import metrics
+
+
+logger = logging.getLogger(__name__)
+
+# Port of the metrics endpoint each Celery worker serves (0 disables it).
+SCRAPE_METRICS_PORT = config('SCRAPE_METRICS_PORT', default=9808, cast=int)
+
+# Label used for work done outside a Celery task, e.g. by management commands.
+NO_TASK = 'none'
+
+_local = threading.local()
+
+
+def registry():
+    """
+    Returns the registry to export. With PROMETHEUS_MULTIPROC_DIR set, the values
+    of every process (gunicorn or prefork workers) are merged from that directory.
+    """
+    if not os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        return REGISTRY
+    merged = CollectorRegistry()
+    multiprocess.MultiProcessCollector(merged)
+    return merged
+
+
+class _TaskRun:
+    """ What one running task has done so far. """
+
+    def __init__(self, name):
+        self.name = name
+        self.started = time.perf_counter()
+        self.items = 0
+        self.queries = 0
+        self.query_seconds = 0.0
+
+
+def _runs():
+    if not hasattr(_local, 'runs'):
+        _local.runs = []
+    return _local.runs
+
+
+def _task_name():
+    runs = _runs()
+    return runs[-1].name if runs else NO_TASK
+
+
+def count_items(count):
+    """ Records `count` upstream items parsed by the current task. """
+    if runs := _runs():
+        runs[-1].items += count
+    metrics.ITEMS_PARSED.labels(_task_name()).inc(count)
+
+
+def count_rows(inserted=0, updated=0, skipped=0):
+    """ Records the rows the current task inserted, updated, or left alone because they were unchanged. """
+    task = _task_name()
+    for outcome, count in (('inserted', inserted), ('updated', updated), ('skipped', skipped)):
+        if count:
+            metrics.ROWS_WRITTEN.labels(task, outcome).inc(count)
+
+
+def _time_query(execute, sql, params, many, context):
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        if runs := _runs():
+            runs[-1].queries += 1
+            runs[-1].query_seconds += time.perf_counter() - started
+
+
+@signals.before_task_publish.connect
+def _stamp_publish_time(headers=None, **kwargs):
+    if headers is not None:
+        headers.setdefault('published_at', time.time())
+
+
+@signals.task_prerun.connect
+def _start_task(task=None, **kwargs):
+    runs = _runs()
+    if not runs:
+        connection.execute_wrappers.append(_time_query)
+    runs.append(_TaskRun(task.name))
+
+    published_at = getattr(task.request, 'published_at', None)
+    if published_at and not task.request.is_eager:
+        # A task scheduled for later only starts waiting once it is due.
+        eta = task.request.eta
+        if eta:
+            published_at = max(published_at, datetime.fromisoformat(eta).timestamp())
+        metrics.TASK_QUEUE_WAIT_SECONDS.labels(task.name).observe(max(0.0, time.time() - published_at))
+
+
+@signals.task_postrun.connect
+def _finish_task(task=None, state=None, **kwargs):
+    runs = _runs()
+    if not runs:
+        return
+    run = runs.pop()
+    if not runs and _time_query in connection.execute_wrappers:
+        connection.execute_wrappers.remove(_time_query)
+
+    metrics.TASK_SECONDS.labels(run.name, state or 'UNKNOWN').observe(time.perf_counter() - run.started)
+    metrics.DB_QUERIES.labels(run.name).inc(run.queries)
+    metrics.DB_QUERY_SECONDS.labels(run.name).inc(run.query_seconds)
+    if run.items:
+        metrics.DB_QUERIES_PER_ITEM.labels(run.name).observe(run.queries / run.items)
+        metrics.DB_SECONDS_PER_ITEM.labels(run.name).observe(run.query_seconds / run.items)
+
+
+@signals.worker_ready.connect
+def _serve_worker_metrics(**kwargs):
+    if not SCRAPE_METRICS_PORT:
+        return
+    if not os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        logger.warning(
+            "PROMETHEUS_MULTIPROC_DIR is not set; metrics recorded in prefork child processes won't be exported.")
+    start_http_server(SCRAPE_METRICS_PORT, registry=registry())
+    logger.info(f"Serving worker metrics on port {SCRAPE_METRICS_PORT}.")
+
+
+@signals.worker_process_shutdown.connect
+def _forget_worker_process(pid=None, **kwargs):
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        multiprocess.mark_process_dead(pid or os.getpid())
@@ -0,0 +1,68 @@
+import timeit
+from django.core.management.base import BaseCommand
+from assets.tasks import QUOTE_FIELDS
+from cars.tasks import DAILY_CAR_FIELDS
+from motorcycles.tasks import MOTORCYCLE_FIELDS
+from products.tasks import BRAND_FIELDS, LIST_ITEM_FIELDS, PRODUCT_FIELDS, VARIANT_FIELDS
+
+
+def sample_payloads():
+    """ Returns (name, extractor, payload) triples shaped like the upstream responses. """
+    variant = {
+        'id': 1001,
+        'seller': {'title': 'Digikala'},
+        'color': {'title': 'Black', 'hex_code': '#000000'},
+        'warranty': {'title_fa': 'گارانتی'},
+        'price': {'selling_price': 125000000, 'rrp_price': 130000000},
+    }
+    product = {
+        'id': 10,
+        'title_fa': 'گوشی موبایل',
+        'title_en': 'Mobile Phone',
+        'status': 'marketable',
+        'brand': {'id': 1, 'code': 'samsung', 'title_fa': 'سامسونگ', 'title_en': 'Samsung',
+                  'logo': {'url': ['https://img/logo.png']}},
+        'category': {'id': 2, 'code': 'mobile-phone', 'title_fa': 'گوشی', 'title_en': 'Mobile'},
+        'rating': {'rate': 4.4, 'count': 1200},
+        'review': {'description': 'Good', 'attributes': [{'title': 'Memory', 'values': ['128GB']}]},
+        'variants': [variant] * 5,
+        'specifications': [{'title': 'Display', 'attributes': [{'title': 'Size', 'values': ['6.1']}]}],
+        'images': {'main': {'url': ['https://img/main.jpg']}, 'list': [{'url': ['https://img/2.jpg']}]},
+    }
+    return [
+        ('product', PRODUCT_FIELDS, product),
+        ('brand', BRAND_FIELDS, product['brand']),
+        ('variant', VARIANT_FIELDS, variant),
+        ('list item', LIST_ITEM_FIELDS, {'id': 10, 'status': 'marketable', 'default_variant': variant}),
+        ('car', DAILY_CAR_FIELDS, {
+            'price': 1500000000,
+            'car_properties': {key: {'title': key, 'title_en': key} for key in
+                               ('brand', 'model', 'trim', 'year', 'option')},
+        }),
+        ('motorcycle', MOTORCYCLE_FIELDS, {
+            'brand_fa': 'هوندا', 'brand': 'honda', 'model_fa': 'سی جی', 'model': 'cg', 'class': '125',
+            'model_year': 1403, 'manufacture_type': {'display_name': 'Iran'}, 'price_provider': 'Bama',
+            'price': 90000000,
+        }),
+        ('asset quote', QUOTE_FIELDS, {
+            'p': '1,020,500', 'h': '1,030,000', 'l': '1,010,000', 'd': '10,500', 'dp': 1.04,
+            'ts': '2025-01-01 12:00:00',
+        }),
+    ]
+
+
+class Command(BaseCommand):
+    help = "Compares the compiled payload extractors with per-field safe_get traversal."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=100000)
+
+    def handle(self, *args, iterations, **options):
+        self.stdout.write(f"{'extractor':<12} {'safe_get µs':>12} {'compiled µs':>12} {'speedup':>8}")
+        for name, extractor, payload in sample_payloads():
+            assert extractor(payload) == extractor.reference(payload), name
+            baseline = min(timeit.repeat(lambda: extractor.reference(payload), number=iterations, repeat=3))
+            compiled = min(timeit.repeat(lambda: extractor(payload), number=iterations, repeat=3))
+            self.stdout.write(
+                f"{name:<12} {baseline / iterations * 1e6:>12.2f} {compiled / iterations * 1e6:>12.2f} "
+                f"{baseline / compiled:>7.1f}x")
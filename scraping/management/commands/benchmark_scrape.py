@@ -0,0 +1,122 @@
+import random
+import time
+from contextlib import ExitStack, contextmanager
+from urllib.parse import urlsplit
+from celery import current_app
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from assets import tasks as asset_tasks
+from assets.models import Asset, AssetPriceLog
+from cars import tasks as car_tasks
+from cars.models import Brand, PriceLog, Vehicle
+from motorcycles import tasks as motorcycle_tasks
+from motorcycles.models import Motorcycle, MotorcycleBrand, MotorcyclePriceLog
+from products import tasks as product_tasks
+from products.models import PriceHistory, Product, Variant
+from scraping.ratelimit import bucket
+from scraping.standin import Standin
+from .run_standin import add_standin_arguments
+
+
+_MISSING = object()
+
+
+@contextmanager
+def overridden(mapping, key, value):
+    """ Sets mapping[key] to `value` for the duration of the block. """
+    old = mapping.get(key, _MISSING)
+    mapping[key] = value
+    try:
+        yield
+    finally:
+        if old is _MISSING:
+            mapping.pop(key, None)
+        else:
+            mapping[key] = old
+
+
+def _scrape_products(standin, stack):
+    urls = standin.urls()
+    stack.enter_context(overridden(product_tasks.SCRAPE_CONFIG, 'mobile', {
+        'list_url': urls['LIST_API_URL_MOBILE'], 'detail_url': urls['DETAIL_API_URL_MOBILE'],
+    }))
+    return product_tasks.scrape_products('mobile', start_page=1, max_pages=standin.pages)
+
+
+def _scrape_cars(standin, stack):
+    stack.enter_context(overridden(vars(car_tasks), 'BASE_API_URL_CAR', standin.urls()['BASE_API_URL_CAR']))
+    return car_tasks.scrape_car_prices()
+
+
+def _scrape_motorcycles(standin, stack):
+    stack.enter_context(overridden(vars(motorcycle_tasks), 'BASE_API_URL_MOTOR', standin.urls()['BASE_API_URL_MOTOR']))
+    return motorcycle_tasks.scrape_motorcycle_prices()
+
+
+def _scrape_assets(standin, stack):
+    stack.enter_context(overridden(vars(asset_tasks), 'BASE_API_ASSETS', standin.urls()['BASE_API_ASSETS']))
+    return asset_tasks.scrape_assets_prices()
+
+
+# Each source: the function running its scrape against the stand-in, and the models it writes.
+SOURCES = {
+    'products': (_scrape_products, [Product, Variant, PriceHistory]),
+    'cars': (_scrape_cars, [Brand, Vehicle, PriceLog]),
+    'motorcycles': (_scrape_motorcycles, [MotorcycleBrand, Motorcycle, MotorcyclePriceLog]),
+    'assets': (_scrape_assets, [Asset, AssetPriceLog]),
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "Runs the scrapers end to end against a local stand-in of the upstream APIs and reports "
+        "items/sec and DB queries per item. Writes are rolled back unless --keep is given."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('sources', nargs='*', help=f"Sources to scrape (default: all of {', '.join(SOURCES)}).")
+        add_standin_arguments(parser)
+        parser.set_defaults(seed=None)
+        parser.add_argument(
+            '--rate', type=float, default=1000,
+            help="Requests per second allowed to the stand-in; the rate limiter is bypassed above this.")
+        parser.add_argument('--keep', action='store_true', help="Commit what the scrapers wrote.")
+
+    def handle(self, *args, sources, pages, per_page, latency_ms, jitter_ms, error_rate, seed, rate, keep,
+               **options):
+        if unknown := set(sources) - set(SOURCES):
+            raise CommandError(f"Unknown sources: {', '.join(sorted(unknown))}.")
+        sources = sources or list(SOURCES)
+        # A fresh seed serves new product IDs, so products claimed by an earlier run are not skipped.
+        seed = random.randrange(1000) if seed is None else seed
+        with Standin(pages=pages, per_page=per_page, latency_ms=latency_ms, jitter_ms=jitter_ms,
+                     error_rate=error_rate, seed=seed) as standin, ExitStack() as stack:
+            stack.enter_context(overridden(bucket.limits, urlsplit(standin.url).netloc, (rate, rate)))
+            # Batches queued by the product scrape run inline, so they are part of the measurement.
+            stack.enter_context(overridden(current_app.conf, 'task_always_eager', True))
+            self.stdout.write(
+                f"Stand-in at {standin.url}: {pages} pages of {per_page} items, {latency_ms:g} ms latency "
+                f"(+{jitter_ms:g} ms jitter), {error_rate:.0%} errors, seed {seed}.")
+            for source in sources:
+                self._benchmark(source, standin, keep)
+
+    def _benchmark(self, source, standin, keep):
+        scrape, models = SOURCES[source]
+        items = standin.pages * standin.per_page
+        requests_before, errors_before = standin.requests, standin.errors
+        with transaction.atomic(), ExitStack() as stack:
+            rows_before = sum(model.objects.count() for model in models)
+            with CaptureQueriesContext(connection) as queries:
+                started = time.perf_counter()
+                result = scrape(standin, stack)
+                elapsed = time.perf_counter() - started
+            rows = sum(model.objects.count() for model in models) - rows_before
+            if not keep:
+                transaction.set_rollback(True)
+
+        self.stdout.write(f"{source}: {result}")
+        self.stdout.write(self.style.SUCCESS(
+            f"{source}: {items} items in {elapsed:.2f}s ({items / elapsed:.1f} items/s), "
+            f"{len(queries)} queries ({len(queries) / items:.2f} per item), {rows} rows written, "
+            f"{standin.requests - requests_before} requests ({standin.errors - errors_before} failed on purpose)."))
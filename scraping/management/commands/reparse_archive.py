@@ -0,0 +1,65 @@
+import multiprocessing
+import time
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date
+from importlib import import_module
+from itertools import repeat
+from django.core.management.base import BaseCommand
+from django.db import connections
+from scraping import archive
+
+
+# The module providing parse_archived(record) and save_archived(units) for each archive source.
+REPARSERS = {
+    'products': 'products.tasks',
+    'cars': 'cars.tasks',
+    'motorcycles': 'motorcycles.tasks',
+    'assets': 'assets.tasks',
+}
+
+
+def _parse_file(source, path):
+    """ Parses every record of one archive file into (fetched_at, unit) pairs; runs in a worker process. """
+    parse = import_module(REPARSERS[source]).parse_archived
+    return [(record['fetched_at'], unit) for record in archive.read(path) for unit in parse(record)]
+
+
+class Command(BaseCommand):
+    help = "Re-runs a source's parsers and DB writers over its raw payload archive."
+
+    def add_arguments(self, parser):
+        parser.add_argument('source', choices=sorted(REPARSERS))
+        parser.add_argument('--since', type=date.fromisoformat, help="First day to replay (YYYY-MM-DD).")
+        parser.add_argument('--until', type=date.fromisoformat, help="Last day to replay (YYYY-MM-DD).")
+        parser.add_argument(
+            '--workers', type=int, default=multiprocessing.cpu_count(),
+            help="Processes that parse archive files in parallel. Writes stay in this process, in fetch order.")
+
+    def handle(self, *args, source, since, until, workers, **options):
+        save_archived = import_module(REPARSERS[source]).save_archived
+        found = archive.partitions(source, since, until)
+        if not found:
+            self.stdout.write(self.style.WARNING(f"No archived '{source}' responses in that range."))
+            return
+
+        pool = None
+        if workers > 1:
+            connections.close_all()  # Forked workers must not inherit open DB connections.
+            pool = ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context('fork'))
+        totals = defaultdict(int)
+        try:
+            for day, paths in found:
+                started = time.perf_counter()
+                parsed = (pool.map if pool else map)(_parse_file, repeat(source), paths)
+                units = sorted((pair for file_units in parsed for pair in file_units), key=lambda pair: pair[0])
+                stats = save_archived([unit for _, unit in units])
+                for name, count in stats.items():
+                    totals[name] += count
+                self.stdout.write(
+                    f"{day}: {len(paths)} files, {len(units)} records in "
+                    f"{time.perf_counter() - started:.1f}s. {dict(stats)}")
+        finally:
+            if pool:
+                pool.shutdown()
+        self.stdout.write(self.style.SUCCESS(f"Replayed {len(found)} days of '{source}': {dict(totals)}"))
@@ -0,0 +1,34 @@
+import threading
+from django.core.management.base import BaseCommand
+from scraping.standin import Standin
+
+
+def add_standin_arguments(parser):
+    """ The stand-in options shared by `run_standin` and `benchmark_scrape`. """
+    parser.add_argument('--pages', type=int, default=3, help="Pages served per source.")
+    parser.add_argument('--per-page', type=int, default=20, help="Items per page.")
+    parser.add_argument('--latency-ms', type=float, default=0, help="Delay added to every response.")
+    parser.add_argument('--jitter-ms', type=float, default=0, help="Random extra delay of up to this much.")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="Share of requests answered with a 503.")
+    parser.add_argument('--seed', type=int, default=0, help="Picks the IDs and prices served.")
+
+
+class Command(BaseCommand):
+    help = "Serves synthetic Digikala, Khodro45, Bama and tgju responses locally for load tests."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--host', default='127.0.0.1')
+        parser.add_argument('--port', type=int, default=8765)
+        add_standin_arguments(parser)
+
+    def handle(self, *args, host, port, pages, per_page, latency_ms, jitter_ms, error_rate, seed, **options):
+        standin = Standin(host, port, pages, per_page, latency_ms, jitter_ms, error_rate, seed)
+        with standin:
+            self.stdout.write(f"Stand-in listening on {standin.url}. Point the scrapers at it with:")
+            for name, url in standin.urls().items():
+                self.stdout.write(f"{name}={url}")
+            try:
+                threading.Event().wait()
+            except KeyboardInterrupt:
+                self.stdout.write(
+                    f"Served {standin.requests} requests ({standin.errors} failed on purpose).")
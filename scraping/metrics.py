@@ -0,0 +1,43 @@
+from prometheus_client import Counter, Gauge, Histogram
+
+
+HTTP_RETRIES = Counter(
+    'scraper_http_retries_total', 'Scraper HTTP requests retried after a failure.', ['host'])
+HTTP_HEDGED_REQUESTS = Counter(
+    'scraper_http_hedged_requests_total', 'Backup requests sent because the first one was slow.', ['host'])
+HTTP_UNCHANGED_RESPONSES = Counter(
+    'scraper_http_unchanged_responses_total', 'Conditional fetches whose content had not changed.',
+    ['host', 'reason'])
+CIRCUIT_BREAKER_STATE = Gauge(
+    'scraper_circuit_breaker_state', 'Circuit breaker state per upstream host (0 closed, 1 half-open, 2 open).',
+    ['host'], multiprocess_mode='mostrecent')
+HTTP_REQUEST_SECONDS = Histogram(
+    'scraper_http_request_seconds', 'Duration of single scraper HTTP attempts, by host and status code.',
+    ['host', 'status'], buckets=(0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30))
+HTTP_RESPONSE_BYTES = Counter(
+    'scraper_http_response_bytes_total', 'Body bytes received from upstream hosts.', ['host'])
+ASSET_FEED_SYMBOLS = Counter(
+    'scraper_asset_feed_symbols_total', 'Symbols in tgju feed ticks, by whether they changed since the last ingest.',
+    ['state'])
+
+TASK_SECONDS = Histogram(
+    'scraper_task_seconds', 'Run time of Celery tasks, by task and final state.', ['task', 'state'],
+    buckets=(0.1, 0.5, 1, 5, 10, 30, 60, 120, 300, 600, 1800))
+TASK_QUEUE_WAIT_SECONDS = Histogram(
+    'scraper_task_queue_wait_seconds', 'Time Celery tasks spent in the queue before a worker started them.',
+    ['task'], buckets=(0.01, 0.1, 0.5, 1, 5, 10, 30, 60, 300, 900, 3600))
+ITEMS_PARSED = Counter(
+    'scraper_items_parsed_total', 'Upstream items (products, vehicles, quotes) parsed.', ['task'])
+ROWS_WRITTEN = Counter(
+    'scraper_rows_written_total', 'Rows written by scrapers, by outcome (inserted, updated or skipped).',
+    ['task', 'outcome'])
+DB_QUERIES = Counter(
+    'scraper_db_queries_total', 'Database queries run by Celery tasks.', ['task'])
+DB_QUERY_SECONDS = Counter(
+    'scraper_db_query_seconds_total', 'Time Celery tasks spent waiting on database queries.', ['task'])
+DB_QUERIES_PER_ITEM = Histogram(
+    'scraper_db_queries_per_item', 'Database queries per parsed item, observed once per task run.', ['task'],
+    buckets=(0.1, 0.5, 1, 2, 3, 5, 10, 20, 50))
+DB_SECONDS_PER_ITEM = Histogram(
+    'scraper_db_seconds_per_item', 'Database time per parsed item, observed once per task run.', ['task'],
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.5))
@@ -0,0 +1,257 @@
+import logging
+import re
+from datetime import date, datetime
+from decouple import config, Csv
+from django.apps import apps
+from django.db import connection, models, transaction
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+
+logger = logging.getLogger(__name__)
+
+# Price log tables that are range-partitioned by month on PostgreSQL, and their partition key.
+PARTITIONED_MODELS = {
+    'assets.assetpricelog': 'timestamp',
+    'products.pricehistory': 'timestamp',
+    'cars.pricelog': 'log_date',
+    'motorcycles.motorcyclepricelog': 'log_date',
+}
+# Monthly partitions are created this many months ahead of the current one.
+PARTITION_MONTHS_AHEAD = config('PARTITION_MONTHS_AHEAD', default=3, cast=int)
+# Months of raw logs kept per model, e.g. "assets.assetpricelog=3,products.pricehistory=24".
+# Models without an entry keep every partition.
+PRICE_LOG_RETENTION = config('PRICE_LOG_RETENTION', default='', cast=Csv())
+# 'detach' turns expired partitions into standalone tables (to be dumped and dropped by hand), 'drop' deletes them.
+PRICE_LOG_RETENTION_ACTION = config('PRICE_LOG_RETENTION_ACTION', default='detach')
+# Checks that a model's rollups hold every raw log in [start, end) before its partitions may expire.
+ROLLUP_COVERAGE = {
+    'assets.assetpricelog': 'assets.rollups.covers',
+}
+
+# Monthly partitions are named <table>_pYYYYMM. The old table, attached when a
+# table is converted, becomes <table>_beforeYYYYMM and holds every earlier row.
+_PARTITION_NAME = r'^{table}_(p|before)(\d{{4}})(\d{{2}})$'
+
+
+def add_months(month, count):
+    """ Returns the first day of the month `count` months after the one `month` falls in. """
+    index = month.year * 12 + month.month - 1 + count
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def month_of(value):
+    """ Returns the first day of the (Tehran) month a date or datetime falls in. """
+    if isinstance(value, datetime):
+        value = timezone.localtime(value).date()
+    return value.replace(day=1)
+
+
+def _bound(field, month):
+    """ The partition key value at which `month` starts: Tehran midnight for timestamps. """
+    if isinstance(field, models.DateTimeField):
+        return timezone.make_aware(datetime(month.year, month.month, 1))
+    return month
+
+
+def _parse_retention(entries):
+    retention = {}
+    for entry in entries:
+        label, _, months = entry.partition('=')
+        retention[label.strip().lower()] = int(months)
+    return retention
+
+
+def is_partitioned(cursor, table):
+    cursor.execute("SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass(%s)", [table])
+    return cursor.fetchone() is not None
+
+
+def partitions(cursor, table):
+    """
+    Returns (first month, end month, name) of the partitions attached to `table`,
+    oldest first. The first month of the partition of pre-conversion rows is None.
+    """
+    cursor.execute(
+        "SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+        "WHERE i.inhparent = to_regclass(%s)", [table],
+    )
+    pattern = re.compile(_PARTITION_NAME.format(table=re.escape(table)))
+    found = []
+    for (name,) in cursor.fetchall():
+        if match := pattern.match(name):
+            kind, year, month = match.groups()
+            month = date(int(year), int(month), 1)
+            found.append((None, month, name) if kind == 'before' else (month, add_months(month, 1), name))
+    return sorted(found, key=lambda partition: partition[1])
+
+
+def missing_months(existing, first, last):
+    """ Returns the months from `first` to `last` that none of the `existing` partitions covers. """
+    months, month = [], first
+    while month <= last:
+        if not any((start is None or start <= month) and month < end for start, end, _ in existing):
+            months.append(month)
+        month = add_months(month, 1)
+    return months
+
+
+def expired(existing, cutoff):
+    """ Returns the `existing` partitions that only hold rows from before `cutoff`. """
+    return [partition for partition in existing if partition[1] <= cutoff]
+
+
+def create_partitions(cursor, table, field, months):
+    """ Creates the monthly partitions of `table` for `months` and returns their names. """
+    quote = connection.ops.quote_name
+    names = []
+    for month in months:
+        name = f'{table}_p{month:%Y%m}'
+        cursor.execute(
+            f"CREATE TABLE IF NOT EXISTS {quote(name)} PARTITION OF {quote(table)} FOR VALUES FROM (%s) TO (%s)",
+            [_bound(field, month), _bound(field, add_months(month, 1))],
+        )
+        names.append(name)
+    return names
+
+
+def convert_to_partitioned(cursor, table, field, months_ahead=PARTITION_MONTHS_AHEAD):
+    """
+    Turns `table` into a table range-partitioned by month on `field`, in place.
+
+    Rows are not copied: the old table is renamed and attached as the partition
+    of everything before the month after its newest row, so converting costs a
+    scan to validate that bound and a build of the new primary key index.
+    Constraints and indexes keep their names on the partitioned table, so later
+    Django migrations still find them. PostgreSQL requires the partition key in
+    every unique constraint, so the primary key becomes (id, key); ids still come
+    from a single identity sequence and stay unique.
+    """
+    quote = connection.ops.quote_name
+    column = field.column
+    cursor.execute(
+        "SELECT conname, contype, pg_get_constraintdef(oid) FROM pg_constraint "
+        "WHERE conrelid = %s::regclass AND contype IN ('p', 'u', 'f')", [table],
+    )
+    constraints = cursor.fetchall()
+    cursor.execute(
+        "SELECT indexname, indexdef FROM pg_indexes WHERE tablename = %s "
+        "AND indexname NOT IN (SELECT conname FROM pg_constraint WHERE conrelid = %s::regclass)",
+        [table, table],
+    )
+    indexes = cursor.fetchall()
+    cursor.execute(f"SELECT MAX(id), MAX({quote(column)}) FROM {quote(table)}")
+    max_id, newest = cursor.fetchone()
+
+    current = timezone.localdate().replace(day=1)
+    boundary = add_months(month_of(newest), 1) if newest else current
+    legacy = f'{table}_before{boundary:%Y%m}'
+    cursor.execute(f"ALTER TABLE {quote(table)} RENAME TO {quote(legacy)}")
+    # Index names are unique per schema, so the old table's give way to the new table's.
+    for name, kind, _ in constraints:
+        if kind in ('p', 'u'):
+            cursor.execute(f"ALTER TABLE {quote(legacy)} RENAME CONSTRAINT {quote(name)} TO {quote(name[:56] + '_legacy')}")
+    for name, _ in indexes:
+        cursor.execute(f"ALTER INDEX {quote(name)} RENAME TO {quote(name[:56] + '_legacy')}")
+    cursor.execute(f"ALTER TABLE {quote(legacy)} ALTER COLUMN id DROP IDENTITY IF EXISTS")
+
+    cursor.execute(
+        f"CREATE TABLE {quote(table)} (LIKE {quote(legacy)} INCLUDING DEFAULTS INCLUDING CONSTRAINTS "
+        f"INCLUDING STORAGE INCLUDING COMMENTS) PARTITION BY RANGE ({quote(column)})"
+    )
+    cursor.execute(f"ALTER TABLE {quote(table)} ALTER COLUMN id DROP DEFAULT")
+    cursor.execute(
+        f"ALTER TABLE {quote(table)} ALTER COLUMN id ADD GENERATED BY DEFAULT AS IDENTITY "
+        f"(START WITH {(max_id or 0) + 1})"
+    )
+    for name, kind, definition in constraints:
+        if kind == 'p':
+            definition = f"PRIMARY KEY (id, {quote(column)})"
+        cursor.execute(f"ALTER TABLE {quote(table)} ADD CONSTRAINT {quote(name)} {definition}")
+    for _, definition in indexes:
+        cursor.execute(definition)
+
+    # A table has one primary key, so the old table's (id) gives way to the (id, key) of the
+    # partitioned table before attaching. Matching unique constraints, foreign keys and
+    # indexes of the old table are then attached, not rebuilt.
+    for name, kind, _ in constraints:
+        if kind == 'p':
+            cursor.execute(f"ALTER TABLE {quote(legacy)} DROP CONSTRAINT {quote(name[:56] + '_legacy')}")
+            cursor.execute(
+                f"ALTER TABLE {quote(legacy)} ADD CONSTRAINT {quote(name[:56] + '_legacy')} "
+                f"PRIMARY KEY (id, {quote(column)})"
+            )
+    cursor.execute(
+        f"ALTER TABLE {quote(table)} ATTACH PARTITION {quote(legacy)} FOR VALUES FROM (MINVALUE) TO (%s)",
+        [_bound(field, boundary)],
+    )
+    create_partitions(cursor, table, field, missing_months(
+        partitions(cursor, table), boundary, add_months(current, months_ahead)))
+
+
+def partition_by_month(label):
+    """
+    Returns a RunPython function that partitions the table of model `label` (one
+    of PARTITIONED_MODELS) by month. It does nothing on other databases than
+    PostgreSQL, where the table stays a plain table.
+    """
+    def forwards(apps, schema_editor):
+        if schema_editor.connection.vendor != 'postgresql':
+            return
+        model = apps.get_model(label)
+        with schema_editor.connection.cursor() as cursor:
+            if not is_partitioned(cursor, model._meta.db_table):
+                convert_to_partitioned(cursor, model._meta.db_table, model._meta.get_field(PARTITIONED_MODELS[label]))
+    return forwards
+
+
+def _covered(label, start, end):
+    if label not in ROLLUP_COVERAGE:
+        return True
+    return import_string(ROLLUP_COVERAGE[label])(start, end)
+
+
+def maintain(months_ahead=PARTITION_MONTHS_AHEAD, retention=None, action=PRICE_LOG_RETENTION_ACTION):
+    """
+    Creates the monthly partitions of the price log tables up to `months_ahead`
+    months from now and expires the partitions older than their retention.
+
+    A partition only expires once the model's rollups (see ROLLUP_COVERAGE) hold
+    all of its rows, so raw logs are never discarded before they are summarised.
+    Expired partitions are detached, or dropped if `action` is 'drop'.
+
+    Returns:
+        A dict with the names of the 'created' and 'expired' partitions and of
+        the expired ones 'kept' because their rollups are incomplete.
+    """
+    report = {'created': [], 'expired': [], 'kept': []}
+    if connection.vendor != 'postgresql':
+        return report
+    retention = _parse_retention(PRICE_LOG_RETENTION) if retention is None else retention
+    current = timezone.localdate().replace(day=1)
+    quote = connection.ops.quote_name
+
+    for label, key in PARTITIONED_MODELS.items():
+        model = apps.get_model(label)
+        table, field = model._meta.db_table, model._meta.get_field(key)
+        with transaction.atomic(), connection.cursor() as cursor:
+            if not is_partitioned(cursor, table):
+                continue
+            existing = partitions(cursor, table)
+            report['created'] += create_partitions(
+                cursor, table, field, missing_months(existing, current, add_months(current, months_ahead)))
+        if label not in retention:
+            continue
+
+        for start, end, name in expired(existing, add_months(current, -retention[label])):
+            if not _covered(label, start and _bound(field, start), _bound(field, end)):
+                logger.warning(f"Keeping expired partition {name}: its rollups are incomplete.")
+                report['kept'].append(name)
+                continue
+            with transaction.atomic(), connection.cursor() as cursor:
+                cursor.execute(f"ALTER TABLE {quote(table)} DETACH PARTITION {quote(name)}")
+                if action == 'drop':
+                    cursor.execute(f"DROP TABLE {quote(name)}")
+            logger.info(f"Expired partition {name} ({'dropped' if action == 'drop' else 'detached'}).")
+            report['expired'].append(name)
+    return report
@@ -0,0 +1,186 @@
+import logging
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlsplit
+import redis
+import requests
+from decouple import config, Csv
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.core.cache.backends.redis import RedisCache
+from requests.adapters import HTTPAdapter
+
+
+logger = logging.getLogger(__name__)
+
+# Requests per second and burst size of hosts that have no entry in SCRAPE_RATE_LIMITS.
+SCRAPE_DEFAULT_RATE = config('SCRAPE_DEFAULT_RATE', default=5.0, cast=float)
+SCRAPE_DEFAULT_BURST = config('SCRAPE_DEFAULT_BURST', default=10, cast=int)
+# Per-host overrides, e.g. "api.digikala.com=20/40,khodro45.com=2/4" (rate/burst).
+SCRAPE_RATE_LIMITS = config('SCRAPE_RATE_LIMITS', default='', cast=Csv())
+# A request that would wait longer than this for a token fails instead.
+SCRAPE_RATE_LIMIT_MAX_WAIT = config('SCRAPE_RATE_LIMIT_MAX_WAIT', default=120, cast=float)
+# After a 429 the host's rate is halved, down to this fraction of its configured rate,
+# and then grows back by SCRAPE_RATE_RECOVERY of the configured rate per second.
+SCRAPE_RATE_MIN_FACTOR = 1 / 16
+SCRAPE_RATE_RECOVERY = 0.01
+
+# Refills the bucket of KEYS[1] at ARGV[1] tokens/second up to ARGV[2] tokens and takes one.
+# Returns the seconds to wait before trying again, or 0 if a token was taken.
+_TAKE_TOKEN = """
+local rate, burst = tonumber(ARGV[1]), tonumber(ARGV[2])
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1]) or burst
+local ts = tonumber(state[2]) or now
+tokens = math.min(burst, tokens + math.max(0, now - ts) * rate)
+local wait = 0
+if tokens >= 1 then tokens = tokens - 1 else wait = (1 - tokens) / rate end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', tostring(now))
+redis.call('EXPIRE', KEYS[1], math.ceil(burst / rate) + 1)
+return tostring(wait)
+"""
+
+
+class RateLimitTimeout(requests.exceptions.RequestException):
+    """ Raised when no token for a host becomes available within SCRAPE_RATE_LIMIT_MAX_WAIT. """
+
+
+def _parse_limits(entries):
+    limits = {}
+    for entry in entries:
+        host, _, spec = entry.partition('=')
+        rate, _, burst = spec.partition('/')
+        limits[host.strip()] = (float(rate), int(burst or max(1, float(rate))))
+    return limits
+
+
+class TokenBucket:
+    """
+    A cluster-wide token bucket per upstream host.
+
+    With a Redis cache backend the buckets live in Redis and are refilled by a
+    Lua script, so every worker process shares the same budget per host. With
+    any other backend (local development, tests) they fall back to per-process
+    buckets with the same semantics. 429 cool-downs and the adaptive rate factor
+    are kept in the Django cache either way.
+    """
+
+    def __init__(self, limits=None, default=(SCRAPE_DEFAULT_RATE, SCRAPE_DEFAULT_BURST)):
+        self.limits = _parse_limits(SCRAPE_RATE_LIMITS) if limits is None else limits
+        self.default = default
+        self._lock = threading.Lock()
+        self._local = {}
+        self._script = None
+
+    def limit(self, host):
+        """ Returns the configured (rate, burst) of `host`. """
+        return self.limits.get(host, self.default)
+
+    def _take_redis(self, host, rate, burst):
+        # A client of our own on the cache's Redis; the script is loaded once and then run by its hash.
+        if self._script is None:
+            client = redis.Redis.from_url(settings.CACHES['default']['LOCATION'])
+            self._script = client.register_script(_TAKE_TOKEN)
+        return float(self._script(keys=[f'scraping:bucket:{host}'], args=[rate, burst]))
+
+    def _take_local(self, host, rate, burst):
+        with self._lock:
+            now = time.monotonic()
+            tokens, ts = self._local.get(host, (burst, now))
+            tokens = min(burst, tokens + (now - ts) * rate)
+            wait = 0.0
+            if tokens >= 1:
+                tokens -= 1
+            else:
+                wait = (1 - tokens) / rate
+            self._local[host] = (tokens, now)
+            return wait
+
+    def _take(self, host, rate, burst):
+        if isinstance(caches['default'], RedisCache):
+            return self._take_redis(host, rate, burst)
+        return self._take_local(host, rate, burst)
+
+    def _state(self, host):
+        """ Returns the host's cool-down deadline (or None) and its current rate factor. """
+        state = cache.get_many([f'scraping:cooldown:{host}', f'scraping:rate-factor:{host}'])
+        factor, since = state.get(f'scraping:rate-factor:{host}', (1.0, 0.0))
+        factor = min(1.0, factor + (time.time() - since) * SCRAPE_RATE_RECOVERY)
+        return state.get(f'scraping:cooldown:{host}'), factor
+
+    def acquire(self, host, max_wait=SCRAPE_RATE_LIMIT_MAX_WAIT):
+        """
+        Blocks until a request to `host` is allowed.
+
+        Raises:
+            RateLimitTimeout: If that would take longer than `max_wait` seconds.
+        """
+        deadline = time.monotonic() + max_wait
+        rate, burst = self.limit(host)
+        while True:
+            cooldown, factor = self._state(host)
+            wait = max(0.0, cooldown - time.time()) if cooldown else 0.0
+            if not wait:
+                wait = self._take(host, rate * factor, burst)
+            if not wait:
+                return
+            if time.monotonic() + wait > deadline:
+                raise RateLimitTimeout(f"No request token for {host} within {max_wait}s.")
+            time.sleep(wait)
+
+    def penalize(self, host, retry_after=None):
+        """
+        Slows every worker down after `host` answered 429: halves its rate and,
+        if the response said when to come back, pauses it until then.
+        """
+        _, factor = self._state(host)
+        factor = max(SCRAPE_RATE_MIN_FACTOR, factor / 2)
+        cache.set(f'scraping:rate-factor:{host}', (factor, time.time()), timeout=int(1 / SCRAPE_RATE_RECOVERY))
+        if retry_after:
+            cache.set(f'scraping:cooldown:{host}', time.time() + retry_after, timeout=int(retry_after) + 1)
+        logger.warning(f"{host} is throttling us. Rate cut to {factor:.0%}, retry after {retry_after or 0:.0f}s.")
+
+
+def retry_after_seconds(value):
+    """ Parses a Retry-After header, given either in seconds or as an HTTP date. """
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+bucket = TokenBucket()
+
+
+class RateLimitedAdapter(HTTPAdapter):
+    """ A transport adapter that takes a token from the host's bucket before every request. """
+
+    def __init__(self, *args, bucket=bucket, **kwargs):
+        self.bucket = bucket
+        super().__init__(*args, **kwargs)
+
+    def send(self, request, *args, **kwargs):
+        host = urlsplit(request.url).netloc
+        self.bucket.acquire(host)
+        response = super().send(request, *args, **kwargs)
+        if response.status_code == 429 or (response.status_code == 503 and 'Retry-After' in response.headers):
+            self.bucket.penalize(host, retry_after_seconds(response.headers.get('Retry-After')))
+        return response
+
+
+def limited_session(pool_maxsize=10):
+    """ Returns a requests session whose every request goes through the shared rate limiter. """
+    session = requests.Session()
+    adapter = RateLimitedAdapter(pool_connections=pool_maxsize, pool_maxsize=pool_maxsize)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
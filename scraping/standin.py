@@ -0,0 +1,235 @@
+import copy
+import hashlib
+import json
+import logging
+import random
+import threading
+import time
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs, urlsplit
+import pytz
+
+
+logger = logging.getLogger(__name__)
+
+FIXTURES_DIR = Path(__file__).resolve().parent / 'standin_fixtures'
+
+# Products of one stand-in get IDs in their own block of this size, picked by the seed,
+# so runs with different seeds never collide. Variants get IDs 2 * id and 2 * id + 1.
+ID_BLOCK = 1_000_000
+# Brands the synthetic cars and motorcycles are spread over.
+BRAND_COUNT = 5
+PRODUCT_TYPES = ('mobile', 'pc', 'console', 'headphone', 'gadget', 'personal')
+
+
+def _fixture(name):
+    with open(FIXTURES_DIR / f'{name}.json', encoding='utf-8') as fixture_file:
+        return json.load(fixture_file)
+
+
+class Standin:
+    """
+    A local HTTP server that stands in for Digikala, Khodro45, Bama and tgju.
+
+    Every endpoint answers in the shape its scraper expects, built from the
+    recorded payloads in standin_fixtures/ with synthetic IDs, names and
+    prices. Each source serves `pages` pages of `per_page` items, and every
+    request is delayed by `latency_ms` plus up to `jitter_ms` and fails with a
+    503 with probability `error_rate`. Prices depend on `seed`, so a new seed
+    looks like a new day upstream. Responses carry an ETag and answer
+    If-None-Match with a 304, like the real APIs.
+
+    Example:
+        with Standin(pages=5, latency_ms=50) as standin:
+            standin.urls()  # {'LIST_API_URL_MOBILE': 'http://127.0.0.1:.../digikala/list/mobile/?page={page}', ...}
+    """
+
+    def __init__(self, host='127.0.0.1', port=0, pages=3, per_page=20, latency_ms=0, jitter_ms=0,
+                 error_rate=0.0, seed=0):
+        if pages * per_page * len(PRODUCT_TYPES) > ID_BLOCK:
+            raise ValueError(f"At most {ID_BLOCK // len(PRODUCT_TYPES)} items per source are supported.")
+        self.pages = pages
+        self.per_page = per_page
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.seed = seed
+        self.requests = 0
+        self.errors = 0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._fixtures = {name: _fixture(name) for name in ('digikala_product', 'khodro45_car', 'bama_item', 'tgju_quote')}
+        self._server = ThreadingHTTPServer((host, port), self._handler())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def urls(self):
+        """ Returns the scraper URL settings that point every source at this stand-in. """
+        urls = {
+            'BASE_API_URL_CAR': f'{self.url}/khodro45/?page=1',
+            'BASE_API_URL_MOTOR': f'{self.url}/bama/',
+            'BASE_API_ASSETS': f'{self.url}/tgju/ajax.json',
+        }
+        for product_type in PRODUCT_TYPES:
+            urls[f'LIST_API_URL_{product_type.upper()}'] = f'{self.url}/digikala/list/{product_type}/?page={{page}}'
+            urls[f'DETAIL_API_URL_{product_type.upper()}'] = f'{self.url}/digikala/product/{{product_id}}/'
+        return urls
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, name='scrape-standin', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    # --- Payloads ---
+
+    def _first_id(self, product_type):
+        offset = PRODUCT_TYPES.index(product_type) if product_type in PRODUCT_TYPES else 0
+        return ID_BLOCK * (1 + self.seed % 1000) + offset * self.pages * self.per_page
+
+    def _page_range(self, page):
+        if not 1 <= page <= self.pages:
+            return range(0)
+        return range((page - 1) * self.per_page, page * self.per_page)
+
+    def _price(self, base, n):
+        """ A price around `base` that depends on the seed and the item. """
+        return int(base * random.Random(f'{self.seed}:{n}').uniform(0.8, 1.2)) // 1000 * 1000
+
+    def product(self, product_id):
+        product = copy.deepcopy(self._fixtures['digikala_product'])
+        product['id'] = product_id
+        product['title_fa'] = f"{product['title_fa']} {product_id}"
+        product['title_en'] = f"{product['title_en']} {product_id}"
+        for k, variant in enumerate(product['variants']):
+            variant['id'] = product_id * 2 + k
+            for key in ('selling_price', 'rrp_price'):
+                variant['price'][key] = self._price(variant['price'][key], variant['id'])
+        return product
+
+    def product_list(self, product_type, page):
+        products = []
+        for n in self._page_range(page):
+            product = self.product(self._first_id(product_type) + n)
+            products.append({
+                'id': product['id'],
+                'status': product['status'],
+                'default_variant': product['variants'][0],
+            })
+        return {'status': 200, 'data': {'products': products}}
+
+    def car_page(self, page):
+        results = []
+        for n in self._page_range(page):
+            car = copy.deepcopy(self._fixtures['khodro45_car'])
+            properties = car['car_properties']
+            brand = n % BRAND_COUNT
+            properties['brand']['title'] = f"{properties['brand']['title']} {brand}"
+            properties['brand']['title_en'] = f"{properties['brand']['title_en']} {brand}"
+            properties['model']['title'] = f"{properties['model']['title']} {n}"
+            properties['model']['title_en'] = f"{properties['model']['title_en']} {n}"
+            car['price'] = self._price(car['price'], n)
+            results.append({'dailycars': [car]})
+        next_url = f'{self.url}/khodro45/?page={page + 1}' if page < self.pages else None
+        return {'count': self.pages * self.per_page, 'next': next_url, 'results': results}
+
+    def motorcycle_page(self, page):
+        groups = {}
+        for n in self._page_range(page):
+            item = copy.deepcopy(self._fixtures['bama_item'])
+            brand = n % BRAND_COUNT
+            item['brand_fa'] = f"{item['brand_fa']} {brand}"
+            item['brand'] = f"{item['brand']}-{brand}"
+            item['model_fa'] = f"{item['model_fa']} {n}"
+            item['model'] = f"{item['model']}-{n}"
+            item['price'] = self._price(item['price'], n)
+            groups.setdefault(brand, []).append(item)
+        return {'data': [{'items': items} for items in groups.values()]}
+
+    def quotes(self):
+        now = datetime.now(pytz.timezone('Asia/Tehran')).strftime('%Y-%m-%d %H:%M:%S')
+        base = int(self._fixtures['tgju_quote']['p'].replace(',', '')) * 1000
+        current = {}
+        for n in range(self.pages * self.per_page):
+            quote = dict(self._fixtures['tgju_quote'], ts=now)
+            quote['p'] = f"{self._price(base, n) // 1000:,}"
+            current[f'standin_{self.seed}_{n}'] = quote
+        return {'current': current}
+
+    def route(self, path, query):
+        """ Returns the payload for a request path, or None if nothing lives there. """
+        parts = [part for part in path.split('/') if part]
+        page = int(query.get('page', query.get('pageIndex', ['1']))[0])
+        if parts[:2] == ['digikala', 'list'] and len(parts) == 3:
+            return self.product_list(parts[2], page)
+        if parts[:2] == ['digikala', 'product'] and len(parts) == 3 and parts[2].isdigit():
+            return {'status': 200, 'data': {'product': self.product(int(parts[2]))}}
+        if parts == ['khodro45']:
+            return self.car_page(page)
+        if parts == ['bama']:
+            return self.motorcycle_page(page)
+        if parts == ['tgju', 'ajax.json']:
+            return self.quotes()
+        return None
+
+    # --- HTTP ---
+
+    def _handler(self):
+        standin = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                standin._serve(self)
+
+            def log_message(self, format, *args):
+                logger.debug(f"Stand-in: {format % args}")
+
+        return Handler
+
+    def _serve(self, request):
+        with self._lock:
+            self.requests += 1
+            delay = (self.latency_ms + self._random.uniform(0, self.jitter_ms)) / 1000
+            failed = self._random.random() < self.error_rate
+            if failed:
+                self.errors += 1
+        if delay:
+            time.sleep(delay)
+        if failed:
+            return self._reply(request, 503, b'{"detail": "stand-in error"}')
+
+        url = urlsplit(request.path)
+        payload = self.route(url.path, parse_qs(url.query))
+        if payload is None:
+            return self._reply(request, 404, b'{"detail": "not found"}')
+        body = json.dumps(payload, ensure_ascii=False).encode()
+        etag = f'"{hashlib.sha1(body).hexdigest()}"'
+        if request.headers.get('If-None-Match') == etag:
+            return self._reply(request, 304, b'', etag)
+        self._reply(request, 200, body, etag)
+
+    @staticmethod
+    def _reply(request, status, body, etag=None):
+        request.send_response(status)
+        request.send_header('Content-Type', 'application/json')
+        request.send_header('Content-Length', str(len(body)))
+        if etag:
+            request.send_header('ETag', etag)
+        request.end_headers()
+        request.wfile.write(body)
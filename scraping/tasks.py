@@ -0,0 +1,12 @@
+from celery import shared_task
+from . import partitions
+
+
+@shared_task
+def maintain_partitions():
+    """ Creates the upcoming monthly partitions of the price log tables and expires old ones. """
+    report = partitions.maintain()
+    return (
+        f"Created {len(report['created'])} partitions, expired {len(report['expired'])}, "
+        f"kept {len(report['kept'])} with incomplete rollups."
+    )
@@ -0,0 +1,94 @@
+import json
+import tempfile
+from io import StringIO
+from django.core.management import call_command
+from unittest import mock
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from assets.models import AssetPriceLog
+from products import dimensions
+from products.models import Product
+from products import tasks as product_tasks
+from products.tasks import SCRAPE_CONFIG
+from products.test.test_tasks import make_payload
+from scraping import archive, http
+from scraping.test.test_http import make_response
+
+
+class RawArchiveTest(TestCase):
+    """Test suite for the raw payload archive and the reparse_archive command."""
+
+    def setUp(self):
+        dimensions.invalidate()
+        self.root = tempfile.TemporaryDirectory()
+        self.addCleanup(self.root.cleanup)
+        settings_override = override_settings(SCRAPE_ARCHIVE_DIR=self.root.name)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def test_records_are_appended_per_source_and_day(self):
+        """Test that responses land in a compressed file under source/date and read back in order."""
+        archive.append('cars', 'https://cars.example/?page=1', b'{"page": 1}')
+        archive.append('cars', 'https://cars.example/?page=2', '{"page": 2}')
+
+        [(day, paths)] = archive.partitions('cars')
+        self.assertEqual(day, timezone.localdate())
+        self.assertEqual(len(paths), 1)
+        self.assertTrue(paths[0].name.endswith('.jsonl.gz'))
+        self.assertEqual([json.loads(r['body'])['page'] for r in archive.read(paths[0])], [1, 2])
+        self.assertEqual(archive.partitions('cars', since=timezone.localdate() + timezone.timedelta(days=1)), [])
+
+    def test_client_archives_processed_responses(self):
+        """Test that an HttpClient with an archive source stores each successful body."""
+        response = make_response(200, b'{"current": {}}')
+        response.url = 'https://assets.example/ajax.json'
+        session = type('Session', (), {'get': lambda self, url, **kwargs: response})()
+
+        http.HttpClient(session, archive_source='assets').get(response.url, archive_tags={'feed': 'current'})
+
+        [(_, [path])] = archive.partitions('assets')
+        record = next(archive.read(path))
+        self.assertEqual((record['url'], record['tags']), (response.url, {'feed': 'current'}))
+
+    def test_product_fetches_record_their_product_type(self):
+        """Test that archived product details carry the product type they were fetched for."""
+        response = make_response(200, json.dumps({'data': {'product': make_payload(1)}}).encode())
+        response.url = SCRAPE_CONFIG['pc']['detail_url'].format(product_id=1)
+        with mock.patch.object(product_tasks.client.session, 'get', return_value=response):
+            product_tasks.fetch_product_data(1, 'pc')
+
+        [(_, [path])] = archive.partitions('products')
+        self.assertEqual(next(archive.read(path))['tags'], {'product_type': 'pc'})
+
+    def test_reparse_replays_products_newest_first_wins(self):
+        """Test that reparse_archive rebuilds products from detail responses and skips list pages."""
+        # In production every product type shares one detail endpoint, so the URL cannot tell them apart.
+        detail_url = 'https://api.digikala.example/v2/product/{product_id}/'
+        shared = {
+            product_type: {**urls, 'detail_url': detail_url} for product_type, urls in SCRAPE_CONFIG.items()
+        }
+        for title in ('Old title', 'New title'):
+            payload = make_payload(1)
+            payload['title_en'] = title
+            archive.append('products', detail_url.format(product_id=1), json.dumps({'data': {'product': payload}}),
+                           {'product_type': 'mobile'})
+        archive.append('products', SCRAPE_CONFIG['mobile']['list_url'].format(page=1), '{"data": {}}')
+
+        out = StringIO()
+        with mock.patch.dict(SCRAPE_CONFIG, shared):
+            call_command('reparse_archive', 'products', workers=1, stdout=out)
+
+        product = Product.objects.get()
+        self.assertEqual((product.title_en, product.product_type), ('New title', 'mobile'))
+        self.assertIn("'created': 1", out.getvalue())
+
+    def test_reparse_replays_asset_feed(self):
+        """Test that archived tgju feeds are written again without duplicating logs."""
+        feed = {'current': {'price_dollar_rl': {'p': '1,000', 'h': '1,100', 'l': '900', 'd': '0', 'dp': 0,
+                                                'ts': '2025-01-01 12:00:00'}}}
+        archive.append('assets', 'https://assets.example/ajax.json', json.dumps(feed))
+
+        call_command('reparse_archive', 'assets', workers=1, stdout=StringIO())
+        call_command('reparse_archive', 'assets', workers=1, stdout=StringIO())
+
+        self.assertEqual(AssetPriceLog.objects.count(), 1)
@@ -0,0 +1,48 @@
+from io import StringIO
+from django.core.management import call_command
+from django.test import SimpleTestCase
+from scraping.extract import Extractor, Field, safe_get
+
+
+class ExtractorTest(SimpleTestCase):
+    """Test suite for the compiled payload extractors."""
+
+    extractor = Extractor({
+        'id': 'id',
+        'rate': Field(('rating', 'rate'), default=0),
+        'logo': ('logo', 'url', 0),
+        'price': Field(('price', 'selling_price'), default=0, convert=lambda price: price // 10),
+    })
+
+    def test_matches_safe_get_on_odd_payloads(self):
+        """Test that the compiled function returns exactly what per-field safe_get calls return."""
+        payloads = [
+            None,
+            {},
+            {'id': 1, 'rating': {'rate': 4.5}, 'logo': {'url': ['a.png']}, 'price': {'selling_price': 1000}},
+            {'id': None, 'rating': None, 'logo': {'url': 'a.png'}, 'price': {'selling_price': None}},
+            {'rating': [{'rate': 3}], 'logo': {'url': []}, 'price': []},
+            {'rating': 'n/a', 'logo': [], 'price': {'selling_price': 0}},
+        ]
+        for payload in payloads:
+            with self.subTest(payload=payload):
+                self.assertEqual(self.extractor(payload), self.extractor.reference(payload))
+
+    def test_defaults_and_conversion(self):
+        """Test that missing and None values get the field default before conversion."""
+        self.assertEqual(
+            self.extractor({'id': 7, 'rating': {'rate': None}, 'price': {'selling_price': 25000}}),
+            {'id': 7, 'rate': 0, 'logo': '', 'price': 2500})
+        self.assertEqual(safe_get({'logo': {'url': 'a.png'}}, 'logo', 'url', 0), '')
+
+    def test_many_extracts_each_item(self):
+        """Test that many() maps a list of payloads and tolerates a missing list."""
+        self.assertEqual([item['id'] for item in self.extractor.many([{'id': 1}, {'id': 2}])], [1, 2])
+        self.assertEqual(self.extractor.many(None), [])
+
+    def test_benchmark_command_runs(self):
+        """Test that the micro-benchmark covers every parser's extractors."""
+        out = StringIO()
+        call_command('benchmark_extractors', iterations=10, stdout=out)
+        for name in ('product', 'variant', 'car', 'motorcycle', 'asset quote'):
+            self.assertIn(name, out.getvalue())
@@ -0,0 +1,105 @@
+import threading
+import time
+from unittest import mock
+import requests
+from django.core.cache import cache
+from django.test import SimpleTestCase
+from scraping import http, metrics
+
+
+def make_response(status_code, payload=None):
+    """Builds a real requests response with the given status and JSON body."""
+    response = requests.Response()
+    response.status_code = status_code
+    response._content = b'{}' if payload is None else payload
+    return response
+
+
+@mock.patch.object(http.time, 'sleep')
+class HttpClientTest(SimpleTestCase):
+    """Test suite for the retrying, circuit-breaking scraper HTTP client."""
+
+    def setUp(self):
+        cache.clear()
+        self.session = mock.Mock()
+        self.client = http.HttpClient(self.session, retries=3, breaker=http.CircuitBreaker(threshold=3, cooldown=60))
+
+    def test_transient_failures_are_retried(self, sleep):
+        """Test that connection errors and 5xx responses are retried with backoff until success."""
+        retries = metrics.HTTP_RETRIES.labels('api.example')._value.get()
+        self.session.get.side_effect = [requests.ConnectionError('reset'), make_response(503), make_response(200)]
+
+        response = self.client.get('https://api.example/list')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.session.get.call_count, 3)
+        self.assertEqual(sleep.call_count, 2)
+        self.assertTrue(all(0 <= call.args[0] <= 1 for call in sleep.call_args_list))
+        self.assertEqual(metrics.HTTP_RETRIES.labels('api.example')._value.get(), retries + 2)
+        self.assertEqual(self.client.breaker.state('api.example'), 0)
+
+    def test_client_errors_are_not_retried(self, sleep):
+        """Test that a 404 fails right away and does not count against the host."""
+        self.session.get.return_value = make_response(404)
+
+        with self.assertRaises(requests.HTTPError):
+            self.client.get('https://api.example/missing')
+        self.assertEqual(self.session.get.call_count, 1)
+        self.assertIsNone(cache.get('scraping:breaker-failures:api.example'))
+
+    def test_breaker_opens_and_probes_after_cooldown(self, sleep):
+        """Test that repeated failures open the circuit and a single probe is let through later."""
+        self.session.get.side_effect = requests.Timeout('slow')
+        with self.assertRaises(http.CircuitOpen):
+            self.client.get('https://api.example/list')  # The third timeout opens it before the last retry.
+        self.assertEqual(self.session.get.call_count, 3)
+
+        with self.assertRaises(http.CircuitOpen):
+            self.client.get('https://api.example/list')
+        self.assertEqual(self.session.get.call_count, 3)
+        self.assertEqual(metrics.CIRCUIT_BREAKER_STATE.labels('api.example')._value.get(), 2)
+
+        cache.delete('scraping:breaker-open:api.example')  # The cooldown is over.
+        self.assertTrue(self.client.breaker.allow('api.example'))
+        self.assertFalse(self.client.breaker.allow('api.example'))
+        self.client.breaker.record_success('api.example')
+        self.assertEqual(self.client.breaker.state('api.example'), 0)
+
+    def test_slow_request_is_hedged(self, sleep):
+        """Test that a backup request answers when the first one hangs."""
+        release = threading.Event()
+        responses = iter([make_response(200, b'{"from": "first"}'), make_response(200, b'{"from": "backup"}')])
+
+        def get(url, timeout):
+            response = next(responses)
+            if response.json()['from'] == 'first':
+                release.wait(5)
+            return response
+        self.session.get.side_effect = get
+        client = http.HttpClient(self.session, hedge_after=0.05)
+
+        started = time.monotonic()
+        self.assertEqual(client.get_json('https://api.example/list'), {'from': 'backup'})
+        self.assertLess(time.monotonic() - started, 1)
+        release.set()
+
+    def test_conditional_get_skips_unchanged_content(self, sleep):
+        """Test that validators are sent back and a 304 or an identical body yields None."""
+        first = make_response(200, b'{"price": 1}')
+        first.headers['ETag'] = '"abc"'
+        self.session.get.return_value = first
+        response = self.client.get_if_changed('https://api.example/feed', params={'page': 1})
+        self.assertEqual(response.json(), {'price': 1})
+
+        # Nothing is remembered until the caller has processed the response.
+        self.assertIsNotNone(self.client.get_if_changed('https://api.example/feed', params={'page': 1}))
+        self.client.remember(response.validators)
+
+        self.session.get.return_value = make_response(304)
+        self.assertIsNone(self.client.get_if_changed('https://api.example/feed', params={'page': 1}))
+        self.assertEqual(self.session.get.call_args.kwargs['headers'], {'If-None-Match': '"abc"'})
+
+        self.session.get.return_value = make_response(200, b'{"price": 1}')
+        self.assertIsNone(self.client.get_if_changed('https://api.example/feed', params={'page': 1}))
+        self.session.get.return_value = make_response(200, b'{"price": 2}')
+        self.assertIsNotNone(self.client.get_if_changed('https://api.example/feed', params={'page': 1}))
@@ -0,0 +1,65 @@
+from types import SimpleNamespace
+from celery import shared_task
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+from prometheus_client import REGISTRY
+from scraping import instrumentation
+
+
+@shared_task(name='scraping.test.instrumented')
+def instrumented_task():
+    get_user_model().objects.count()
+    get_user_model().objects.count()
+    instrumentation.count_items(4)
+    instrumentation.count_rows(inserted=3, skipped=1)
+
+
+def sample(name, **labels):
+    return REGISTRY.get_sample_value(name, labels) or 0
+
+
+class InstrumentationTest(TestCase):
+    """Test suite for the Celery task and DB write-path metrics."""
+
+    def test_task_run_records_items_rows_and_queries(self):
+        """Test that a task's parsed items, written rows and DB queries are exported under its name."""
+        task = 'scraping.test.instrumented'
+        before = {
+            'items': sample('scraper_items_parsed_total', task=task),
+            'inserted': sample('scraper_rows_written_total', task=task, outcome='inserted'),
+            'queries': sample('scraper_db_queries_total', task=task),
+            'runs': sample('scraper_db_queries_per_item_count', task=task),
+        }
+
+        instrumented_task.apply()
+
+        self.assertEqual(sample('scraper_items_parsed_total', task=task), before['items'] + 4)
+        self.assertEqual(sample('scraper_rows_written_total', task=task, outcome='inserted'), before['inserted'] + 3)
+        self.assertEqual(sample('scraper_db_queries_total', task=task), before['queries'] + 2)
+        self.assertEqual(sample('scraper_db_queries_per_item_count', task=task), before['runs'] + 1)
+        self.assertEqual(sample('scraper_task_seconds_count', task=task, state='SUCCESS'), before['runs'] + 1)
+
+    def test_queue_wait_is_measured_from_publish_time(self):
+        """Test that the publish timestamp header yields a queue wait observation when the task starts."""
+        headers = {}
+        instrumentation._stamp_publish_time(headers=headers)
+        task = SimpleNamespace(name='scraping.test.queued', request=SimpleNamespace(
+            published_at=headers['published_at'] - 5, is_eager=False, eta=None))
+
+        instrumentation._start_task(task=task)
+        instrumentation._finish_task(task=task, state='SUCCESS')
+
+        wait_sum = sample('scraper_task_queue_wait_seconds_sum', task='scraping.test.queued')
+        self.assertGreaterEqual(wait_sum, 5)
+        self.assertLess(wait_sum, 5 + 60)
+
+    def test_metrics_endpoint_exports_scraper_metrics(self):
+        """Test that the web app serves the registry in the Prometheus text format."""
+        instrumentation.count_items(1)
+        response = self.client.get(reverse('metrics'))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('text/plain'))
+        self.assertIn(b'scraper_items_parsed_total{task="none"}', response.content)
+        self.assertIn(b'scraper_http_request_seconds', response.content)
@@ -0,0 +1,112 @@
+from datetime import date, datetime, timedelta, timezone as dt_timezone
+from unittest import mock, skipUnless
+from django.db import connection, models
+from django.test import SimpleTestCase, TestCase
+from django.utils import timezone
+from cars.models import Brand, PriceLog, Vehicle
+from scraping import partitions
+
+
+class PartitionPlanTest(SimpleTestCase):
+    """Test suite for the monthly partition bookkeeping."""
+
+    def test_add_months_crosses_years(self):
+        """Test that month arithmetic wraps around year ends in both directions."""
+        self.assertEqual(partitions.add_months(date(2025, 11, 20), 3), date(2026, 2, 1))
+        self.assertEqual(partitions.add_months(date(2025, 1, 1), -1), date(2024, 12, 1))
+
+    def test_month_of_uses_tehran_time(self):
+        """Test that a UTC timestamp late on the last of the month falls in the next Tehran month."""
+        timestamp = datetime(2025, 1, 31, 21, 0, tzinfo=dt_timezone.utc)
+        self.assertEqual(partitions.month_of(timestamp), date(2025, 2, 1))
+        self.assertEqual(partitions.month_of(date(2025, 1, 31)), date(2025, 1, 1))
+
+    def test_partitions_are_read_from_their_names(self):
+        """Test that attached partitions are listed oldest first and unrelated tables are ignored."""
+        cursor = mock.Mock()
+        cursor.fetchall.return_value = [
+            ('cars_pricelog_p202503',), ('cars_pricelog_before202502',),
+            ('cars_pricelog_p202502',), ('cars_pricelog_archive',),
+        ]
+        self.assertEqual(partitions.partitions(cursor, 'cars_pricelog'), [
+            (None, date(2025, 2, 1), 'cars_pricelog_before202502'),
+            (date(2025, 2, 1), date(2025, 3, 1), 'cars_pricelog_p202502'),
+            (date(2025, 3, 1), date(2025, 4, 1), 'cars_pricelog_p202503'),
+        ])
+
+    def test_missing_months_skips_covered_ones(self):
+        """Test that only months outside every existing partition are created."""
+        existing = [(None, date(2025, 2, 1), 'old'), (date(2025, 3, 1), date(2025, 4, 1), 'march')]
+        self.assertEqual(
+            partitions.missing_months(existing, date(2025, 1, 1), date(2025, 5, 1)),
+            [date(2025, 2, 1), date(2025, 4, 1), date(2025, 5, 1)],
+        )
+
+    def test_expired_partitions_end_before_the_cutoff(self):
+        """Test that a partition expires only when all of its rows are older than the cutoff."""
+        existing = [
+            (None, date(2025, 2, 1), 'old'),
+            (date(2025, 2, 1), date(2025, 3, 1), 'february'),
+            (date(2025, 3, 1), date(2025, 4, 1), 'march'),
+        ]
+        self.assertEqual([name for *_, name in partitions.expired(existing, date(2025, 3, 1))], ['old', 'february'])
+
+
+class MaintainTest(TestCase):
+    """Test suite for partition maintenance outside PostgreSQL."""
+
+    def test_maintain_is_a_no_op_on_other_databases(self):
+        """Test that plain tables are left alone when the database cannot partition them."""
+        report = partitions.maintain(retention={'assets.assetpricelog': 1})
+        self.assertEqual(report, {'created': [], 'expired': [], 'kept': []})
+
+
+@skipUnless(connection.vendor == 'postgresql', "Partitioning needs PostgreSQL.")
+class PostgresPartitionTest(TestCase):
+    """Test suite for converting and maintaining partitioned tables on PostgreSQL."""
+
+    def test_convert_keeps_rows_constraints_and_ids(self):
+        """Test that a plain table with rows becomes partitioned in place and keeps its constraints and ids."""
+        field = models.DateTimeField()
+        field.set_attributes_from_name('taken_at')
+        old = timezone.now() - timedelta(days=70)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "CREATE TABLE probe (id bigint GENERATED BY DEFAULT AS IDENTITY PRIMARY KEY, "
+                "asset varchar(20) NOT NULL, taken_at timestamptz NOT NULL, CONSTRAINT probe_asset_taken_at_uniq UNIQUE (asset, taken_at))"
+            )
+            cursor.execute("CREATE INDEX probe_taken_at_idx ON probe (taken_at)")
+            cursor.execute("INSERT INTO probe (asset, taken_at) VALUES ('a', %s), ('b', %s)", [old, old])
+
+            partitions.convert_to_partitioned(cursor, 'probe', field, months_ahead=2)
+
+            self.assertTrue(partitions.is_partitioned(cursor, 'probe'))
+            existing = partitions.partitions(cursor, 'probe')
+            self.assertIsNone(existing[0][0])
+            self.assertEqual(existing[0][1], partitions.add_months(partitions.month_of(old), 1))
+            self.assertEqual(existing[-1][0], partitions.add_months(timezone.localdate().replace(day=1), 2))
+            cursor.execute("INSERT INTO probe (asset, taken_at) VALUES ('a', %s) RETURNING id", [timezone.now()])
+            self.assertEqual(cursor.fetchone()[0], 3)
+            cursor.execute("SELECT COUNT(*) FROM probe")
+            self.assertEqual(cursor.fetchone()[0], 3)
+            cursor.execute(
+                "SELECT conname, contype FROM pg_constraint WHERE conrelid = 'probe'::regclass AND contype IN ('p', 'u')")
+            self.assertEqual(sorted(cursor.fetchall()), [('probe_asset_taken_at_uniq', 'u'), ('probe_pkey', 'p')])
+            cursor.execute("SELECT 1 FROM pg_indexes WHERE indexname = 'probe_taken_at_idx'")
+            self.assertIsNotNone(cursor.fetchone())
+
+    def test_maintain_creates_ahead_and_expires_old_partitions(self):
+        """Test that maintenance adds the next month's partitions and drops expired ones."""
+        vehicle = Vehicle.objects.create(brand=Brand.objects.create(name_fa="پژو"), model_fa="پارس", production_year=1402)
+        PriceLog.objects.create(vehicle=vehicle, price=1, log_date=date(2000, 1, 1))
+        with connection.cursor() as cursor:
+            # The test transaction would otherwise still hold the deferred foreign key check of the row.
+            cursor.execute("SET CONSTRAINTS ALL IMMEDIATE")
+
+        report = partitions.maintain(months_ahead=partitions.PARTITION_MONTHS_AHEAD + 1, retention={'cars.pricelog': 0}, action='drop')
+
+        ahead = partitions.add_months(timezone.localdate().replace(day=1), partitions.PARTITION_MONTHS_AHEAD + 1)
+        self.assertIn(f'cars_pricelog_p{ahead:%Y%m}', report['created'])
+        self.assertEqual(len(report['created']), len(partitions.PARTITIONED_MODELS))
+        self.assertTrue(report['expired'][0].startswith('cars_pricelog_before'))
+        self.assertFalse(PriceLog.objects.exists())
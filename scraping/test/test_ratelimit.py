@@ -0,0 +1,102 @@
+from unittest import mock
+import requests
+from django.conf import settings
+from django.core.cache import cache
+from django.test import SimpleTestCase
+from scraping import ratelimit
+
+
+class FakeClock:
+    """Stands in for the time module; sleeping advances the clock instead of blocking."""
+
+    def __init__(self):
+        self.now = 1_000_000.0
+        self.sleeps = []
+
+    def time(self):
+        return self.now
+
+    monotonic = time
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+class TokenBucketTest(SimpleTestCase):
+    """Test suite for the shared per-host token bucket."""
+
+    def setUp(self):
+        cache.clear()
+        self.bucket = ratelimit.TokenBucket(limits={'slow.example': (2.0, 3)}, default=(100.0, 100))
+        self.clock = FakeClock()
+        patcher = mock.patch.object(ratelimit, 'time', self.clock)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_burst_is_served_then_requests_wait(self):
+        """Test that a host gets its burst right away and then waits 1/rate per request."""
+        for _ in range(3):
+            self.bucket.acquire('slow.example')
+        self.assertEqual(self.clock.sleeps, [])
+
+        self.bucket.acquire('slow.example')
+        self.bucket.acquire('slow.example')
+        self.assertEqual(self.clock.sleeps, [0.5, 0.5])
+
+    def test_hosts_have_separate_buckets(self):
+        """Test that draining one host's bucket does not slow another host down."""
+        for _ in range(3):
+            self.bucket.acquire('slow.example')
+        for _ in range(50):
+            self.bucket.acquire('fast.example')
+        self.assertEqual(self.clock.sleeps, [])
+
+    def test_penalize_halves_rate_and_honours_retry_after(self):
+        """Test that a 429 pauses the host for Retry-After and halves its rate."""
+        self.bucket.penalize('slow.example', retry_after=30)
+
+        self.assertEqual(self.bucket._state('slow.example'), (self.clock.now + 30, 0.5))
+        with self.assertRaises(ratelimit.RateLimitTimeout):
+            self.bucket.acquire('slow.example', max_wait=5)
+        self.assertEqual(self.clock.sleeps, [])
+
+        self.bucket.acquire('slow.example', max_wait=60)
+        self.assertEqual(self.clock.sleeps, [30])
+
+    @mock.patch.dict(settings.CACHES['default'], LOCATION='redis://redis:6379/1')
+    @mock.patch.object(ratelimit.redis.Redis, 'from_url')
+    def test_redis_buckets_use_a_dedicated_client(self, from_url):
+        """Test that the token script is registered once on a client of the cache's Redis."""
+        script = from_url.return_value.register_script.return_value
+        script.return_value = b'0.5'
+
+        self.assertEqual(self.bucket._take_redis('slow.example', 2.0, 3), 0.5)
+        self.bucket._take_redis('slow.example', 2.0, 3)
+
+        from_url.assert_called_once_with('redis://redis:6379/1')
+        from_url.return_value.register_script.assert_called_once_with(ratelimit._TAKE_TOKEN)
+        script.assert_called_with(keys=['scraping:bucket:slow.example'], args=[2.0, 3])
+
+    def test_retry_after_header_formats(self):
+        """Test that Retry-After is parsed both as seconds and as an HTTP date."""
+        self.assertEqual(ratelimit.retry_after_seconds('12'), 12.0)
+        self.assertEqual(ratelimit.retry_after_seconds('Mon, 12 Jan 1970 13:46:40 GMT'), 0.0)
+        self.assertIsNone(ratelimit.retry_after_seconds('soon'))
+        self.assertIsNone(ratelimit.retry_after_seconds(None))
+
+    @mock.patch.object(requests.adapters.HTTPAdapter, 'send')
+    def test_adapter_penalizes_throttled_host(self, send):
+        """Test that sessions from limited_session take a token per request and back off on 429."""
+        response = requests.Response()
+        response.status_code = 429
+        response.headers['Retry-After'] = '7'
+        send.return_value = response
+        bucket = mock.Mock()
+        session = requests.Session()
+        session.mount('https://', ratelimit.RateLimitedAdapter(bucket=bucket))
+
+        session.get('https://slow.example/list?page=1')
+
+        bucket.acquire.assert_called_once_with('slow.example')
+        bucket.penalize.assert_called_once_with('slow.example', 7.0)
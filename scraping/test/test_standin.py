@@ -0,0 +1,61 @@
+from io import StringIO
+import requests
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase
+from products.models import Product
+from scraping.standin import Standin
+
+
+class StandinTest(SimpleTestCase):
+    """Test suite for the local stand-in of the upstream APIs."""
+
+    def setUp(self):
+        self.standin = Standin(pages=2, per_page=3, seed=7).start()
+        self.addCleanup(self.standin.stop)
+        self.urls = self.standin.urls()
+
+    def test_pages_follow_each_scraper_format(self):
+        """Test that every source serves its configured number of pages and then stops."""
+        list_url = self.urls['LIST_API_URL_MOBILE']
+        products = requests.get(list_url.format(page=2)).json()['data']['products']
+        self.assertEqual(len(products), 3)
+        self.assertEqual(requests.get(list_url.format(page=3)).json()['data']['products'], [])
+
+        detail = requests.get(self.urls['DETAIL_API_URL_MOBILE'].format(product_id=products[0]['id'])).json()
+        self.assertEqual(detail['data']['product']['variants'][0], products[0]['default_variant'])
+
+        first = requests.get(self.urls['BASE_API_URL_CAR']).json()
+        self.assertEqual(len(first['results']), 3)
+        self.assertIsNone(requests.get(first['next']).json()['next'])
+
+        bama = requests.get(self.urls['BASE_API_URL_MOTOR'], params={'pageIndex': 3}).json()
+        self.assertEqual(bama['data'], [])
+        self.assertEqual(len(requests.get(self.urls['BASE_API_ASSETS']).json()['current']), 6)
+
+    def test_etag_answers_conditional_requests(self):
+        """Test that an unchanged page is answered with a 304 when its ETag is sent back."""
+        url = self.urls['LIST_API_URL_PC'].format(page=1)
+        etag = requests.get(url).headers['ETag']
+        self.assertEqual(requests.get(url, headers={'If-None-Match': etag}).status_code, 304)
+
+    def test_error_rate_fails_requests(self):
+        """Test that requests fail with a 503 at the configured error rate."""
+        self.standin.error_rate = 1.0
+        self.assertEqual(requests.get(self.urls['BASE_API_ASSETS']).status_code, 503)
+        self.assertEqual(self.standin.errors, 1)
+
+
+class BenchmarkScrapeCommandTest(TestCase):
+    """Test suite for the `benchmark_scrape` management command."""
+
+    def test_reports_throughput_and_rolls_back(self):
+        """Test that each source is scraped end to end, measured, and its writes discarded."""
+        out = StringIO()
+        call_command('benchmark_scrape', 'products', 'cars', pages=1, per_page=4, seed=3, stdout=out)
+
+        output = out.getvalue()
+        self.assertIn("products: 4 items in", output)
+        self.assertIn("cars: 4 items in", output)
+        self.assertIn("items/s", output)
+        self.assertIn("per item", output)
+        self.assertFalse(Product.objects.exists())
@@ -0,0 +1,8 @@
+from django.http import HttpResponse
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
+from .instrumentation import registry
+
+
+def metrics_view(request):
+    """ Exports the Prometheus metrics of this web process (or of all of them, in multiprocess mode). """
+    return HttpResponse(generate_latest(registry()), content_type=CONTENT_TYPE_LATEST)